@@ -1,6 +1,8 @@
 // API Configuration from config.js
 
 let currentEditBookId = null;
+// Books from the last table load by id, so editing one needs no extra request
+let loadedBooks = new Map();
 
 // Check if user is authenticated
 
@@ -46,9 +48,11 @@ function initTabs() {
   });
 }
 
-// Fetch all users from API
+// Fetch users from API, one page at a time
 
-async function fetchUsers() {
+let nextUsersCursor = null;
+
+async function fetchUsers(cursor = null) {
   const token = getAuthToken();
 
   if (!token) {
@@ -60,7 +64,13 @@ async function fetchUsers() {
   try {
     const API_BASE_URL =
       window.API_CONFIG?.API_BASE_URL || "http://127.0.0.1:8000/api";
-    const response = await fetch(`${API_BASE_URL}/auth/users/`, {
+    const params = new URLSearchParams({ page_size: "100" });
+    if (cursor) {
+      params.set("cursor", cursor);
+    } else {
+      params.set("include_stats", "1");
+    }
+    const response = await fetch(`${API_BASE_URL}/auth/users/?${params}`, {
       method: "GET",
       headers: {
         Authorization: `Token ${token}`,
@@ -69,8 +79,11 @@ async function fetchUsers() {
 
     if (response.ok) {
       const data = await response.json();
-      displayUsers(data.users);
-      updateUserStats(data.users);
+      nextUsersCursor = data.next;
+      displayUsers(data.users, Boolean(cursor));
+      if (data.stats) {
+        updateUserStats(data.stats);
+      }
     } else if (response.status === 403) {
       alert("You do not have admin privileges");
       window.location.href = "../index.html";
@@ -88,18 +101,22 @@ async function fetchUsers() {
   }
 }
 
-// Display users in table
+// Display users in table (append=true adds the next page below the current rows)
 
-function displayUsers(users) {
+function displayUsers(users, append = false) {
   const tbody = document.getElementById("usersTableBody");
+  const loadMoreRow = document.getElementById("loadMoreUsersRow");
+  if (loadMoreRow) {
+    loadMoreRow.remove();
+  }
 
-  if (users.length === 0) {
+  if (!append && users.length === 0) {
     tbody.innerHTML =
       '<tr><td colspan="5" class="no-data">No users registered yet</td></tr>';
     return;
   }
 
-  tbody.innerHTML = users
+  const rows = users
     .map(
       (user) => `
         <tr>
@@ -112,22 +129,31 @@ function displayUsers(users) {
     `,
     )
     .join("");
-}
 
-// Update user statistics
-
-function updateUserStats(users) {
-  document.getElementById("totalUsers").textContent = users.length;
+  if (append) {
+    tbody.insertAdjacentHTML("beforeend", rows);
+  } else {
+    tbody.innerHTML = rows;
+  }
 
-  // Calculate recent users (joined in last 30 days)
-  const thirtyDaysAgo = new Date();
-  thirtyDaysAgo.setDate(thirtyDaysAgo.getDate() - 30);
+  if (nextUsersCursor) {
+    tbody.insertAdjacentHTML(
+      "beforeend",
+      `<tr id="loadMoreUsersRow"><td colspan="5" class="no-data">
+          <button type="button" id="loadMoreUsersBtn">Load more users</button>
+       </td></tr>`,
+    );
+    document
+      .getElementById("loadMoreUsersBtn")
+      .addEventListener("click", () => fetchUsers(nextUsersCursor));
+  }
+}
 
-  const recentUsers = users.filter(
-    (user) => new Date(user.date_joined) > thirtyDaysAgo,
-  );
+// Update user statistics (computed server-side over all users)
 
-  document.getElementById("recentUsers").textContent = recentUsers.length;
+function updateUserStats(stats) {
+  document.getElementById("totalUsers").textContent = stats.total;
+  document.getElementById("recentUsers").textContent = stats.recent;
 }
 
 // Fetch all books from API
@@ -147,6 +173,7 @@ async function fetchBooks() {
 
     if (response.ok) {
       const data = await response.json();
+      loadedBooks = new Map((data.books || []).map((book) => [book.id, book]));
       displayBooks(data.books || []);
       updateBookStats(data.books || []);
     } else {
@@ -219,29 +246,32 @@ async function editBook(bookId) {
     window.API_CONFIG?.API_BASE_URL || "http://127.0.0.1:8000/api";
 
   try {
-    const response = await fetch(`${API_BASE_URL}/books/${bookId}/`, {
-      method: "GET",
-      headers: {
-        Authorization: `Token ${token}`,
-      },
-    });
-
-    if (response.ok) {
-      const book = await response.json();
+    let book = loadedBooks.get(bookId);
+    if (!book) {
+      const response = await fetch(`${API_BASE_URL}/books/${bookId}/`, {
+        method: "GET",
+        headers: {
+          Authorization: `Token ${token}`,
+        },
+      });
+      if (!response.ok) {
+        return;
+      }
+      book = await response.json();
+    }
 
-      // Populate form
-      document.getElementById("bookTitle").value = book.title;
-      document.getElementById("bookAuthor").value = book.author;
-      document.getElementById("bookGenre").value = book.genre;
-      document.getElementById("bookDescription").value = book.description;
+    // Populate form
+    document.getElementById("bookTitle").value = book.title;
+    document.getElementById("bookAuthor").value = book.author;
+    document.getElementById("bookGenre").value = book.genre;
+    document.getElementById("bookDescription").value = book.description;
 
-      // Set modal title and track book ID
-      document.getElementById("modalTitle").textContent = "Edit Book";
-      currentEditBookId = bookId;
+    // Set modal title and track book ID
+    document.getElementById("modalTitle").textContent = "Edit Book";
+    currentEditBookId = bookId;
 
-      // Show modal
-      document.getElementById("bookModal").classList.add("active");
-    }
+    // Show modal
+    document.getElementById("bookModal").classList.add("active");
   } catch (error) {
     console.error("Error fetching book:", error);
     alert("Failed to load book details");
@@ -33,6 +33,61 @@ async function fetchBookDetails(bookId) {
   }
 }
 
+// Format a byte count as e.g. "1.8 MB"
+
+function formatFileSize(bytes) {
+  const units = ["bytes", "KB", "MB", "GB"];
+  let size = bytes;
+  let unit = 0;
+  while (size >= 1024 && unit < units.length - 1) {
+    size /= 1024;
+    unit++;
+  }
+  return unit === 0 ? `${size} ${units[0]}` : `${size.toFixed(1)} ${units[unit]}`;
+}
+
+// Fetch the precomputed "similar books" for a book
+
+async function fetchSimilarBooks(bookId) {
+  const response = await fetch(`${API_BASE_URL}/books/${bookId}/similar/?limit=6`);
+  if (!response.ok) {
+    throw new Error("Failed to load similar books");
+  }
+  const data = await response.json();
+  return data.books;
+}
+
+// Show similar books as small cover cards below the details
+
+function displaySimilarBooks(books) {
+  if (!books.length) return;
+
+  document.getElementById("similarBooksGrid").innerHTML = books
+    .map((book) => {
+      const variants = book.cover_variants || {};
+      const thumbnail = (variants.webp || variants.jpeg || [])[0];
+      let imageUrl = thumbnail ? thumbnail.url : book.cover_image;
+      if (imageUrl && !imageUrl.startsWith("http")) {
+        imageUrl = imageUrl.startsWith("/media/")
+          ? `${MEDIA_BASE_URL}${imageUrl}`
+          : `${MEDIA_BASE_URL}/media/${imageUrl}`;
+      }
+      const cover = imageUrl
+        ? `<img src="${imageUrl}" alt="${book.title}" loading="lazy">`
+        : '<div class="similar-book-placeholder"><i class="fas fa-book"></i></div>';
+
+      return `
+        <a class="similar-book" href="./book-detail.html?id=${book.id}">
+          ${cover}
+          <h3>${book.title}</h3>
+          <p>${book.author}</p>
+        </a>
+      `;
+    })
+    .join("");
+  document.getElementById("similarBooks").style.display = "block";
+}
+
 // Display book details on the page
 
 function displayBookDetails(book) {
@@ -76,6 +131,25 @@ function displayBookDetails(book) {
   document.getElementById("bookDescription").textContent =
     book.description || "No description available.";
 
+  // PDF details read by the backend from local files (absent for remote PDFs)
+  const fileDetails = [];
+  if (book.pdf_pages) {
+    fileDetails.push(`${book.pdf_pages} ${book.pdf_pages === 1 ? "page" : "pages"}`);
+  }
+  if (book.pdf_size) {
+    fileDetails.push(formatFileSize(book.pdf_size));
+  }
+  if (fileDetails.length) {
+    document.getElementById("bookFileDetails").textContent = fileDetails.join(" · ");
+    document.getElementById("bookFileInfo").style.display = "flex";
+  }
+  if (book.pdf_preview) {
+    const previewImage = document.getElementById("bookPreviewImage");
+    previewImage.src = `${MEDIA_BASE_URL}${book.pdf_preview}`;
+    previewImage.alt = `First page of ${book.title}`;
+    document.getElementById("bookPreview").style.display = "block";
+  }
+
   // Set up download button
   const downloadBtn = document.getElementById("downloadBtn");
   if (book.pdf_file) {
@@ -167,6 +241,17 @@ function displayBookDetails(book) {
 
 // Show error message
 
+// Save a URL through a temporary link; blob URLs are released afterwards
+function saveFile(url, bookTitle, isBlob) {
+  const link = document.createElement("a");
+  link.href = url;
+  link.download = `${bookTitle}.pdf`;
+  document.body.appendChild(link);
+  link.click();
+  document.body.removeChild(link);
+  if (isBlob) window.URL.revokeObjectURL(url);
+}
+
 async function handleDownload(bookId, bookTitle) {
   if (!isAuthenticated()) {
     alert("Please sign up or login to download books");
@@ -184,7 +269,7 @@ async function handleDownload(bookId, bookTitle) {
 
     const token = localStorage.getItem("noveliaToken");
 
-    // Get the Cloudinary download URL from backend
+    // Get a download URL (signed for local PDFs, Cloudinary otherwise) from backend
     const response = await fetch(`${API_BASE_URL}/books/${bookId}/download/`, {
       method: "GET",
       headers: {
@@ -201,28 +286,29 @@ async function handleDownload(bookId, bookTitle) {
 
     if (!response.ok) throw new Error("Failed to get download URL");
 
-    const data = await response.json();
-
-    // Fetch the PDF as a blob from Cloudinary (cross-origin anchor downloads don't work)
     downloadBtn.innerHTML =
       '<i class="fas fa-spinner fa-spin"></i> Downloading...';
 
-    const fileResponse = await fetch(data.download_url);
-    if (!fileResponse.ok) throw new Error("Failed to download file");
-
-    const blob = await fileResponse.blob();
-    const blobUrl = window.URL.createObjectURL(blob);
-
-    // Trigger download from blob URL (same-origin, so download attribute works)
-    const link = document.createElement("a");
-    link.href = blobUrl;
-    link.download = `${bookTitle}.pdf`;
-    document.body.appendChild(link);
-    link.click();
-    document.body.removeChild(link);
-
-    // Clean up blob URL
-    window.URL.revokeObjectURL(blobUrl);
+    const contentType = response.headers.get("Content-Type") || "";
+    if (contentType.startsWith("application/pdf")) {
+      // Signed links are turned off on the server, so the file came back on
+      // this authenticated request and has to be saved from memory
+      saveFile(window.URL.createObjectURL(await response.blob()), bookTitle, true);
+    } else {
+      const data = await response.json();
+
+      if (data.expires) {
+        // Signed local link: the server sends it as an attachment, so the
+        // browser streams it to disk (resumably) and the page stays put
+        saveFile(data.download_url, bookTitle, false);
+      } else {
+        // Remote (Cloudinary) file: the browser would open it in its PDF
+        // viewer, so fetch it and save it under the book's title instead
+        const file = await fetch(data.download_url);
+        if (!file.ok) throw new Error("Failed to download the PDF");
+        saveFile(window.URL.createObjectURL(await file.blob()), bookTitle, true);
+      }
+    }
 
     downloadBtn.innerHTML = '<i class="fas fa-check"></i> Downloaded!';
     setTimeout(() => {
@@ -257,6 +343,14 @@ async function initializePage() {
     displayBookDetails(book);
   } catch (error) {
     showError();
+    return;
+  }
+
+  // Recommendations are optional: the page stays usable without them
+  try {
+    displaySimilarBooks(await fetchSimilarBooks(bookId));
+  } catch (error) {
+    console.error("Error fetching similar books:", error);
   }
 }
 
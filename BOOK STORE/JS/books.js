@@ -1,11 +1,15 @@
 // API Configuration from config.js
 
 // Fetch and display books from API
-async function loadBooks(genre = '') {
+async function loadBooks(genre = '', author = '') {
     try {
-        let url = `${API_BASE_URL}/books/`;
+        // The grid only needs title/author/genre/cover, so ask for the compact view
+        let url = `${API_BASE_URL}/books/?view=compact`;
         if (genre) {
-            url += `?genre=${encodeURIComponent(genre)}`;
+            url += `&genre=${encodeURIComponent(genre)}`;
+        }
+        if (author) {
+            url += `&author=${encodeURIComponent(author)}`;
         }
         
         const response = await fetch(url);
@@ -24,6 +28,23 @@ async function loadBooks(genre = '') {
 }
 
 
+// Resolve a cover URL the same way for originals and resized variants
+function resolveCoverUrl(url) {
+    if (url.startsWith('http')) {
+        return url;
+    } else if (url.startsWith('/media/')) {
+        // Path already includes /media/ prefix
+        return `${MEDIA_BASE_URL}${url}`;
+    }
+    // Relative path without /media/ prefix
+    return `${MEDIA_BASE_URL}/media/${url}`;
+}
+
+// Build a srcset string from a list of {width, url} cover variants
+function buildSrcset(variants) {
+    return (variants || []).map(v => `${resolveCoverUrl(v.url)} ${v.width}w`).join(', ');
+}
+
 // Display books in grid
 function displayBooks(books) {
     const container = document.getElementById('book-section');
@@ -37,25 +58,30 @@ function displayBooks(books) {
         // Get the image URL - all images now come from Django media
         let imageUrl;
         if (book.cover_image) {
-            if (book.cover_image.startsWith('http')) {
-                imageUrl = book.cover_image;
-            } else if (book.cover_image.startsWith('/media/')) {
-                // Path already includes /media/ prefix
-                imageUrl = `${MEDIA_BASE_URL}${book.cover_image}`;
-            } else {
-                // Relative path without /media/ prefix
-                imageUrl = `${MEDIA_BASE_URL}/media/${book.cover_image}`;
-            }
+            imageUrl = resolveCoverUrl(book.cover_image);
         } else {
             // SVG placeholder - no external file needed
             imageUrl = 'data:image/svg+xml,%3Csvg xmlns="http://www.w3.org/2000/svg" width="200" height="300"%3E%3Crect width="200" height="300" fill="%2315b1b1"/%3E%3Ctext x="50%25" y="50%25" text-anchor="middle" fill="white" font-size="20"%3ENo Image%3C/text%3E%3C/svg%3E';
         }
-        
+
+        // Prefer resized WebP/JPEG covers when the backend has generated them
+        const variants = book.cover_variants || {};
+        const sizes = '(max-width: 600px) 50vw, 250px';
+        const webpSource = variants.webp
+            ? `<source type="image/webp" srcset="${buildSrcset(variants.webp)}" sizes="${sizes}">`
+            : '';
+        const jpegSrcset = variants.jpeg
+            ? `srcset="${buildSrcset(variants.jpeg)}" sizes="${sizes}"`
+            : '';
+
         return `
             <div class="B-nov-grids">
                 <a href="./book-detail.html?id=${book.id}">
                     <div class="B-nov-img">
-                        <img src="${imageUrl}" alt="${book.title}">
+                        <picture>
+                            ${webpSource}
+                            <img src="${imageUrl}" ${jpegSrcset} alt="${book.title}" loading="lazy">
+                        </picture>
                     </div>
                     <div class="B-nov-words">
                         <h3>${book.title}</h3>
@@ -74,7 +100,7 @@ function displayBooks(books) {
 // Search books
 async function searchBooks(query) {
     try {
-        const url = `${API_BASE_URL}/books/?search=${encodeURIComponent(query)}`;
+        const url = `${API_BASE_URL}/books/?view=compact&search=${encodeURIComponent(query)}`;
         const response = await fetch(url);
         
         if (response.ok) {
@@ -86,14 +112,71 @@ async function searchBooks(query) {
     }
 }
 
+// Title/author suggestions for the search box (answered from an in-memory index)
+async function fetchSuggestions(query) {
+    const url = `${API_BASE_URL}/books/autocomplete/?q=${encodeURIComponent(query)}`;
+    const response = await fetch(url);
+    if (!response.ok) {
+        throw new Error('Failed to fetch suggestions');
+    }
+    const data = await response.json();
+    return data.suggestions;
+}
+
+function hideSuggestions() {
+    const list = document.getElementById('searchSuggestions');
+    list.hidden = true;
+    list.innerHTML = '';
+}
+
+function showSuggestions(suggestions, searchInput) {
+    const list = document.getElementById('searchSuggestions');
+    if (suggestions.length === 0) {
+        hideSuggestions();
+        return;
+    }
+
+    list.innerHTML = '';
+    suggestions.forEach(suggestion => {
+        const item = document.createElement('li');
+        item.className = `suggestion suggestion-${suggestion.type}`;
+        const text = document.createElement('span');
+        text.textContent = suggestion.text;
+        const kind = document.createElement('span');
+        kind.className = 'suggestion-kind';
+        kind.textContent = suggestion.type === 'author' ? 'Author' : 'Book';
+        item.append(text, kind);
+        // mousedown fires before the input loses focus
+        item.addEventListener('mousedown', event => {
+            event.preventDefault();
+            hideSuggestions();
+            if (suggestion.type === 'title') {
+                window.location.href = `./book-detail.html?id=${suggestion.book_id}`;
+            } else {
+                searchInput.value = suggestion.text;
+                loadBooks('', suggestion.slug || suggestion.text);
+            }
+        });
+        list.appendChild(item);
+    });
+    list.hidden = false;
+}
+
 // Initialize on page load
 document.addEventListener('DOMContentLoaded', function() {
-    // Load all books initially
-    loadBooks();
-    
+    // Load all books initially, or one genre when linked from the home page (?genre=)
+    const initialGenre = new URLSearchParams(window.location.search).get('genre') || '';
+    loadBooks(initialGenre);
+
     // Genre filter
     const genreSelect = document.querySelector('.all-gen');
     if (genreSelect) {
+        const option = [...genreSelect.options].find(
+            option => option.value && option.value.toLowerCase() === initialGenre.toLowerCase()
+        );
+        if (option) {
+            genreSelect.value = option.value;
+        }
         genreSelect.addEventListener('change', function() {
             const selectedGenre = this.value;
             if (selectedGenre === '' || selectedGenre === 'all') {
@@ -108,12 +191,33 @@ document.addEventListener('DOMContentLoaded', function() {
     const searchInput = document.querySelector('.ser-for');
     
     if (searchInput) {
+        // Suggestions on every keystroke; the full search once typing pauses
+        let searchTimer = null;
+        let latestQuery = '';
         searchInput.addEventListener('input', function() {
             const query = this.value.trim();
-            if (query) {
-                searchBooks(query);
-            } else {
+            latestQuery = query;
+            clearTimeout(searchTimer);
+            if (!query) {
+                hideSuggestions();
                 loadBooks();
+                return;
+            }
+
+            fetchSuggestions(query)
+                .then(suggestions => {
+                    // Ignore answers to queries the user has already typed past
+                    if (query === latestQuery) {
+                        showSuggestions(suggestions, searchInput);
+                    }
+                })
+                .catch(error => console.error('Error fetching suggestions:', error));
+            searchTimer = setTimeout(() => searchBooks(query), 300);
+        });
+        searchInput.addEventListener('blur', hideSuggestions);
+        searchInput.addEventListener('keydown', event => {
+            if (event.key === 'Escape') {
+                hideSuggestions();
             }
         });
     }
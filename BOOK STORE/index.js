@@ -1,20 +1,20 @@
 // Homepage - Load books from Django API
 // API URLs come from config.js (window.API_CONFIG)
 
-// Fetch and display books on homepage
-async function loadHomepageBooks() {
+// Featured books, genres and new arrivals come from one /books/home/ request
+async function loadHomepage() {
     try {
-        const response = await fetch(`${window.API_CONFIG?.API_BASE_URL || 'http://127.0.0.1:8000/api'}/books/`);
+        const response = await fetch(`${window.API_CONFIG?.API_BASE_URL || 'http://127.0.0.1:8000/api'}/books/home/`);
         
         if (!response.ok) {
-            throw new Error('Failed to fetch books');
+            throw new Error('Failed to fetch home page');
         }
         
         const data = await response.json();
-        const books = data.books || [];
         
-        // Display first 4 books on homepage
-        displayHomepageBooks(books.slice(0, 4));
+        displayHomepageBooks(document.getElementById('book-section'), data.featured || []);
+        displayNewArrivals(data.new_arrivals || []);
+        displayGenres(data.genres || []);
         
     } catch (error) {
         console.error('Error loading books:', error);
@@ -25,10 +25,8 @@ async function loadHomepageBooks() {
     }
 }
 
-// Display books in homepage grid
-function displayHomepageBooks(books) {
-    const container = document.getElementById('book-section');
-    
+// Display books in a homepage grid
+function displayHomepageBooks(container, books) {
     if (!container) return;
     
     if (books.length === 0) {
@@ -70,9 +68,26 @@ function displayHomepageBooks(books) {
     }).join('');
 }
 
+function displayNewArrivals(books) {
+    const heading = document.getElementById('new-arrivals-heading');
+    if (!heading || books.length === 0) return;
+    heading.hidden = false;
+    displayHomepageBooks(document.getElementById('new-arrivals'), books);
+}
+
+// Genre buttons open the catalog filtered to that genre
+function displayGenres(genres) {
+    const container = document.querySelector('.gen-btn');
+    if (!container || genres.length === 0) return;
+    
+    container.innerHTML = genres.map(genre => `
+        <a href="./HTML/books.html?genre=${encodeURIComponent(genre.slug)}"><button>${genre.name}</button></a>
+    `).join('');
+}
+
 // Initialize when DOM is loaded
 document.addEventListener('DOMContentLoaded', function() {
-    loadHomepageBooks();
+    loadHomepage();
     
     // Existing code for smooth scrolling, animations, etc.
     initSmoothScrolling();
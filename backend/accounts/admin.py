@@ -1,6 +1,6 @@
 from django.contrib import admin
 from accounts.models import User
-from books.models import Book
+from books.models import Author, Book, Genre
 
 
 @admin.register(User)
@@ -14,6 +14,21 @@ class UserAdmin(admin.ModelAdmin):
 @admin.register(Book)
 class BookAdmin(admin.ModelAdmin):
     list_display = ('title', 'author', 'genre', 'created_at')
-    list_filter = ('genre', 'author')
+    list_filter = ('genre_ref', 'author_ref')
     search_fields = ('title', 'author', 'description')
     ordering = ('title',)
+
+
+@admin.register(Author)
+class AuthorAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug', 'book_count')
+    search_fields = ('name',)
+    readonly_fields = ('book_count',)
+
+
+@admin.register(Genre)
+class GenreAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug', 'book_count')
+    search_fields = ('name',)
+    readonly_fields = ('book_count',)
+
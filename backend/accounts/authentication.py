@@ -0,0 +1,130 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+
+HITS_KEY = 'auth:token-cache:hits'
+MISSES_KEY = 'auth:token-cache:misses'
+
+
+def token_cache_key(key):
+    # Hash the token so raw credentials never appear in cache keys
+    return 'auth:token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def invalidate_token(key):
+    """Forget a cached token -> user resolution"""
+    cache.delete(token_cache_key(key))
+
+
+def _user_fields():
+    # Everything but the password hash, which loads from the database if read
+    return [field.attname for field in get_user_model()._meta.concrete_fields if field.attname != 'password']
+
+
+def _cache_entry(user, token):
+    """Plain values for a cached token: user fields and the token's creation time"""
+    return {name: getattr(user, name) for name in _user_fields()}, token.created
+
+
+def _from_cache_entry(key, entry, token_model):
+    """Rebuild (user, token) from _cache_entry values without a query"""
+    user_model = get_user_model()
+    values, created = entry
+    user = user_model.from_db(router.db_for_read(user_model), list(values), list(values.values()))
+    token = token_model(key=key, user=user, created=created)
+    token._state.adding = False
+    return user, token
+
+
+def _increment(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+async def _aincrement(key):
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aset(key, 1, None)
+
+
+def get_token_cache_stats():
+    """Hit/miss counters; every hit is one Token + User query saved"""
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'queries_saved': hits,
+        'hit_rate': round(hits / total, 4) if total else None,
+    }
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that caches token -> user lookups for a short TTL.
+
+    Only the user's field values are cached, never the password hash or a
+    model instance, so group and permission checks still read the database.
+    Entries are dropped when the token is deleted (logout) or the user is
+    saved or deleted, see accounts/signals.py.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            _increment(HITS_KEY)
+            user, token = _from_cache_entry(key, cached, self.get_model())
+            if not user.is_active:
+                raise exceptions.AuthenticationFailed('User inactive or deleted.')
+            return user, token
+
+        _increment(MISSES_KEY)
+        user, token = super().authenticate_credentials(key)
+        cache.set(cache_key, _cache_entry(user, token), settings.AUTH_TOKEN_CACHE_SECONDS)
+        return user, token
+
+    async def aauthenticate(self, request):
+        """
+        Async version of authenticate() for plain Django async views.
+
+        Returns (user, token) or None when no token header is sent; raises
+        AuthenticationFailed for a bad or unknown token.
+        """
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+
+        cache_key = token_cache_key(key)
+        cached = await cache.aget(cache_key)
+        if cached is not None:
+            await _aincrement(HITS_KEY)
+            user, token = _from_cache_entry(key, cached, self.get_model())
+        else:
+            await _aincrement(MISSES_KEY)
+            model = self.get_model()
+            try:
+                token = await model.objects.select_related('user').aget(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            user = token.user
+            if user.is_active:
+                await cache.aset(cache_key, _cache_entry(user, token), settings.AUTH_TOKEN_CACHE_SECONDS)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        return user, token
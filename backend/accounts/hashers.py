@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2id with cost parameters taken from settings.
+
+    Hashes keep the "argon2" algorithm name, so they stay readable by
+    Django's own hasher. When the parameters change, must_update() notices
+    and check_password() re-hashes the password on the next login.
+    """
+
+    @property
+    def time_cost(self):
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.ARGON2_PARALLELISM
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 with the iteration count taken from settings"""
+
+    @property
+    def iterations(self):
+        return settings.PBKDF2_ITERATIONS or PBKDF2PasswordHasher.iterations
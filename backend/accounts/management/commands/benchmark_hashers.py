@@ -0,0 +1,74 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.utils.module_loading import import_string
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from accounts.throttling import LoginIPThrottle
+
+PASSWORD = 'correct horse battery staple'
+# TEST-NET address, so the throttle benchmark never touches a real client's counter
+BENCHMARK_IP = '192.0.2.1'
+
+
+class Command(BaseCommand):
+    help = 'Measure the CPU cost of one login password check for each hasher, and of a throttled attempt'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=10, help='Password checks per hasher')
+
+    def handle(self, *args, **options):
+        rounds = options['rounds']
+        hashers = [('pbkdf2 (Django default)', PBKDF2PasswordHasher())]
+        for name, path in settings.PASSWORD_HASHER_CHOICES.items():
+            label = f'{name} (configured)' if name == settings.PASSWORD_HASHER else name
+            hashers.append((label, import_string(path)()))
+
+        self.stdout.write(f'{"hasher":<26}{"cpu ms/login":>14}{"wall ms/login":>15}{"logins/s/core":>15}')
+        baseline = None
+        for label, hasher in hashers:
+            try:
+                encoded = hasher.encode(PASSWORD, hasher.salt())
+            except ValueError as e:
+                # Missing optional library (argon2-cffi, bcrypt)
+                self.stdout.write(f'{label:<26}  unavailable: {e}')
+                continue
+            cpu, wall = self._measure(lambda: hasher.verify(PASSWORD, encoded), rounds)
+            baseline = baseline or cpu
+            self.stdout.write(
+                f'{label:<26}{cpu * 1000:>14.2f}{wall * 1000:>15.2f}{1 / cpu:>15.1f}'
+                f'   x{baseline / cpu:.1f}'
+            )
+
+        cpu, wall = self._measure_throttled(rounds * 100)
+        self.stdout.write(f'{"throttled attempt":<26}{cpu * 1000:>14.3f}{wall * 1000:>15.3f}{1 / cpu:>15.1f}')
+
+    def _measure(self, func, rounds):
+        """Mean CPU and wall seconds per call"""
+        func()
+        cpu_started, wall_started = time.process_time(), time.perf_counter()
+        for _ in range(rounds):
+            func()
+        return (
+            (time.process_time() - cpu_started) / rounds,
+            (time.perf_counter() - wall_started) / rounds,
+        )
+
+    def _measure_throttled(self, rounds):
+        """Cost of rejecting an attempt once the per-IP limit is reached"""
+        request = Request(APIRequestFactory().post(
+            '/api/auth/login/', {'email': 'nobody@example.com', 'password': PASSWORD},
+            REMOTE_ADDR=BENCHMARK_IP,
+        ))
+        with override_settings(LOGIN_THROTTLE_IP_RATE='1/min'):
+            first = LoginIPThrottle()
+            first.allow_request(request, None)
+            try:
+                return self._measure(lambda: LoginIPThrottle().allow_request(request, None), rounds)
+            finally:
+                cache.delete(first.key)
@@ -0,0 +1,49 @@
+from django.db import migrations
+
+SEARCH_COLUMNS = ('email', 'first_name', 'last_name')
+
+
+def index_name(column):
+    return f'user_{column}_prefix_idx'
+
+
+def create_prefix_indexes(apps, schema_editor):
+    # Indexes usable by the istartswith search in the admin user list
+    User = apps.get_model('accounts', 'User')
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'postgresql':
+        # istartswith is UPPER(col) LIKE UPPER('x%'); pattern ops make that an index range
+        from django.contrib.postgres.indexes import OpClass
+        from django.db.models import Index
+        from django.db.models.functions import Upper
+
+        for column in SEARCH_COLUMNS:
+            schema_editor.add_index(
+                User, Index(OpClass(Upper(column), name='text_pattern_ops'), name=index_name(column))
+            )
+
+    elif vendor == 'sqlite':
+        # SQLite's LIKE is case-insensitive and only uses NOCASE indexes
+        for column in SEARCH_COLUMNS:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {index_name(column)} '
+                f'ON accounts_user ({column} COLLATE NOCASE)'
+            )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor in ('postgresql', 'sqlite'):
+        for column in SEARCH_COLUMNS:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {index_name(column)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_admin_list_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Upper
 
 
 class User(AbstractUser):
@@ -20,3 +21,10 @@ class User(AbstractUser):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Admin user list: newest first, filtered by state/city (case-insensitive)
+            models.Index(fields=['-date_joined', '-id'], name='user_date_joined_idx'),
+            models.Index(Upper('state'), name='user_state_upper_idx'),
+            models.Index(Upper('city'), name='user_city_upper_idx'),
+            # Prefix indexes for the email/name search are per database (migration 0003)
+        ]
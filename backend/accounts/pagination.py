@@ -0,0 +1,54 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor that was not issued by us"""
+
+
+def encode_cursor(user):
+    """Opaque cursor pointing just after a user in (-date_joined, -id) order"""
+    payload = json.dumps(
+        {'d': user.date_joined.isoformat(), 'i': user.id},
+        separators=(',', ':'),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        date_joined = parse_datetime(payload['d'])
+        if date_joined is None:
+            raise ValueError(payload['d'])
+        return date_joined, int(payload['i'])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def get_page_size(request):
+    """Read ?page_size=, falling back to the default and capping at the max"""
+    try:
+        page_size = int(request.GET.get('page_size', settings.USERS_PAGE_SIZE))
+    except ValueError:
+        page_size = settings.USERS_PAGE_SIZE
+    return max(1, min(page_size, settings.USERS_MAX_PAGE_SIZE))
+
+
+def paginate_users(users, cursor=None, page_size=None):
+    """One page of users, newest first, plus the cursor for the next page"""
+    page_size = page_size or settings.USERS_PAGE_SIZE
+    if cursor:
+        date_joined, user_id = decode_cursor(cursor)
+        users = users.filter(
+            Q(date_joined__lt=date_joined) | Q(date_joined=date_joined, id__lt=user_id)
+        )
+    rows = list(users.order_by('-date_joined', '-id')[:page_size + 1])
+    next_cursor = encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    return rows[:page_size], next_cursor
@@ -1,3 +1,204 @@
-from django.test import TestCase
+import csv
+import io
+from datetime import timedelta
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authtoken.models import Token
+
+from .authentication import CachedTokenAuthentication, token_cache_key
+from .models import User
+from .throttling import LoginIPThrottle
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='ada@example.com', username='ada', password='s3cret-pass',
+            first_name='Ada', last_name='Obi',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def test_cache_entry_holds_no_password(self):
+        self.auth.authenticate_credentials(self.token.key)
+        values, created = cache.get(token_cache_key(self.token.key))
+        self.assertNotIn('password', values)
+        self.assertEqual(values['email'], 'ada@example.com')
+        self.assertEqual(created, self.token.created)
+
+    def test_cache_hit_needs_no_query(self):
+        self.auth.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(token.key, self.token.key)
+        # The hash is only loaded on demand
+        self.assertIn('password', user.get_deferred_fields())
+
+    def test_deactivated_user_is_rejected(self):
+        self.auth.authenticate_credentials(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(cache.get(token_cache_key(self.token.key)))
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_deleted_token_is_rejected(self):
+        key = self.token.key
+        self.auth.authenticate_credentials(key)
+        self.token.delete()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.auth.authenticate_credentials(key)
+
+    def test_async_authentication_shares_the_cache(self):
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        user, _ = async_to_sync(self.auth.aauthenticate)(request)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertIsNotNone(cache.get(token_cache_key(self.token.key)))
+        with self.assertNumQueries(0):
+            user, _ = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(user.email, 'ada@example.com')
+
+
+class UserListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        admin = User.objects.create_user(
+            email='admin@example.com', username='admin', password='s3cret-pass',
+            first_name='Admin', last_name='User', is_staff=True,
+        )
+        cls.token = Token.objects.create(user=admin)
+        now = timezone.now()
+        people = [
+            ('ada@example.com', 'Ada', 'Obi', 'Lagos', 'Ikeja'),
+            ('chidi@example.com', 'Chidi', 'Eze', 'Enugu', 'Nsukka'),
+            ('bola@example.com', 'Bola', 'Ade', 'lagos', 'Lekki'),
+            ('adaeze@example.com', 'Adaeze', 'Okafor', 'Anambra', 'Awka'),
+            ('musa@example.com', 'Musa', 'Bello', 'Kano', 'Kano'),
+        ]
+        for days, (email, first_name, last_name, state, city) in enumerate(people, start=1):
+            user = User.objects.create_user(
+                email=email, username=email.split('@')[0], password='s3cret-pass',
+                first_name=first_name, last_name=last_name, state=state, city=city,
+            )
+            User.objects.filter(pk=user.pk).update(date_joined=now - timedelta(days=days))
+        cls.newest_first = list(User.objects.order_by('-date_joined', '-id').values_list('email', flat=True))
+
+    def get(self, **params):
+        return self.client.get(
+            '/api/auth/users/', params, secure=True, headers={'Authorization': f'Token {self.token.key}'},
+        )
+
+    def emails(self, **params):
+        return sorted(user['email'] for user in self.get(page_size=50, **params).json()['users'])
+
+    def test_cursor_walk_is_newest_first(self):
+        emails, params = [], {'page_size': 2}
+        while True:
+            data = self.get(**params).json()
+            emails += [user['email'] for user in data['users']]
+            if not data['next']:
+                break
+            params['cursor'] = data['next']
+        self.assertEqual(emails, self.newest_first)
+
+    def test_filters(self):
+        self.assertEqual(self.emails(state='LAGOS'), ['ada@example.com', 'bola@example.com'])
+        self.assertEqual(self.emails(city='kano'), ['musa@example.com'])
+        self.assertEqual(self.emails(search='ada'), ['ada@example.com', 'adaeze@example.com'])
+        self.assertEqual(self.emails(search='ada ok'), ['adaeze@example.com'])
+        joined_after = (timezone.now() - timedelta(days=2, hours=12)).isoformat()
+        self.assertEqual(
+            self.emails(joined_after=joined_after),
+            ['ada@example.com', 'admin@example.com', 'chidi@example.com'],
+        )
+
+    def test_stats_and_legacy_shape(self):
+        data = self.get(page_size=1, state='lagos', include_stats=1).json()
+        self.assertEqual(data['stats'], {'total': 2, 'recent': 2})
+        legacy = self.client.get(
+            '/api/auth/users/', secure=True, headers={'Authorization': f'Token {self.token.key}'},
+        ).json()
+        self.assertEqual(legacy['count'], 6)
+
+    def test_bad_parameters(self):
+        self.assertEqual(self.get(cursor='garbage!').status_code, 400)
+        self.assertEqual(self.get(joined_after='yesterday').status_code, 400)
+
+    def test_csv_export_streams_the_filtered_users(self):
+        response = self.get(export='csv', state='lagos')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="users.csv"')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['email'] for row in rows], ['ada@example.com', 'bola@example.com'])
+        self.assertNotIn('password', rows[0])
+
+    def test_admin_only(self):
+        user = User.objects.get(email='ada@example.com')
+        token = Token.objects.create(user=user)
+        response = self.client.get(
+            '/api/auth/users/', secure=True, headers={'Authorization': f'Token {token.key}'},
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class LoginTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='ada@example.com', username='ada', password='s3cret-pass',
+            first_name='Ada', last_name='Obi',
+        )
+
+    def login(self, password='wrong', email='ada@example.com', ip='203.0.113.7'):
+        return self.client.post(
+            '/api/auth/login/', {'email': email, 'password': password}, secure=True, REMOTE_ADDR=ip,
+        ).status_code
+
+    def test_forwarded_for_is_ignored_without_proxies(self):
+        request = RequestFactory().post(
+            '/api/auth/login/', REMOTE_ADDR='203.0.113.7', HTTP_X_FORWARDED_FOR='198.51.100.1',
+        )
+        self.assertEqual(LoginIPThrottle().get_ident(request), '203.0.113.7')
+
+    @override_settings(LOGIN_THROTTLE_IP_RATE='2/min', LOGIN_THROTTLE_EMAIL_RATE=None)
+    def test_attempts_are_throttled_per_ip(self):
+        statuses = [self.login(email=f'user{n}@example.com') for n in range(3)]
+        self.assertEqual(statuses, [401, 401, 429])
+        # Spoofed X-Forwarded-For headers do not buy more attempts
+        status = self.client.post(
+            '/api/auth/login/', {'email': 'ada@example.com', 'password': 'wrong'}, secure=True,
+            REMOTE_ADDR='203.0.113.7', HTTP_X_FORWARDED_FOR='198.51.100.9',
+        ).status_code
+        self.assertEqual(status, 429)
+        self.assertEqual(self.login(ip='203.0.113.8'), 401)
+
+    @override_settings(LOGIN_THROTTLE_IP_RATE=None, LOGIN_THROTTLE_EMAIL_RATE='2/min')
+    def test_attempts_are_throttled_per_email(self):
+        statuses = [self.login(email=' ADA@example.com', ip=f'203.0.113.{n}') for n in range(3)]
+        self.assertEqual(statuses[2], 429)
+        self.assertEqual(self.login(email='someone@example.com'), 401)
+
+    @override_settings(LOGIN_THROTTLE_IP_RATE=None, LOGIN_THROTTLE_EMAIL_RATE=None)
+    def test_throttles_can_be_turned_off(self):
+        self.assertEqual({self.login() for _ in range(30)}, {401})
+
+    def test_old_hashes_are_upgraded_on_login(self):
+        User.objects.filter(pk=self.user.pk).update(
+            password=make_password('s3cret-pass', hasher='pbkdf2_sha256'),
+        )
+        self.assertEqual(self.login('s3cret-pass'), 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('argon2$argon2id$'))
+        self.assertIn('t=2,p=1', self.user.password)
+
+    @override_settings(ARGON2_TIME_COST=3)
+    def test_cost_changes_rehash_on_login(self):
+        self.assertEqual(self.login('s3cret-pass'), 200)
+        self.user.refresh_from_db()
+        self.assertIn('t=3,p=1', self.user.password)
@@ -0,0 +1,39 @@
+import hashlib
+
+from django.conf import settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LoginIPThrottle(SimpleRateThrottle):
+    """
+    Login attempts per client IP.
+
+    Throttles run before the view, so rejected attempts never reach the
+    user lookup or the password hash. Rates are read from settings on every
+    request (LOGIN_THROTTLE_IP_RATE, None disables the throttle).
+    """
+    scope = 'login_ip'
+
+    def get_rate(self):
+        return settings.LOGIN_THROTTLE_IP_RATE
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LoginEmailThrottle(SimpleRateThrottle):
+    """Login attempts per target email, whatever IPs they come from"""
+    scope = 'login_email'
+
+    def get_rate(self):
+        return settings.LOGIN_THROTTLE_EMAIL_RATE
+
+    def get_cache_key(self, request, view):
+        try:
+            email = request.data.get('email')
+        except AttributeError:
+            return None
+        if not isinstance(email, str) or not email.strip():
+            return None
+        ident = hashlib.sha256(email.strip().lower().encode()).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
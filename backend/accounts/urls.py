@@ -7,4 +7,5 @@ urlpatterns = [
     path('logout/', views.logout_user, name='logout'),
     path('user/', views.get_current_user, name='current-user'),
     path('users/', views.get_all_users, name='all-users'),
+    path('auth-cache-stats/', views.get_auth_cache_stats, name='auth-cache-stats'),
 ]
@@ -1,13 +1,30 @@
+import csv
+import io
+from datetime import datetime, time, timedelta
+
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate, get_user_model
+from django.db.models import Count, Q, Value
+from django.db.models.functions import Upper
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .authentication import get_token_cache_stats, invalidate_token
+from .pagination import InvalidCursor, get_page_size, paginate_users
 from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserSerializer
+from .throttling import LoginEmailThrottle, LoginIPThrottle
 
 User = get_user_model()
 
+USER_EXPORT_FIELDS = (
+    'id', 'email', 'username', 'first_name', 'last_name',
+    'phone_number', 'state', 'city', 'date_joined', 'is_active', 'is_staff',
+)
+
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -27,8 +44,9 @@ def register_user(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([LoginIPThrottle, LoginEmailThrottle])
 def login_user(request):
-    """Login user and return token"""
+    """Login user and return token (throttled per IP and per email before any hashing)"""
     serializer = UserLoginSerializer(data=request.data)
     if serializer.is_valid():
         email = serializer.validated_data['email']
@@ -63,6 +81,7 @@ def login_user(request):
 def logout_user(request):
     """Logout user by deleting token"""
     try:
+        invalidate_token(request.user.auth_token.key)
         request.user.auth_token.delete()
         return Response({
             'message': 'Logout successful'
@@ -81,13 +100,122 @@ def get_current_user(request):
     return Response(serializer.data)
 
 
+def _parse_moment(value):
+    """Parse an ISO date or datetime into an aware datetime (None if invalid)"""
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            moment = datetime.combine(day, time.min) if day else None
+    except ValueError:
+        return None
+    if moment is not None and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _filter_users(request):
+    """Apply ?state=, ?city=, ?joined_after=, ?joined_before= and ?search= to the user list"""
+    users = User.objects.all()
+    
+    # Case-insensitive as UPPER(col) = UPPER(value), so the Upper() indexes are
+    # used (iexact compiles to LIKE on SQLite, which cannot use them)
+    for field in ('state', 'city'):
+        value = request.GET.get(field)
+        if value:
+            users = users.alias(**{f'{field}_upper': Upper(field)}).filter(
+                **{f'{field}_upper': Upper(Value(value))}
+            )
+    
+    for param, lookup in (('joined_after', 'date_joined__gte'), ('joined_before', 'date_joined__lt')):
+        value = request.GET.get(param)
+        if value:
+            moment = _parse_moment(value)
+            if moment is None:
+                raise ValueError(f'{param} must be an ISO date or datetime')
+            users = users.filter(**{lookup: moment})
+    
+    # Prefix search on email and names ("ada lov" matches first + last name)
+    search = request.GET.get('search', '').strip()
+    if search:
+        terms = search.split()
+        query = (
+            Q(email__istartswith=search)
+            | Q(first_name__istartswith=search)
+            | Q(last_name__istartswith=search)
+        )
+        if len(terms) == 2:
+            query |= Q(first_name__istartswith=terms[0], last_name__istartswith=terms[1])
+        users = users.filter(query)
+    
+    return users
+
+
+def _stream_users_csv(users):
+    """Yield the filtered users as CSV rows without loading them all at once"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(USER_EXPORT_FIELDS)
+    rows = users.order_by('-date_joined', '-id').values_list(*USER_EXPORT_FIELDS)
+    for row in rows.iterator(chunk_size=2000):
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def get_all_users(request):
-    """Get all registered users (admin only)"""
-    users = User.objects.all()
-    serializer = UserSerializer(users, many=True)
-    return Response({
-        'count': users.count(),
-        'users': serializer.data
-    })
+    """Get registered users, paginated and filterable (admin only)"""
+    try:
+        users = _filter_users(request)
+    except ValueError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Streaming CSV export of the filtered set
+    if request.GET.get('export') == 'csv':
+        response = StreamingHttpResponse(_stream_users_csv(users), content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="users.csv"'
+        return response
+    
+    # Legacy shape: every user plus a count
+    if 'cursor' not in request.GET and 'page_size' not in request.GET:
+        serializer = UserSerializer(users, many=True)
+        return Response({
+            'count': users.count(),
+            'users': serializer.data
+        })
+    
+    page_size = get_page_size(request)
+    try:
+        rows, next_cursor = paginate_users(
+            users, cursor=request.GET.get('cursor'), page_size=page_size
+        )
+    except InvalidCursor as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    data = {
+        'users': UserSerializer(rows, many=True).data,
+        'next': next_cursor,
+        'page_size': page_size,
+    }
+    if request.GET.get('include_stats') in ('1', 'true'):
+        recent_since = timezone.now() - timedelta(days=30)
+        data['stats'] = users.aggregate(
+            total=Count('id'),
+            recent=Count('id', filter=Q(date_joined__gt=recent_since)),
+        )
+    return Response(data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def get_auth_cache_stats(request):
+    """Token cache hit/miss counters and auth queries saved (admin only)"""
+    return Response(get_token_cache_stats())
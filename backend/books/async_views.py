@@ -0,0 +1,179 @@
+"""
+Async versions of the read-heavy catalog views.
+
+They are routed instead of the DRF views when BOOKS_ASYNC_VIEWS is on, which
+only pays off under an ASGI server (see novelia_project/asgi.py): while a
+request waits on the database or the cache, the worker keeps serving others.
+Responses, cache entries and ETags are the same as the sync views'.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+
+from accounts.authentication import CachedTokenAuthentication
+from .cache import acached_catalog_data
+from .models import Book
+from .pagination import InvalidCursor, aget_cached_count, apaginate_books, get_page_size
+from .serializers import BookSerializer, select_book_fields, serialize_book_rows
+from .signing import build_signed_url
+from .streaming import local_pdf_path, stream_pdf
+from .views import _filter_books, _wants_legacy_list
+
+
+def _json(data, status_code=status.HTTP_200_OK, headers=None):
+    # Same bytes as DRF's default JSON rendering
+    return HttpResponse(
+        JSONRenderer().render(data), content_type='application/json',
+        status=status_code, headers=headers,
+    )
+
+
+async def _conditional(request, etag, last_modified, build):
+    """What @condition does for the sync views, with validators computed by the caller"""
+    etag = quote_etag(etag) if etag else None
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = await build()
+    if timestamp and not response.has_header('Last-Modified'):
+        response.headers['Last-Modified'] = http_date(timestamp)
+    if etag and not response.has_header('ETag'):
+        response.headers['ETag'] = etag
+    return response
+
+
+async def _afilter_books(request):
+    # Search runs its full-text query while building the queryset, so it
+    # needs a thread; the other filters are lazy
+    if request.GET.get('search'):
+        return await sync_to_async(_filter_books)(request)
+    return _filter_books(request)
+
+
+async def _list_validators(books):
+    stats = await books.order_by().aaggregate(last_updated=Max('updated_at'), total=Count('id'))
+    last_modified = stats['last_updated']
+    etag = None
+    if last_modified is not None:
+        etag = f'{stats["total"]}-{last_modified.timestamp():.6f}'
+    return etag, last_modified
+
+
+@require_safe
+async def get_books(request):
+    """Async get_books: same parameters and response shapes"""
+    books, truncated = await _afilter_books(request)
+    etag, last_modified = await _list_validators(books)
+
+    async def compute():
+        search = request.GET.get('search')
+        try:
+            fields = select_book_fields(
+                request.GET.get('fields'),
+                request.GET.get('exclude'),
+                compact=request.GET.get('view') == 'compact',
+            )
+        except ValueError as e:
+            return {'error': str(e)}, status.HTTP_400_BAD_REQUEST
+
+        if _wants_legacy_list(request):
+            rows = [row async for row in books.values(*fields)]
+            data = {'count': len(rows), 'books': serialize_book_rows(rows, fields)}
+            if search:
+                data['truncated'] = truncated
+            return data, status.HTTP_200_OK
+
+        page_size = get_page_size(request)
+        try:
+            rows, next_cursor, previous_cursor = await apaginate_books(
+                books.only(*{'title', *fields}), cursor=request.GET.get('cursor'), page_size=page_size,
+                ranked=bool(search),
+            )
+        except InvalidCursor as e:
+            return {'error': str(e)}, status.HTTP_400_BAD_REQUEST
+
+        data = {
+            'books': serialize_book_rows(rows, fields),
+            'next': next_cursor,
+            'previous': previous_cursor,
+            'page_size': page_size,
+        }
+        if search:
+            data['truncated'] = truncated
+        if request.GET.get('include_count') in ('1', 'true'):
+            data['count'] = await aget_cached_count(books, {
+                'search': search,
+                'genre': request.GET.get('genre'),
+                'author': request.GET.get('author'),
+            })
+        return data, status.HTTP_200_OK
+
+    async def build():
+        return _json(*await acached_catalog_data('list', request, {}, compute))
+
+    return await _conditional(request, etag, last_modified, build)
+
+
+@require_safe
+async def get_book(request, book_id):
+    """Async get_book"""
+    updated_at = await Book.objects.filter(id=book_id).values_list('updated_at', flat=True).afirst()
+    etag = f'{book_id}-{updated_at.timestamp():.6f}' if updated_at else None
+
+    async def compute():
+        try:
+            book = await Book.objects.aget(id=book_id)
+        except Book.DoesNotExist:
+            return {'error': 'Book not found'}, status.HTTP_404_NOT_FOUND
+        return BookSerializer(book).data, status.HTTP_200_OK
+
+    async def build():
+        return _json(*await acached_catalog_data('detail', request, {'book_id': book_id}, compute))
+
+    return await _conditional(request, etag, updated_at, build)
+
+
+async def _authenticated_user(request):
+    """Token (cached) or session user, mirroring the DRF authentication classes"""
+    result = await CachedTokenAuthentication().aauthenticate(request)
+    if result is not None:
+        return result[0]
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+@require_safe
+async def download_book(request, book_id):
+    """Async download_book (authenticated users only)"""
+    unauthorized = {'WWW-Authenticate': CachedTokenAuthentication.keyword}
+    try:
+        user = await _authenticated_user(request)
+    except exceptions.AuthenticationFailed as e:
+        return _json({'detail': e.detail}, status.HTTP_401_UNAUTHORIZED, unauthorized)
+    if user is None:
+        return _json(
+            {'detail': exceptions.NotAuthenticated.default_detail},
+            status.HTTP_401_UNAUTHORIZED, unauthorized,
+        )
+
+    try:
+        book = await Book.objects.only('title', 'pdf_file').aget(id=book_id)
+    except Book.DoesNotExist:
+        return _json({'error': 'Book not found'}, status.HTTP_404_NOT_FOUND)
+    if not book.pdf_file:
+        return _json({'error': 'PDF file not available for this book'}, status.HTTP_404_NOT_FOUND)
+
+    pdf_path = local_pdf_path(book.pdf_file)
+    if pdf_path is not None:
+        if settings.PDF_SIGNED_URLS and request.GET.get('stream') not in ('1', 'true'):
+            download_url, expires = build_signed_url(request, pdf_path)
+            return _json({'download_url': download_url, 'expires': expires})
+        return stream_pdf(request, pdf_path, f'{book.title}.pdf')
+
+    return _json({'download_url': book.pdf_file})
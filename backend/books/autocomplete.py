@@ -0,0 +1,123 @@
+"""
+Typeahead suggestions for the books search box.
+
+Each process keeps a prefix index of book titles and author names in sorted
+lists searched with bisect: one of the whole folded names, one of every
+name's later words (so "fall" finds "Things Fall Apart"). It is built on
+first use and rebuilt in the background when the catalog version changes.
+"""
+import bisect
+import threading
+import unicodedata
+from array import array
+
+from django.db import connection
+
+from .cache import get_catalog_version
+from .models import Book
+
+
+def fold(text):
+    """Case- and accent-insensitive form of text: 'Chínua  ACHEBE' -> 'chinua achebe'"""
+    text = text or ''
+    if text.isascii():
+        return ' '.join(text.lower().split())
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ' '.join(''.join(c for c in decomposed if not unicodedata.combining(c)).split())
+
+
+class _SortedKeys:
+    """Sorted folded keys, each pointing at a suggestion by position"""
+
+    def __init__(self, entries):
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.refs = array('l', (ref for _, ref in entries))
+
+    def matches(self, prefix):
+        position = bisect.bisect_left(self.keys, prefix)
+        keys = self.keys
+        while position < len(keys) and keys[position].startswith(prefix):
+            yield self.refs[position]
+            position += 1
+
+
+class AutocompleteIndex:
+    def __init__(self, version, rows):
+        self.version = version
+        self.suggestions = []
+        names, words = [], []
+        authors = set()
+
+        def add(suggestion, folded):
+            if not folded:
+                return
+            ref = len(self.suggestions)
+            self.suggestions.append(suggestion)
+            names.append((folded, ref))
+            parts = folded.split(' ')
+            for start in range(1, len(parts)):
+                words.append((' '.join(parts[start:]), ref))
+
+        for book_id, title, author, author_slug in rows:
+            add({'type': 'title', 'text': title, 'book_id': book_id}, fold(title))
+            folded = fold(author)
+            if folded not in authors:
+                authors.add(folded)
+                add({'type': 'author', 'text': author, 'slug': author_slug}, folded)
+
+        self.names = _SortedKeys(names)
+        self.words = _SortedKeys(words)
+
+    def suggest(self, query, limit):
+        """Up to limit suggestions: whole-name prefix matches first, then later-word matches"""
+        prefix = fold(query)
+        if not prefix:
+            return []
+        found = []
+        seen = set()
+        for keys in (self.names, self.words):
+            for ref in keys.matches(prefix):
+                if ref not in seen:
+                    seen.add(ref)
+                    found.append(self.suggestions[ref])
+                    if len(found) >= limit:
+                        return found
+        return found
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def _build(version):
+    global _index
+    rows = Book.objects.values_list('id', 'title', 'author', 'author_ref__slug')
+    _index = AutocompleteIndex(version, rows.iterator(chunk_size=5000))
+
+
+def _rebuild(version):
+    try:
+        _build(version)
+    finally:
+        connection.close()
+        _lock.release()
+
+
+def get_autocomplete_index():
+    """
+    This process's index, built on first use.
+
+    After a catalog change the previous index keeps answering while a
+    background thread builds the new one, so no request waits for a rebuild.
+    """
+    version = get_catalog_version()
+    index = _index
+    if index is None:
+        with _lock:
+            if _index is None:
+                _build(version)
+        return _index
+    if index.version != version and _lock.acquire(blocking=False):
+        threading.Thread(target=_rebuild, args=(version,), daemon=True).start()
+    return index
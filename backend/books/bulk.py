@@ -0,0 +1,207 @@
+import csv
+import io
+import json
+
+from django.db import transaction
+from django.utils import timezone
+
+from jobs.queue import enqueue
+
+from .cache import bump_catalog_version
+from .facets import assign_catalog_refs, recount_catalog_refs
+from .models import Book
+from .search import index_books
+from .serializers import BookCreateSerializer
+
+IMPORT_FIELDS = ('title', 'author', 'genre', 'description', 'cover_image', 'pdf_file')
+EXPORT_FIELDS = ('id',) + IMPORT_FIELDS + ('created_at', 'updated_at')
+FORMATS = ('csv', 'jsonl')
+
+
+class ImportFormatError(ValueError):
+    """Raised when the import type is unknown"""
+
+
+def detect_format(name='', content_type='', default='csv'):
+    """Guess csv/jsonl from a file name or content type"""
+    name = (name or '').lower()
+    content_type = (content_type or '').lower()
+    if name.endswith(('.jsonl', '.ndjson')) or 'ndjson' in content_type or 'jsonl' in content_type:
+        return 'jsonl'
+    if name.endswith('.csv') or 'csv' in content_type:
+        return 'csv'
+    return default
+
+
+def iter_rows(stream, fmt):
+    """
+    Yield (row number, row dict or None, error) from a text stream.
+
+    Rows are read lazily so large files never have to fit in memory. A file
+    that stops being readable (not UTF-8, broken CSV quoting) ends with an
+    error for the row it failed on instead of raising.
+    """
+    number = 0
+    try:
+        for number, row, error in _parse_rows(stream, fmt):
+            yield number, row, error
+    except UnicodeDecodeError:
+        yield number + 1, None, {'non_field_errors': [
+            'Not valid UTF-8 text; the rest of the file was not read'
+        ]}
+    except csv.Error as e:
+        yield number + 1, None, {'non_field_errors': [
+            f'Malformed CSV ({e}); the rest of the file was not read'
+        ]}
+
+
+def _parse_rows(stream, fmt):
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for number, row in enumerate(reader, start=1):
+            yield number, row, None
+    elif fmt == 'jsonl':
+        for number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield number, None, {'non_field_errors': [f'Invalid JSON: {e}']}
+                continue
+            if not isinstance(row, dict):
+                yield number, None, {'non_field_errors': ['Each line must be a JSON object']}
+                continue
+            yield number, row, None
+    else:
+        raise ImportFormatError(f'Unsupported format "{fmt}", use one of: {", ".join(FORMATS)}')
+
+
+def open_text(binary_file):
+    """Wrap an uploaded (binary) file for line-by-line text reading"""
+    return io.TextIOWrapper(binary_file, encoding='utf-8-sig', newline='')
+
+
+def import_books(rows, batch_size=500, dry_run=False):
+    """
+    Validate and write rows in chunks, one transaction per chunk.
+
+    Rows with an "id" update that book; all others are created. Returns a
+    summary with per-row errors instead of stopping at the first bad row.
+    """
+    summary = {'rows': 0, 'created': 0, 'updated': 0, 'errors': []}
+    batch = []
+    for number, row, error in rows:
+        summary['rows'] += 1
+        if error:
+            summary['errors'].append({'row': number, 'errors': error})
+            continue
+        batch.append((number, row))
+        if len(batch) >= batch_size:
+            _import_batch(batch, summary, dry_run)
+            batch = []
+    if batch:
+        _import_batch(batch, summary, dry_run)
+    summary['errors'].sort(key=lambda error: error['row'])
+
+    if not dry_run and (summary['created'] or summary['updated']):
+        bump_catalog_version()
+        # One batch recompute instead of a refresh per imported book
+        enqueue('books.rebuild_similar', key='books.rebuild_similar')
+    return summary
+
+
+def _import_batch(batch, summary, dry_run):
+    ids = [int(row['id']) for _, row in batch if str(row.get('id', '')).isdigit()]
+    existing = Book.objects.in_bulk(ids)
+
+    to_create = []
+    to_update = []
+    pdf_changed = []
+    cover_changed = []
+    previous_authors = {book.author_ref_id for book in existing.values()}
+    previous_genres = {book.genre_ref_id for book in existing.values()}
+    for number, row in batch:
+        book_id = row.get('id')
+        data = {field: row[field] for field in IMPORT_FIELDS if field in row}
+        if book_id not in (None, ''):
+            book = existing.get(int(book_id)) if str(book_id).isdigit() else None
+            if book is None:
+                summary['errors'].append({'row': number, 'errors': {'id': [f'Book {book_id} not found']}})
+                continue
+            serializer = BookCreateSerializer(book, data=data, partial=True)
+            if not serializer.is_valid():
+                summary['errors'].append({'row': number, 'errors': serializer.errors})
+                continue
+            if serializer.validated_data.get('pdf_file', book.pdf_file) != book.pdf_file:
+                pdf_changed.append(book)
+            if serializer.validated_data.get('cover_image', book.cover_image) != book.cover_image:
+                cover_changed.append(book)
+            for field, value in serializer.validated_data.items():
+                setattr(book, field, value)
+            to_update.append(book)
+        else:
+            serializer = BookCreateSerializer(data=data)
+            if not serializer.is_valid():
+                summary['errors'].append({'row': number, 'errors': serializer.errors})
+                continue
+            to_create.append(Book(**serializer.validated_data))
+
+    if dry_run:
+        summary['created'] += len(to_create)
+        summary['updated'] += len(to_update)
+        return
+
+    # bulk_create/bulk_update skip save() and signals, so do their work here
+    with transaction.atomic():
+        # Stamped at write time, not when validation started (the change feed orders on it)
+        now = timezone.now()
+        for book in to_update:
+            book.updated_at = now
+        assign_catalog_refs(to_create + to_update)
+        created = Book.objects.bulk_create(to_create)
+        if to_update:
+            Book.objects.bulk_update(
+                to_update, IMPORT_FIELDS + ('author_ref', 'genre_ref', 'updated_at')
+            )
+        changed = created + to_update
+        recount_catalog_refs(
+            author_ids=previous_authors | {book.author_ref_id for book in changed},
+            genre_ids=previous_genres | {book.genre_ref_id for book in changed},
+        )
+        index_books(changed)
+        for book in cover_changed + [book for book in created if book.cover_image]:
+            enqueue(
+                'books.generate_thumbnails', {'book_id': book.pk},
+                key=f'books.generate_thumbnails:{book.pk}',
+            )
+        for book in pdf_changed + [book for book in created if book.pdf_file]:
+            enqueue(
+                'books.extract_pdf_metadata', {'book_id': book.pk},
+                key=f'books.extract_pdf_metadata:{book.pk}',
+            )
+    summary['created'] += len(created)
+    summary['updated'] += len(to_update)
+
+
+def export_books(fmt, chunk_size=1000):
+    """Yield the whole catalog as CSV or JSON Lines text, a row at a time"""
+    rows = Book.objects.order_by('id').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        for row in rows:
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    elif fmt == 'jsonl':
+        for row in rows:
+            record = dict(zip(EXPORT_FIELDS, row))
+            record['created_at'] = record['created_at'].isoformat()
+            record['updated_at'] = record['updated_at'].isoformat()
+            yield json.dumps(record) + '\n'
+    else:
+        raise ImportFormatError(f'Unsupported format "{fmt}", use one of: {", ".join(FORMATS)}')
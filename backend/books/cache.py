@@ -0,0 +1,145 @@
+import functools
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.response import Response
+
+CATALOG_VERSION_KEY = 'books:catalog-version'
+CATALOG_CHANGED_AT_KEY = 'books:catalog-changed-at'
+HITS_KEY = 'books:cache:hits'
+MISSES_KEY = 'books:cache:misses'
+
+
+def get_catalog_version():
+    """Current catalog version; every write to the catalog bumps it"""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, 1, None)
+        version = cache.get(CATALOG_VERSION_KEY, 1)
+    return version
+
+
+async def aget_catalog_version():
+    """Async version of get_catalog_version"""
+    version = await cache.aget(CATALOG_VERSION_KEY)
+    if version is None:
+        await cache.aadd(CATALOG_VERSION_KEY, 1, None)
+        version = await cache.aget(CATALOG_VERSION_KEY, 1)
+    return version
+
+
+def get_catalog_changed_at():
+    """When the catalog last changed in this cache, or None if unknown"""
+    return cache.get(CATALOG_CHANGED_AT_KEY)
+
+
+async def aget_catalog_changed_at():
+    return await cache.aget(CATALOG_CHANGED_AT_KEY)
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog response by moving to a new version"""
+    cache.set(CATALOG_CHANGED_AT_KEY, timezone.now(), None)
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        # Key evicted or never set: start again above any version we may have served
+        cache.set(CATALOG_VERSION_KEY, get_catalog_version() + 1, None)
+        return cache.get(CATALOG_VERSION_KEY)
+
+
+def _increment(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+async def _aincrement(key):
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aset(key, 1, None)
+
+
+def get_cache_stats():
+    """Hit/miss counters for the catalog cache"""
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total else None,
+        'catalog_version': get_catalog_version(),
+    }
+
+
+def _cache_key(name, request, kwargs, version):
+    params = urlencode(sorted(
+        (key, value)
+        for key, values in request.GET.lists()
+        for value in values
+    ))
+    path_args = urlencode(sorted(kwargs.items()))
+    digest = hashlib.md5(f'{path_args}?{params}'.encode()).hexdigest()
+    return f'books:{name}:v{version}:{digest}'
+
+
+def build_cache_key(name, request, kwargs):
+    """Key covering the endpoint, its URL kwargs, the query string and the catalog version"""
+    return _cache_key(name, request, kwargs, get_catalog_version())
+
+
+def cache_catalog_response(name):
+    """
+    Read-through cache for catalog read views.
+
+    Only successful response data is stored; it is re-rendered per request
+    so content negotiation still applies.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not settings.CATALOG_CACHE_ENABLED:
+                return view(request, *args, **kwargs)
+
+            key = build_cache_key(name, request, kwargs)
+            data = cache.get(key)
+            if data is not None:
+                _increment(HITS_KEY)
+                return Response(data)
+
+            _increment(MISSES_KEY)
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, settings.CATALOG_CACHE_SECONDS)
+            return response
+        return wrapper
+    return decorator
+
+
+async def acached_catalog_data(name, request, kwargs, compute):
+    """
+    Async counterpart of cache_catalog_response for the async views.
+
+    compute() is awaited on a miss and returns (data, status); keys match
+    the sync decorator, so both kinds of view share cached entries.
+    """
+    if not settings.CATALOG_CACHE_ENABLED:
+        return await compute()
+
+    key = _cache_key(name, request, kwargs, await aget_catalog_version())
+    data = await cache.aget(key)
+    if data is not None:
+        await _aincrement(HITS_KEY)
+        return data, 200
+
+    await _aincrement(MISSES_KEY)
+    data, status = await compute()
+    if status == 200:
+        await cache.aset(key, data, settings.CATALOG_CACHE_SECONDS)
+    return data, status
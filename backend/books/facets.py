@@ -0,0 +1,71 @@
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils.text import slugify
+
+from .models import Author, Book, Genre
+
+
+def catalog_slug(name):
+    """Slug used to match author/genre names regardless of case and spacing"""
+    return slugify(name or '', allow_unicode=True) or 'unknown'
+
+
+def _resolve(model, names):
+    """Map slug -> row for the given names, creating rows that do not exist yet"""
+    by_slug = {}
+    for name in names:
+        if name and name.strip():
+            by_slug.setdefault(catalog_slug(name), name.strip())
+    if not by_slug:
+        return {}
+    rows = {row.slug: row for row in model.objects.filter(slug__in=by_slug)}
+    missing = [model(name=name, slug=slug) for slug, name in by_slug.items() if slug not in rows]
+    if missing:
+        model.objects.bulk_create(missing, ignore_conflicts=True)
+        rows.update({
+            row.slug: row
+            for row in model.objects.filter(slug__in=[row.slug for row in missing])
+        })
+    return rows
+
+
+def assign_catalog_refs(books):
+    """Point each book's author_ref/genre_ref at the rows matching its strings"""
+    authors = _resolve(Author, {book.author for book in books})
+    genres = _resolve(Genre, {book.genre for book in books})
+    for book in books:
+        book.author_ref = authors.get(catalog_slug(book.author)) if book.author else None
+        book.genre_ref = genres.get(catalog_slug(book.genre)) if book.genre else None
+
+
+def _recount(model, field, ids):
+    ids = {pk for pk in ids if pk is not None}
+    if not ids:
+        return
+    count = Book.objects.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(
+        total=Count('id')
+    ).values('total')
+    model.objects.filter(pk__in=ids).update(
+        book_count=Coalesce(Subquery(count), Value(0))
+    )
+
+
+def recount_catalog_refs(author_ids=(), genre_ids=()):
+    """Refresh the denormalized book_count of the given authors and genres"""
+    _recount(Author, 'author_ref', author_ids)
+    _recount(Genre, 'genre_ref', genre_ids)
+
+
+def facet_rows(model):
+    """Name, slug and book count of every Genre or Author that has books"""
+    return [
+        {'name': name, 'slug': slug, 'count': count}
+        for name, slug, count in model.objects.filter(book_count__gt=0).values_list(
+            'name', 'slug', 'book_count'
+        )
+    ]
+
+
+def get_facets():
+    """Per-genre and per-author book counts, read from the counter columns"""
+    return {'genres': facet_rows(Genre), 'authors': facet_rows(Author)}
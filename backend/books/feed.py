@@ -0,0 +1,103 @@
+"""
+Catalog change feed for clients that keep the catalog offline.
+
+A cursor holds two keyset positions: (updated_at, id) in the books table and
+(deleted_at, id) in the DeletedBook tombstones. Each call returns what moved
+past those positions, so syncing costs O(changes) rather than O(catalog).
+"""
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Book, DeletedBook
+from .pagination import InvalidCursor
+
+
+class ExpiredCursor(InvalidCursor):
+    """Raised for cursors older than the tombstones we still keep"""
+
+
+def encode_feed_cursor(changed, deleted):
+    """Opaque cursor from the last (datetime, id) seen in each stream"""
+    payload = json.dumps(
+        {'u': changed[0].isoformat(), 'i': changed[1], 'd': deleted[0].isoformat(), 'j': deleted[1]},
+        separators=(',', ':'),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_feed_cursor(cursor):
+    """Turn a cursor back into ((updated_at, id), (deleted_at, id))"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (
+            (datetime.fromisoformat(payload['u']), int(payload['i'])),
+            (datetime.fromisoformat(payload['d']), int(payload['j'])),
+        )
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def _after(queryset, field, position, settled, limit):
+    """Rows past a (datetime, id) position and no newer than settled, in cursor order"""
+    moment, row_id = position
+    # A range plus an exclusion rather than "> moment OR (= moment AND id >)",
+    # so the (field, id) index is scanned in order with no sort
+    return list(
+        queryset.filter(**{f'{field}__gte': moment, f'{field}__lte': settled}).exclude(
+            **{field: moment, 'id__lte': row_id}
+        ).order_by(field, 'id')[:limit + 1]
+    )
+
+
+def get_changes(cursor=None, fields=('id',), page_size=None):
+    """
+    Books created or updated and ids deleted since cursor.
+
+    Returns (changed book rows, deleted ids, next cursor, has_more). Without
+    a cursor every book is returned (a full first sync), and deletes are
+    tracked from now on.
+    """
+    page_size = page_size or settings.BOOKS_FEED_PAGE_SIZE
+    now = timezone.now()
+    settled = now - timedelta(seconds=settings.BOOKS_FEED_LAG_SECONDS)
+    if cursor:
+        changed_at, deleted_at = decode_feed_cursor(cursor)
+        if deleted_at[0] < now - timedelta(days=settings.BOOKS_FEED_TOMBSTONE_DAYS):
+            raise ExpiredCursor('Cursor expired; sync again without one')
+    else:
+        oldest = datetime.min.replace(tzinfo=settled.tzinfo)
+        changed_at, deleted_at = (oldest, 0), (settled, 0)
+
+    books = _after(Book.objects.only(*{'updated_at', *fields}), 'updated_at', changed_at, settled, page_size)
+    tombstones = _after(DeletedBook.objects.all(), 'deleted_at', deleted_at, settled, page_size)
+    has_more = len(books) > page_size or len(tombstones) > page_size
+    books, tombstones = books[:page_size], tombstones[:page_size]
+
+    if books:
+        changed_at = (books[-1].updated_at, books[-1].id)
+    if tombstones:
+        deleted_at = (tombstones[-1].deleted_at, tombstones[-1].id)
+    else:
+        # No deletes up to settled, so later calls need not look back past it
+        deleted_at = max(deleted_at, (settled, 0))
+    return books, [row.book_id for row in tombstones], encode_feed_cursor(changed_at, deleted_at), has_more
+
+
+def record_tombstone(book_id):
+    """Note that a book was deleted (again, if its id was reused)"""
+    DeletedBook.objects.update_or_create(book_id=book_id, defaults={'deleted_at': timezone.now()})
+
+
+def purge_tombstones(days=None):
+    """Delete tombstones older than the retention; returns how many"""
+    days = settings.BOOKS_FEED_TOMBSTONE_DAYS if days is None else days
+    deleted, _ = DeletedBook.objects.filter(
+        deleted_at__lt=timezone.now() - timedelta(days=days)
+    ).delete()
+    return deleted
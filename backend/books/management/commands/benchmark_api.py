@@ -0,0 +1,295 @@
+import json
+import platform
+import random
+import statistics
+import time
+from contextlib import ExitStack
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import override_settings
+from django.test.utils import (
+    CaptureQueriesContext, setup_databases, setup_test_environment,
+    teardown_databases, teardown_test_environment,
+)
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from books.facets import recount_catalog_refs
+from books.models import Author, Book, Genre, SimilarBook
+from books.search import rebuild_index
+
+User = get_user_model()
+
+SEED = 1234
+PASSWORD = 'benchmark-password-123'
+GENRES = ('Fiction', 'Play', 'Historical', 'Mystery', 'Biography', 'Self-help', 'Poetry', 'Romance')
+WORDS = (
+    'river', 'sun', 'harmattan', 'market', 'village', 'city', 'king', 'horseman', 'yellow',
+    'season', 'night', 'drum', 'rain', 'exile', 'home', 'anthill', 'savannah', 'tourist',
+    'motion', 'trouble', 'secret', 'lagos', 'kano', 'enugu', 'ibadan', 'story', 'song',
+    'ancestor', 'daughter', 'son', 'crown', 'masquerade', 'kola', 'palm', 'wine', 'lion',
+    'jewel', 'road', 'famished', 'purple', 'hibiscus', 'arrow', 'god', 'things', 'apart',
+)
+
+# Maximum database queries per request; the run fails if any endpoint exceeds its budget
+QUERY_BUDGETS = {
+    'books-list': 3,
+    'books-list-legacy': 3,
+    'books-search': 4,
+    'books-genre': 3,
+    'book-detail': 2,
+    'book-similar': 1,
+    'books-batch': 1,
+    'books-home': 3,
+    'books-changes': 2,
+    'books-autocomplete': 0,
+    'book-download': 2,
+    'login': 3,
+    'users-list': 3,
+}
+# The legacy list returns the whole catalog; skip it on big seeds
+LEGACY_LIST_MAX_BOOKS = 10000
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway test database and measure latency, throughput and '
+        'query counts of the main API endpoints'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=10000, help='Books to seed (e.g. 10000, 100000, 1000000)')
+        parser.add_argument('--users', type=int, default=10000, help='Users to seed')
+        parser.add_argument('--requests', type=int, default=50, help='Measured requests per endpoint')
+        parser.add_argument('--login-requests', type=int, default=5, help='Measured logins (password hashing is slow)')
+        parser.add_argument('--warmup', type=int, default=3, help='Unmeasured requests per endpoint')
+        parser.add_argument('--with-cache', action='store_true', help='Keep the catalog response cache enabled')
+        parser.add_argument('--output', help='Write results as JSON to this file')
+        parser.add_argument('--compare', help='Previous JSON results to compare p50 latency against')
+        parser.add_argument('--keepdb', action='store_true', help='Reuse the test database between runs')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        try:
+            # Login throttling would reject the repeated benchmark logins
+            with override_settings(
+                CATALOG_CACHE_ENABLED=options['with_cache'],
+                LOGIN_THROTTLE_IP_RATE=None,
+                LOGIN_THROTTLE_EMAIL_RATE=None,
+            ):
+                if not Book.objects.exists():
+                    self._seed(options['books'], options['users'])
+                results = self._run(options)
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'timestamp': datetime.now(dt_timezone.utc).isoformat(),
+                'books': options['books'],
+                'users': options['users'],
+                'requests': options['requests'],
+                'catalog_cache': options['with_cache'],
+                'database': connection.vendor,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+            },
+            'results': results,
+        }
+        self._print(results, options.get('compare'))
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+        over_budget = [
+            f'{name}: {result["queries_max"]} queries (budget {result["query_budget"]})'
+            for name, result in results.items()
+            if result['queries_max'] > result['query_budget']
+        ]
+        if over_budget:
+            raise CommandError('Query budget exceeded:\n  ' + '\n  '.join(over_budget))
+
+    # Seeding
+
+    def _seed(self, book_count, user_count):
+        rng = random.Random(SEED)
+        started = time.perf_counter()
+
+        genres = Genre.objects.bulk_create([
+            Genre(name=name, slug=name.lower()) for name in GENRES
+        ])
+        authors = Author.objects.bulk_create([
+            Author(name=f'Author {i}', slug=f'author-{i}')
+            for i in range(max(1, book_count // 20))
+        ], batch_size=1000)
+
+        batch = []
+        for i in range(book_count):
+            author = authors[i % len(authors)]
+            genre = genres[i % len(genres)]
+            batch.append(Book(
+                title=' '.join(rng.choice(WORDS) for _ in range(3)).title() + f' {i}',
+                author=author.name,
+                author_ref=author,
+                genre=genre.name,
+                genre_ref=genre,
+                description=' '.join(rng.choice(WORDS) for _ in range(60)),
+                cover_image=f'https://res.cloudinary.com/demo/image/upload/v1/books/covers/{i}.jpg',
+                pdf_file=f'https://res.cloudinary.com/demo/image/upload/v1/books/pdfs/{i}.pdf',
+            ))
+            if len(batch) >= 5000:
+                Book.objects.bulk_create(batch)
+                batch = []
+        Book.objects.bulk_create(batch)
+        recount_catalog_refs(
+            author_ids=[author.id for author in authors],
+            genre_ids=[genre.id for genre in genres],
+        )
+        rebuild_index(batch_size=5000)
+
+        # Random neighbor lists: rebuild_similar_books is quadratic in the
+        # catalog size, and the endpoint only reads the table
+        book_ids = list(Book.objects.values_list('id', flat=True))
+        batch = []
+        for book_id in book_ids:
+            for score in sorted((rng.random() for _ in range(settings.SIMILAR_BOOKS_COUNT)), reverse=True):
+                similar_id = rng.choice(book_ids)
+                if similar_id != book_id:
+                    batch.append(SimilarBook(book_id=book_id, similar_id=similar_id, score=score))
+            if len(batch) >= 5000:
+                SimilarBook.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        SimilarBook.objects.bulk_create(batch, ignore_conflicts=True)
+
+        # One hash for everyone: seeding must not spend minutes in PBKDF2
+        password = make_password(PASSWORD)
+        now = datetime.now(dt_timezone.utc)
+        batch = []
+        for i in range(user_count):
+            batch.append(User(
+                email=f'user{i}@example.com',
+                username=f'user{i}',
+                first_name=f'First{i}',
+                last_name=f'Last{i}',
+                state=rng.choice(('Lagos', 'Oyo', 'Kano', 'Enugu', 'Rivers')),
+                city='Ikeja',
+                password=password,
+                date_joined=now - timedelta(minutes=i),
+            ))
+            if len(batch) >= 5000:
+                User.objects.bulk_create(batch)
+                batch = []
+        User.objects.bulk_create(batch)
+        User.objects.create_superuser(
+            email='admin@example.com', username='bench-admin', password=PASSWORD,
+            first_name='Bench', last_name='Admin',
+        )
+        self.stdout.write(
+            f'Seeded {book_count} books and {user_count} users in {time.perf_counter() - started:.1f}s'
+        )
+
+    # Measuring
+
+    def _scenarios(self, options):
+        book_id = Book.objects.order_by('id').values_list('id', flat=True)[
+            Book.objects.count() // 2
+        ]
+        admin = User.objects.get(email='admin@example.com')
+        token, _ = Token.objects.get_or_create(user=admin)
+        auth = {'HTTP_AUTHORIZATION': f'Token {token.key}'}
+
+        scenarios = [
+            ('books-list', 'get', '/api/books/', {'page_size': 20}, {}),
+            ('books-search', 'get', '/api/books/', {'search': 'harmattan river', 'page_size': 20}, {}),
+            ('books-genre', 'get', '/api/books/', {'genre': 'fiction', 'page_size': 20}, {}),
+            ('books-autocomplete', 'get', '/api/books/autocomplete/', {'q': 'harm'}, {}),
+            ('book-detail', 'get', f'/api/books/{book_id}/', {}, {}),
+            ('book-similar', 'get', f'/api/books/{book_id}/similar/', {}, {}),
+            ('books-batch', 'get', '/api/books/batch/', {
+                'ids': ','.join(str(book_id + offset) for offset in range(20)), 'view': 'compact',
+            }, {}),
+            ('books-home', 'get', '/api/books/home/', {}, {}),
+            ('books-changes', 'get', '/api/books/changes/', {'page_size': 100, 'view': 'compact'}, {}),
+            ('book-download', 'get', f'/api/books/{book_id}/download/', {}, auth),
+            ('login', 'post', '/api/auth/login/', {'email': 'admin@example.com', 'password': PASSWORD}, {}),
+            ('users-list', 'get', '/api/auth/users/', {'page_size': 50}, auth),
+        ]
+        if options['books'] <= LEGACY_LIST_MAX_BOOKS:
+            scenarios.insert(1, ('books-list-legacy', 'get', '/api/books/', {'legacy': 1}, {}))
+        return scenarios
+
+    def _run(self, options):
+        client = APIClient()
+        results = {}
+        for name, method, path, params, headers in self._scenarios(options):
+            count = options['login_requests'] if name == 'login' else options['requests']
+            send = getattr(client, method)
+
+            for _ in range(options['warmup']):
+                send(path, params, secure=True, **headers)
+
+            timings = []
+            queries = []
+            started = time.perf_counter()
+            for _ in range(count):
+                # Every alias, so reads routed to replicas are counted too
+                with ExitStack() as stack:
+                    captured = [
+                        stack.enter_context(CaptureQueriesContext(conn)) for conn in connections.all()
+                    ]
+                    request_started = time.perf_counter()
+                    response = send(path, params, secure=True, **headers)
+                    timings.append((time.perf_counter() - request_started) * 1000)
+                queries.append(sum(len(context) for context in captured))
+                if response.status_code >= 400:
+                    raise CommandError(f'{name}: {method.upper()} {path} returned {response.status_code}')
+            elapsed = time.perf_counter() - started
+
+            results[name] = {
+                'requests': count,
+                'p50_ms': round(statistics.median(timings), 3),
+                'p90_ms': round(percentile(timings, 90), 3),
+                'p99_ms': round(percentile(timings, 99), 3),
+                'max_ms': round(max(timings), 3),
+                'mean_ms': round(statistics.fmean(timings), 3),
+                'throughput_rps': round(count / elapsed, 1),
+                'queries_max': max(queries),
+                'queries_mean': round(statistics.fmean(queries), 2),
+                'query_budget': QUERY_BUDGETS[name],
+            }
+        return results
+
+    def _print(self, results, compare_path=None):
+        previous = {}
+        if compare_path:
+            with open(compare_path) as f:
+                previous = json.load(f).get('results', {})
+
+        self.stdout.write(
+            f'{"endpoint":<18}{"p50 ms":>10}{"p90 ms":>10}{"p99 ms":>10}{"req/s":>10}{"queries":>9}{"budget":>8}'
+            + ('  p50 vs previous' if previous else '')
+        )
+        for name, result in results.items():
+            line = (
+                f'{name:<18}{result["p50_ms"]:>10.2f}{result["p90_ms"]:>10.2f}{result["p99_ms"]:>10.2f}'
+                f'{result["throughput_rps"]:>10.1f}{result["queries_max"]:>9}{result["query_budget"]:>8}'
+            )
+            if name in previous:
+                change = (result['p50_ms'] - previous[name]['p50_ms']) / previous[name]['p50_ms'] * 100
+                line += f'  {change:+.1f}%'
+            self.stdout.write(line)
@@ -0,0 +1,74 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from books.models import Book
+from books.serializers import (
+    BookSerializer, COMPACT_BOOK_FIELDS, book_fields, serialize_book_rows,
+)
+
+
+class Command(BaseCommand):
+    help = 'Compare BookSerializer(many=True) with the fast list serialization path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=2000, help='Books to seed (rolled back afterwards)')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per variant; the best time is reported')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._seed(options['books'])
+            results = self._run(options['repeat'])
+            transaction.set_rollback(True)
+
+        baseline = results[0][1]
+        for name, seconds in results:
+            self.stdout.write(
+                f'{name:<32} {seconds * 1000:9.1f} ms   x{baseline / seconds:5.1f}'
+            )
+
+    def _seed(self, count):
+        Book.objects.bulk_create([
+            Book(
+                title=f'Benchmark book {i}',
+                author=f'Author {i % 50}',
+                genre=('Fiction', 'Play', 'Historical', 'Mystery')[i % 4],
+                description='Lorem ipsum dolor sit amet. ' * 40,
+                cover_image=f'https://example.com/covers/{i}.jpg',
+                cover_variants={'webp': [[160, f'/media/t/{i}/160.webp']], 'jpeg': [[160, f'/media/t/{i}/160.jpg']]},
+            )
+            for i in range(count)
+        ], batch_size=500)
+
+    def _best(self, func, repeat):
+        best = None
+        result = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def _run(self, repeat):
+        fields = book_fields()
+        drf_time, drf_data = self._best(
+            lambda: BookSerializer(Book.objects.all(), many=True).data, repeat
+        )
+        fast_time, fast_data = self._best(
+            lambda: serialize_book_rows(Book.objects.values(*fields), fields), repeat
+        )
+        if [dict(item) for item in drf_data] != fast_data:
+            raise CommandError('Fast serializer output differs from BookSerializer')
+        compact_time, _ = self._best(
+            lambda: serialize_book_rows(
+                Book.objects.values(*COMPACT_BOOK_FIELDS), COMPACT_BOOK_FIELDS
+            ),
+            repeat,
+        )
+        return [
+            ('BookSerializer(many=True)', drf_time),
+            ('serialize_book_rows (all fields)', fast_time),
+            ('serialize_book_rows (compact)', compact_time),
+        ]
@@ -0,0 +1,122 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+try:
+    import brotli
+except ImportError:  # Only .gz files are written without Brotli
+    brotli = None
+
+# Assets renamed to name.<hash>.ext so they can be cached forever
+HASHED_EXTENSIONS = {'.css', '.js', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico'}
+# Text assets worth precompressing
+COMPRESSED_EXTENSIONS = {'.html', '.css', '.js', '.svg', '.json', '.txt'}
+COMPRESS_MIN_SIZE = 256
+
+HTML_REF_RE = re.compile(r'''(?P<attr>\b(?:src|href)=)(?P<quote>["'])(?P<ref>[^"']+)(?P=quote)''')
+CSS_REF_RE = re.compile(r'''url\(\s*(?P<quote>["']?)(?P<ref>[^"')]+?)(?P=quote)\s*\)''')
+EXTERNAL_PREFIXES = ('http:', 'https:', '//', 'data:', 'mailto:', 'tel:', '#', '/', 'javascript:')
+
+
+def _content_hash(data):
+    return hashlib.md5(data).hexdigest()[:12]
+
+
+class Command(BaseCommand):
+    help = 'Fingerprint and precompress the static frontend (BOOK STORE) into a build directory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default=str(settings.FRONTEND_SOURCE_DIR))
+        parser.add_argument('--output', default=str(settings.FRONTEND_BUILD_DIR))
+
+    def handle(self, *args, **options):
+        source = Path(options['source']).resolve()
+        output = Path(options['output']).resolve()
+        if not source.is_dir():
+            raise CommandError(f'Frontend source directory not found: {source}')
+        if output == source or source in output.parents:
+            raise CommandError('Output directory must not be inside the source directory')
+
+        if output.exists():
+            shutil.rmtree(output)
+        output.mkdir(parents=True)
+
+        files = sorted(
+            path.relative_to(source).as_posix()
+            for path in source.rglob('*')
+            if path.is_file() and not any(part.startswith('.') for part in path.relative_to(source).parts)
+        )
+
+        # Order matters: CSS is rewritten to point at hashed images before it is hashed itself
+        manifest = {}
+        rank = {'.css': 1, '.js': 2, '.html': 3}
+        for name in sorted(files, key=lambda n: rank.get(Path(n).suffix.lower(), 0)):
+            data = (source / name).read_bytes()
+            suffix = Path(name).suffix.lower()
+            if suffix == '.css':
+                data = self._rewrite(CSS_REF_RE, data, name, manifest)
+            elif suffix == '.html':
+                data = self._rewrite(HTML_REF_RE, data, name, manifest)
+
+            # The original name is kept too, for references built at runtime in JS
+            target_names = [name]
+            if suffix in HASHED_EXTENSIONS:
+                stem = name[:-len(suffix)]
+                manifest[name] = f'{stem}.{_content_hash(data)}{Path(name).suffix}'
+                target_names.append(manifest[name])
+
+            for target_name in target_names:
+                target = output / target_name
+                target.parent.mkdir(parents=True, exist_ok=True)
+                target.write_bytes(data)
+                self._precompress(target, data)
+
+        (output / 'manifest.json').write_text(json.dumps(manifest, indent=2, sort_keys=True))
+        self.stdout.write(self.style.SUCCESS(
+            f'Built {len(files)} files ({len(manifest)} fingerprinted) into {output}'
+        ))
+
+    def _rewrite(self, pattern, data, name, manifest):
+        """Point relative references at their fingerprinted names"""
+        text = data.decode('utf-8')
+        base = os.path.dirname(name)
+
+        def replace(match):
+            ref = match.group('ref').strip()
+            if ref.startswith(EXTERNAL_PREFIXES):
+                return match.group(0)
+            path, sep, rest = ref, '', ''
+            split = re.search(r'[?#]', ref)
+            if split:
+                path, sep, rest = ref[:split.start()], split.group(), ref[split.end():]
+            resolved = os.path.normpath(os.path.join(base, unquote(path))).replace(os.sep, '/')
+            hashed = manifest.get(resolved)
+            if hashed is None:
+                return match.group(0)
+            new_path = os.path.relpath(hashed, base or '.').replace(os.sep, '/')
+            if path.startswith('./') and not new_path.startswith('.'):
+                new_path = './' + new_path
+            if '%' in path:
+                new_path = quote(new_path)
+            return match.group(0).replace(match.group('ref'), new_path + sep + rest, 1)
+
+        return pattern.sub(replace, text).encode('utf-8')
+
+    def _precompress(self, target, data):
+        if target.suffix.lower() not in COMPRESSED_EXTENSIONS or len(data) < COMPRESS_MIN_SIZE:
+            return
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        if len(compressed) < len(data):
+            target.with_name(target.name + '.gz').write_bytes(compressed)
+        if brotli is not None:
+            compressed = brotli.compress(data, quality=11)
+            if len(compressed) < len(data):
+                target.with_name(target.name + '.br').write_bytes(compressed)
@@ -0,0 +1,58 @@
+from urllib.parse import quote
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from books.models import Book
+from books.pdfs import find_duplicate_pdfs
+from books.streaming import local_pdf_path
+
+
+class Command(BaseCommand):
+    help = (
+        'Find identical files under media/books/pdfs; with --delete, point their books '
+        'at one copy and remove the others'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delete', action='store_true',
+            help='Repoint books and delete the duplicate files (default: only report them)',
+        )
+
+    def handle(self, *args, **options):
+        canonical = {
+            duplicate: paths[0]
+            for paths in find_duplicate_pdfs()
+            for duplicate in paths[1:]
+        }
+        if not canonical:
+            self.stdout.write('No duplicate PDFs found')
+            return
+
+        with_pdf = Book.objects.exclude(pdf_file__isnull=True).exclude(pdf_file='').only('id', 'pdf_file')
+        books = [book for book in with_pdf if local_pdf_path(book.pdf_file) in canonical]
+        freed = 0
+        for duplicate, keep in canonical.items():
+            freed += duplicate.stat().st_size
+            self.stdout.write(f'{duplicate.name} is a copy of {keep.name}')
+
+        if not options['delete']:
+            self.stdout.write(
+                f'{len(canonical)} duplicate files ({freed} bytes) used by {len(books)} books; '
+                f'run with --delete to remove them'
+            )
+            return
+
+        with transaction.atomic():
+            for book in books:
+                keep = canonical[local_pdf_path(book.pdf_file)]
+                book.pdf_file = f'{book.pdf_file.rsplit("/", 1)[0]}/{quote(keep.name)}'
+                # save() so metadata, search and cache updates run as for any edit
+                book.save(update_fields=['pdf_file', 'updated_at'])
+        for duplicate in canonical:
+            duplicate.unlink()
+        self.stdout.write(self.style.SUCCESS(
+            f'Pointed {len(books)} books at the kept copies and deleted '
+            f'{len(canonical)} duplicate files ({freed} bytes)'
+        ))
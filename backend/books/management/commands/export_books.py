@@ -0,0 +1,20 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from books.bulk import FORMATS, export_books
+
+
+class Command(BaseCommand):
+    help = 'Export every book as CSV or JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', choices=FORMATS, default='csv')
+        parser.add_argument('--output', help='File to write (stdout by default)')
+
+    def handle(self, *args, **options):
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as f:
+                f.writelines(export_books(options['type']))
+        else:
+            sys.stdout.writelines(export_books(options['type']))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from books.cache import bump_catalog_version
+from books.models import Book
+from books.pdfs import PDF_METADATA_DEFAULTS, update_book_pdf_metadata
+
+
+class Command(BaseCommand):
+    help = 'Read page count, size, content hash and a first-page preview from local book PDFs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Re-read PDFs that already have metadata (e.g. after replacing a file in place)',
+        )
+
+    def handle(self, *args, **options):
+        books = Book.objects.exclude(pdf_file__isnull=True).exclude(pdf_file='').only(
+            'id', 'pdf_file', *PDF_METADATA_DEFAULTS
+        )
+        if not options['force']:
+            books = books.filter(pdf_hash='')
+        updated = 0
+        for book in books.iterator():
+            if update_book_pdf_metadata(book):
+                updated += 1
+        if updated:
+            bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f'Updated PDF metadata for {updated} books'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from books.cache import bump_catalog_version
+from books.models import Book
+from books.thumbnails import update_book_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Generate resized cover images for existing books'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Rebuild variants even if the cover has not changed',
+        )
+
+    def handle(self, *args, **options):
+        updated = 0
+        for book in Book.objects.only('id', 'cover_image', 'cover_variants').iterator():
+            if update_book_thumbnails(book, force=options['force']):
+                updated += 1
+        if updated:
+            bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f'Updated cover variants for {updated} books'))
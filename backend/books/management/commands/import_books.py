@@ -0,0 +1,47 @@
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from books.bulk import FORMATS, detect_format, import_books, iter_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk create/update books from a CSV or JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSON Lines file, or "-" for stdin')
+        parser.add_argument(
+            '--type', choices=FORMATS,
+            help='Input format (guessed from the file name by default)',
+        )
+        parser.add_argument('--batch-size', type=int, default=settings.BOOKS_IMPORT_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Validate only, write nothing')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['type'] or detect_format(path)
+
+        if path == '-':
+            summary = self._import(sys.stdin, fmt, options)
+        else:
+            try:
+                with open(path, encoding='utf-8-sig', newline='') as f:
+                    summary = self._import(f, fmt, options)
+            except OSError as e:
+                raise CommandError(str(e))
+
+        for error in summary['errors']:
+            self.stderr.write(f'Row {error["row"]}: {error["errors"]}')
+        verb = 'Would import' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {summary["rows"]} rows: {summary["created"]} created, '
+            f'{summary["updated"]} updated, {len(summary["errors"])} errors'
+        ))
+
+    def _import(self, stream, fmt, options):
+        return import_books(
+            iter_rows(stream, fmt),
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from .benchmark_api import percentile
+
+DEFAULT_PATHS = (
+    '/api/books/?page_size=20',
+    '/api/books/?search=things&page_size=20',
+    '/api/books/1/',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Hammer a running server with concurrent requests and report throughput and '
+        'latency; run it against the WSGI and the ASGI server to compare them'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('base_url', help='e.g. http://127.0.0.1:8000')
+        parser.add_argument('--path', action='append', dest='paths', help='Path to request (repeatable)')
+        parser.add_argument('--concurrency', type=int, default=50, help='Requests in flight at once')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run')
+        parser.add_argument('--token', help='Send "Authorization: Token <token>" (for download paths)')
+        parser.add_argument('--label', default='', help='Name stored in the results, e.g. wsgi or asgi')
+        parser.add_argument('--output', help='Write results as JSON to this file')
+        parser.add_argument('--compare', help='Previous JSON results to compare against')
+
+    def handle(self, *args, **options):
+        try:
+            import httpx
+        except ImportError:
+            raise CommandError('load_test needs httpx (pip install httpx)')
+
+        paths = options['paths'] or list(DEFAULT_PATHS)
+        headers = {'Authorization': f'Token {options["token"]}'} if options['token'] else {}
+        result = asyncio.run(self._run(
+            httpx, options['base_url'].rstrip('/'), paths, headers,
+            options['concurrency'], options['duration'],
+        ))
+        result.update({'label': options['label'], 'paths': paths})
+
+        self._print(result)
+        if options['compare']:
+            with open(options['compare']) as f:
+                previous = json.load(f)
+            self.stdout.write(f'vs {previous.get("label") or options["compare"]}:')
+            for key in ('throughput_rps', 'p50_ms', 'p99_ms'):
+                change = (result[key] - previous[key]) / previous[key] * 100 if previous[key] else 0
+                self.stdout.write(f'  {key:<16}{previous[key]:>10} -> {result[key]:<10} ({change:+.1f}%)')
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(result, f, indent=2)
+
+    async def _run(self, httpx, base_url, paths, headers, concurrency, duration):
+        timings = []
+        statuses = {}
+        errors = 0
+        deadline = time.perf_counter() + duration
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+        async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=30) as client:
+            async def worker(offset):
+                nonlocal errors
+                index = offset
+                while time.perf_counter() < deadline:
+                    path = paths[index % len(paths)]
+                    index += 1
+                    started = time.perf_counter()
+                    try:
+                        response = await client.get(path)
+                    except httpx.HTTPError:
+                        errors += 1
+                        continue
+                    timings.append((time.perf_counter() - started) * 1000)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(i) for i in range(concurrency)))
+            elapsed = time.perf_counter() - started
+
+        if not timings:
+            raise CommandError(f'No successful requests ({errors} errors); is the server running?')
+        return {
+            'concurrency': concurrency,
+            'requests': len(timings),
+            'errors': errors,
+            'statuses': {str(code): count for code, count in sorted(statuses.items())},
+            'throughput_rps': round(len(timings) / elapsed, 1),
+            'p50_ms': round(statistics.median(timings), 2),
+            'p90_ms': round(percentile(timings, 90), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'max_ms': round(max(timings), 2),
+        }
+
+    def _print(self, result):
+        self.stdout.write(
+            f'{result["label"] or "run"}: {result["requests"]} requests at concurrency '
+            f'{result["concurrency"]}, {result["errors"]} errors, statuses {result["statuses"]}'
+        )
+        self.stdout.write(
+            f'  {result["throughput_rps"]} req/s   p50 {result["p50_ms"]} ms   '
+            f'p90 {result["p90_ms"]} ms   p99 {result["p99_ms"]} ms   max {result["max_ms"]} ms'
+        )
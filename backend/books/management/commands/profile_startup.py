@@ -0,0 +1,156 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter: load the WSGI app, then serve one request through it
+BOOT_SCRIPT = '''
+import io, json, os, sys, time
+booted = time.time() - float(os.environ['PROFILE_STARTUP_SPAWNED'])
+started = time.perf_counter()
+from novelia_project.wsgi import application
+ready = time.perf_counter()
+path, _, query = os.environ['PROFILE_STARTUP_PATH'].partition('?')
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+    'SERVER_NAME': 'localhost', 'SERVER_PORT': '443', 'HTTP_HOST': 'localhost', 'HTTPS': 'on',
+    'SERVER_PROTOCOL': 'HTTP/1.1', 'wsgi.url_scheme': 'https', 'wsgi.input': io.BytesIO(),
+    'wsgi.errors': sys.stderr, 'wsgi.version': (1, 0), 'wsgi.multithread': False,
+    'wsgi.multiprocess': True, 'wsgi.run_once': False,
+}
+statuses = []
+body = b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+answered = time.perf_counter()
+print('PROFILE_STARTUP ' + json.dumps({
+    'interpreter_ms': booted * 1000,
+    'app_ready_ms': (ready - started) * 1000,
+    'first_response_ms': (answered - ready) * 1000,
+    'total_ms': (booted + answered - started) * 1000,
+    'status': statuses[0] if statuses else None,
+    'bytes': len(body),
+}))
+'''
+IMPORT_TIME_RE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+PROJECT_PACKAGES = ('accounts', 'books', 'jobs', 'novelia_project')
+PHASES = ('interpreter_ms', 'app_ready_ms', 'first_response_ms', 'total_ms')
+
+
+def package_of(module):
+    """Group key for a module: its distribution, split further for Django and our apps"""
+    parts = module.split('.')
+    if parts[0] == 'django' and len(parts) > 2 and parts[1] == 'contrib':
+        return '.'.join(parts[:3])
+    if parts[0] == 'django' and len(parts) > 1:
+        return '.'.join(parts[:2])
+    if parts[0] in PROJECT_PACKAGES and len(parts) > 1:
+        return '.'.join(parts[:2])
+    return parts[0]
+
+
+class Command(BaseCommand):
+    help = (
+        'Start the app in fresh processes and report import cost per module and '
+        'time to first response (run with LEAN_BOOT=True, or --compare, to see the lean boot)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/books/home/', help='Path of the first request')
+        parser.add_argument('--runs', type=int, default=5, help='Processes to start; medians are reported')
+        parser.add_argument('--top', type=int, default=20, help='Rows in each import table')
+        parser.add_argument('--compare', action='store_true', help='Run the default and the lean boot')
+        parser.add_argument('--output', help='Write results as JSON to this file')
+
+    def handle(self, *args, **options):
+        modes = [False, True] if options['compare'] else [settings.LEAN_BOOT]
+        samples = {lean: ([], defaultdict(list), defaultdict(list)) for lean in modes}
+        # Alternate the modes run by run so drift on the machine hits both alike
+        for _ in range(options['runs']):
+            for lean in modes:
+                self._sample(lean, options['path'], *samples[lean])
+
+        results = {}
+        for lean in modes:
+            label = 'lean' if lean else 'default'
+            result = results[label] = self._summarize(*samples[lean], options)
+            self._print(label, result, options['top'])
+
+        if options['compare']:
+            self.stdout.write('\ndefault -> lean (medians):')
+            for phase in PHASES:
+                before, after = results['default'][phase], results['lean'][phase]
+                change = (after - before) / before * 100 if before else 0
+                self.stdout.write(f'  {phase:<20}{before:>9.1f} -> {after:<9.1f} ({change:+.1f}%)')
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+
+    def _sample(self, lean, path, runs, self_us, cumulative_us):
+        """Start one process, recording its timings and per-module import times"""
+        env = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'novelia_project.settings'),
+            LEAN_BOOT=str(lean),
+            PROFILE_STARTUP_PATH=path,
+            PROFILE_STARTUP_SPAWNED=repr(time.time()),
+        )
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', BOOT_SCRIPT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        marker = [line for line in process.stdout.splitlines() if line.startswith('PROFILE_STARTUP ')]
+        if process.returncode or not marker:
+            raise CommandError(f'Startup failed:\n{process.stderr[-2000:]}')
+        runs.append(json.loads(marker[-1][len('PROFILE_STARTUP '):]))
+        for match in IMPORT_TIME_RE.finditer(process.stderr):
+            self_us[match.group(4)].append(int(match.group(1)))
+            cumulative_us[match.group(4)].append(int(match.group(2)))
+
+    def _summarize(self, runs, self_us, cumulative_us, options):
+        """Medians over the runs of one mode"""
+        modules = {
+            name: (statistics.median(self_us[name]), statistics.median(cumulative_us[name]))
+            for name in self_us
+        }
+        packages = defaultdict(float)
+        for name, (own, _) in modules.items():
+            packages[package_of(name)] += own
+        result = {phase: round(statistics.median(run[phase] for run in runs), 1) for phase in PHASES}
+        result.update({
+            'runs': options['runs'],
+            'path': options['path'],
+            'status': runs[-1]['status'],
+            'modules_imported': len(modules),
+            'import_ms': round(sum(own for own, _ in modules.values()) / 1000, 1),
+            'packages_ms': {
+                name: round(us / 1000, 2)
+                for name, us in sorted(packages.items(), key=lambda item: -item[1])
+            },
+            'modules_ms': {
+                name: {'self': round(own / 1000, 2), 'cumulative': round(total / 1000, 2)}
+                for name, (own, total) in sorted(modules.items(), key=lambda item: -item[1][1])
+            },
+        })
+        return result
+
+    def _print(self, label, result, top):
+        self.stdout.write(
+            f'{label}: {result["runs"]} runs, GET {result["path"]} -> {result["status"]}, '
+            f'{result["modules_imported"]} modules imported in {result["import_ms"]} ms'
+        )
+        self.stdout.write(
+            f'  interpreter {result["interpreter_ms"]} ms   app ready {result["app_ready_ms"]} ms   '
+            f'first response {result["first_response_ms"]} ms   total {result["total_ms"]} ms'
+        )
+        self.stdout.write(f'  {"package":<40}{"self ms":>10}')
+        for name, ms in list(result['packages_ms'].items())[:top]:
+            self.stdout.write(f'  {name:<40}{ms:>10.2f}')
+        self.stdout.write(f'  {"module":<40}{"self ms":>10}{"cumul ms":>10}')
+        for name, times in list(result['modules_ms'].items())[:top]:
+            self.stdout.write(f'  {name:<40}{times["self"]:>10.2f}{times["cumulative"]:>10.2f}')
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from books.feed import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Delete change-feed tombstones of books deleted more than BOOKS_FEED_TOMBSTONE_DAYS ago'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.BOOKS_FEED_TOMBSTONE_DAYS,
+            help='Keep tombstones this many days (clients with older cursors must resync)',
+        )
+
+    def handle(self, *args, **options):
+        deleted = purge_tombstones(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {deleted} tombstones'))
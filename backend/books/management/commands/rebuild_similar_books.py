@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from books.cache import bump_catalog_version
+from books.similar import rebuild_similar_books
+
+
+class Command(BaseCommand):
+    help = 'Recompute the "similar books" neighbor lists of every book'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = rebuild_similar_books()
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt similar books for {total} books in {time.perf_counter() - started:.1f}s'
+        ))
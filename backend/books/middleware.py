@@ -0,0 +1,63 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseNotFound
+from django.utils.http import content_disposition_header
+
+from .signing import verify_signature
+from .streaming import local_pdf_path, stream_pdf
+
+
+class SignedMediaMiddleware:
+    """
+    Serve signed PDF URLs issued by download_book.
+
+    Sits ahead of the session and authentication middleware: the HMAC in
+    the query string is the only credential, so a download never resolves
+    a URL, loads a session, authenticates a user or queries the database.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.SIGNED_MEDIA_URL
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not request.path.startswith(self.prefix):
+            return self.get_response(request)
+        return self.serve(request)
+
+    async def __acall__(self, request):
+        if not request.path.startswith(self.prefix):
+            return await self.get_response(request)
+        return await sync_to_async(self.serve)(request)
+
+    def serve(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponse(status=405, headers={'Allow': 'GET, HEAD'})
+
+        relative_path = request.path[len(self.prefix):]
+        if not verify_signature(
+            relative_path,
+            request.GET.get('expires'),
+            request.GET.get('signature'),
+        ):
+            return HttpResponseForbidden('Invalid or expired download link')
+
+        path = local_pdf_path(relative_path)
+        if path is None:
+            return HttpResponseNotFound('File not found')
+
+        if settings.SIGNED_MEDIA_ACCEL_REDIRECT:
+            # Let the front proxy (e.g. nginx internal location) send the bytes
+            response = HttpResponse(content_type='application/pdf')
+            response['X-Accel-Redirect'] = f'{settings.SIGNED_MEDIA_ACCEL_REDIRECT}{relative_path}'
+            response['Content-Disposition'] = content_disposition_header(True, path.name)
+            return response
+        return stream_pdf(request, path, path.name)
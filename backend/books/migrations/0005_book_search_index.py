@@ -0,0 +1,52 @@
+from django.db import migrations
+
+SEARCH_CONFIG = 'english'
+POSTGRES_INDEX_NAME = 'book_search_gin_idx'
+SQLITE_FTS_TABLE = 'books_book_fts'
+
+
+def create_search_index(apps, schema_editor):
+    Book = apps.get_model('books', 'Book')
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+        from django.contrib.postgres.search import SearchVector
+
+        vector = (
+            SearchVector('title', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('author', weight='B', config=SEARCH_CONFIG)
+            + SearchVector('genre', weight='C', config=SEARCH_CONFIG)
+            + SearchVector('description', weight='D', config=SEARCH_CONFIG)
+        )
+        schema_editor.add_index(Book, GinIndex(vector, name=POSTGRES_INDEX_NAME))
+
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} "
+            f"USING fts5(title, author, genre, description, "
+            f"tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {SQLITE_FTS_TABLE} (rowid, title, author, genre, description) "
+            f"SELECT id, title, author, genre, description FROM books_book"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {POSTGRES_INDEX_NAME}')
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0004_book_title_id_ordering'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,53 @@
+from django.db import migrations
+from django.db.models import Count
+from django.utils.text import slugify
+
+
+def _slug(name):
+    return slugify(name or '', allow_unicode=True) or 'unknown'
+
+
+def populate_author_genre(apps, schema_editor):
+    Book = apps.get_model('books', 'Book')
+    Author = apps.get_model('books', 'Author')
+    Genre = apps.get_model('books', 'Genre')
+
+    authors = {}
+    genres = {}
+    books = list(Book.objects.only('id', 'author', 'genre'))
+    for book in books:
+        if book.author and book.author.strip():
+            slug = _slug(book.author)
+            if slug not in authors:
+                authors[slug] = Author.objects.get_or_create(
+                    slug=slug, defaults={'name': book.author.strip()}
+                )[0]
+            book.author_ref = authors[slug]
+        if book.genre and book.genre.strip():
+            slug = _slug(book.genre)
+            if slug not in genres:
+                genres[slug] = Genre.objects.get_or_create(
+                    slug=slug, defaults={'name': book.genre.strip()}
+                )[0]
+            book.genre_ref = genres[slug]
+    Book.objects.bulk_update(books, ['author_ref', 'genre_ref'], batch_size=500)
+
+    for model, field in ((Author, 'author_ref'), (Genre, 'genre_ref')):
+        counts = dict(
+            Book.objects.order_by().values_list(field).annotate(total=Count('id'))
+        )
+        rows = list(model.objects.all())
+        for row in rows:
+            row.book_count = counts.get(row.id, 0)
+        model.objects.bulk_update(rows, ['book_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0007_author_genre'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_author_genre, migrations.RunPython.noop),
+    ]
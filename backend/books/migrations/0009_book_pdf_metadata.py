@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-18 13:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0008_populate_author_genre'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='pdf_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='pdf_pages',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='pdf_preview',
+            field=models.CharField(blank=True, editable=False, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='pdf_size',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
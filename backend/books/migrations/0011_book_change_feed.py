@@ -0,0 +1,32 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0010_similarbook'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedBook',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('book_id', models.BigIntegerField(unique=True)),
+                ('deleted_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['deleted_at', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['updated_at', 'id'], name='book_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deletedbook',
+            index=models.Index(fields=['deleted_at', 'id'], name='deleted_book_cursor_idx'),
+        ),
+    ]
@@ -1,14 +1,56 @@
 from django.db import models
 
 
+class Author(models.Model):
+    """Book author, with a denormalized count of their books"""
+    name = models.CharField(max_length=200)
+    slug = models.SlugField(max_length=220, unique=True, allow_unicode=True)
+    book_count = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return self.name
+    
+    class Meta:
+        ordering = ['name']
+
+
+class Genre(models.Model):
+    """Book genre, with a denormalized count of its books"""
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=120, unique=True, allow_unicode=True)
+    book_count = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return self.name
+    
+    class Meta:
+        ordering = ['name']
+
+
 class Book(models.Model):
     """Model for Nigerian books in the catalog"""
     title = models.CharField(max_length=200)
     author = models.CharField(max_length=200)
     genre = models.CharField(max_length=100)
+    # Normalized copies of author/genre, kept in sync by books.facets
+    author_ref = models.ForeignKey(
+        Author, on_delete=models.SET_NULL, null=True, blank=True,
+        editable=False, related_name='books',
+    )
+    genre_ref = models.ForeignKey(
+        Genre, on_delete=models.SET_NULL, null=True, blank=True,
+        editable=False, related_name='books',
+    )
     description = models.TextField()
     cover_image = models.URLField(max_length=500, blank=True, null=True)
     pdf_file = models.URLField(max_length=500, blank=True, null=True)
+    # Resized cover URLs per format, filled in by books.thumbnails
+    cover_variants = models.JSONField(default=dict, blank=True)
+    # Read from local PDFs by books.pdfs (empty for remote files)
+    pdf_pages = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    pdf_size = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+    pdf_hash = models.CharField(max_length=64, blank=True, editable=False)
+    pdf_preview = models.CharField(max_length=500, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -16,4 +58,41 @@ class Book(models.Model):
         return f"{self.title} by {self.author}"
     
     class Meta:
-        ordering = ['title']
+        ordering = ['title', 'id']
+        indexes = [
+            models.Index(fields=['title', 'id'], name='book_title_id_idx'),
+            # Change feed (books.feed) cursor
+            models.Index(fields=['updated_at', 'id'], name='book_updated_id_idx'),
+        ]
+
+
+class SimilarBook(models.Model):
+    """One of a book's precomputed nearest neighbors (books.similar)"""
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='similar_links')
+    similar = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+
+    def __str__(self):
+        return f'{self.book_id} -> {self.similar_id} ({self.score:.3f})'
+
+    class Meta:
+        ordering = ['book', '-score']
+        constraints = [
+            models.UniqueConstraint(fields=['book', 'similar'], name='similar_book_unique_pair'),
+        ]
+
+
+class DeletedBook(models.Model):
+    """Tombstone left by a deleted book, so the change feed can report it"""
+    book_id = models.BigIntegerField(unique=True)
+    deleted_at = models.DateTimeField()
+
+    def __str__(self):
+        return f'Book {self.book_id} deleted {self.deleted_at:%Y-%m-%d %H:%M}'
+
+    class Meta:
+        ordering = ['deleted_at', 'id']
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='deleted_book_cursor_idx'),
+        ]
+
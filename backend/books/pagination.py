@@ -0,0 +1,128 @@
+import base64
+import binascii
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from .cache import aget_catalog_version, get_catalog_version
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor that was not issued by us"""
+
+
+def encode_cursor(book, reverse=False, ranked=False):
+    """Build an opaque cursor pointing at a book's (title, id) or (rank, id) position"""
+    payload = {'k': book.rank} if ranked else {'t': book.title}
+    payload.update({'i': book.id, 'r': int(reverse)})
+    return base64.urlsafe_b64encode(
+        json.dumps(payload, separators=(',', ':')).encode()
+    ).decode().rstrip('=')
+
+
+def decode_cursor(cursor, ranked=False):
+    """Turn a cursor back into (title or rank, id, reverse)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key = float(payload['k']) if ranked else str(payload['t'])
+        return key, int(payload['i']), bool(payload.get('r'))
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def get_page_size(request):
+    """Read ?page_size=, falling back to the default and capping at the max"""
+    try:
+        page_size = int(request.GET.get('page_size', settings.BOOKS_PAGE_SIZE))
+    except ValueError:
+        page_size = settings.BOOKS_PAGE_SIZE
+    return max(1, min(page_size, settings.BOOKS_MAX_PAGE_SIZE))
+
+
+def _page_queryset(books, cursor, page_size, ranked):
+    """Queryset for one keyset page (page_size + 1 rows) and whether it walks backwards"""
+    field = 'rank' if ranked else 'title'
+    reverse = False
+    if cursor:
+        value, book_id, reverse = decode_cursor(cursor, ranked)
+        if reverse:
+            books = books.filter(
+                Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': book_id})
+            ).order_by(f'-{field}', '-id')
+        else:
+            books = books.filter(
+                Q(**{f'{field}__gt': value}) | Q(**{field: value, 'id__gt': book_id})
+            ).order_by(field, 'id')
+    else:
+        books = books.order_by(field, 'id')
+    return books[:page_size + 1], reverse
+
+
+def _page_result(rows, cursor, page_size, reverse, ranked):
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if reverse:
+        rows.reverse()
+
+    next_cursor = previous_cursor = None
+    if rows:
+        if reverse:
+            # We walked backwards from a real row, so there is always a next page
+            next_cursor = encode_cursor(rows[-1], ranked=ranked)
+            previous_cursor = encode_cursor(rows[0], reverse=True, ranked=ranked) if has_more else None
+        else:
+            next_cursor = encode_cursor(rows[-1], ranked=ranked) if has_more else None
+            previous_cursor = encode_cursor(rows[0], reverse=True, ranked=ranked) if cursor else None
+
+    return rows, next_cursor, previous_cursor
+
+
+def paginate_books(books, cursor=None, page_size=None, ranked=False):
+    """
+    Return one page of books plus next/previous cursors.
+
+    Pages are ordered on (title, id), or on (rank, id) for ranked search
+    results (see search_books). Only page_size + 1 rows are fetched: the
+    extra row tells us whether another page exists, so no COUNT(*) is needed.
+    """
+    page_size = page_size or settings.BOOKS_PAGE_SIZE
+    page, reverse = _page_queryset(books, cursor, page_size, ranked)
+    return _page_result(list(page), cursor, page_size, reverse, ranked)
+
+
+async def apaginate_books(books, cursor=None, page_size=None, ranked=False):
+    """Async version of paginate_books"""
+    page_size = page_size or settings.BOOKS_PAGE_SIZE
+    page, reverse = _page_queryset(books, cursor, page_size, ranked)
+    return _page_result([book async for book in page], cursor, page_size, reverse, ranked)
+
+
+def _count_key(filters, version):
+    digest = hashlib.md5(
+        json.dumps(filters, sort_keys=True).encode()
+    ).hexdigest()
+    return f'books:count:v{version}:{digest}'
+
+
+def get_cached_count(books, filters):
+    """Count the filtered books, cached until the catalog changes"""
+    key = _count_key(filters, get_catalog_version())
+    count = cache.get(key)
+    if count is None:
+        count = books.count()
+        cache.set(key, count, settings.BOOKS_COUNT_CACHE_SECONDS)
+    return count
+
+
+async def aget_cached_count(books, filters):
+    """Async version of get_cached_count"""
+    key = _count_key(filters, await aget_catalog_version())
+    count = await cache.aget(key)
+    if count is None:
+        count = await books.acount()
+        await cache.aset(key, count, settings.BOOKS_COUNT_CACHE_SECONDS)
+    return count
@@ -0,0 +1,96 @@
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from .streaming import PDF_SUBDIR, local_pdf_path
+from .thumbnails import file_hash, media_url
+
+PREVIEW_SUBDIR = 'books/previews'
+# Book fields filled in from the PDF file, and their values for remote or missing files
+PDF_METADATA_DEFAULTS = {'pdf_pages': None, 'pdf_size': None, 'pdf_hash': '', 'pdf_preview': ''}
+
+
+def _render_preview(page, target):
+    scale = settings.PDF_PREVIEW_WIDTH / page.get_width()
+    image = page.render(scale=scale).to_pil().convert('RGB')
+    target.parent.mkdir(parents=True, exist_ok=True)
+    # Write then rename, so a concurrent reader never sees half an image
+    partial = target.with_name(f'{target.name}.{os.getpid()}.tmp')
+    image.save(partial, 'JPEG', quality=settings.COVER_THUMBNAIL_QUALITY)
+    os.replace(partial, target)
+
+
+def extract_pdf_metadata(path):
+    """
+    Page count, byte size, content hash and first-page preview of a local PDF.
+
+    Previews are stored under MEDIA_ROOT/books/previews/ by content hash, so
+    identical files share one image and it is rendered only once.
+    """
+    import pypdfium2
+
+    digest = file_hash(path)
+    preview = (Path(settings.MEDIA_ROOT) / PREVIEW_SUBDIR / digest[:2] / f'{digest}.jpg').resolve()
+    pages = None
+    try:
+        document = pypdfium2.PdfDocument(str(path))
+    except pypdfium2.PdfiumError:
+        # Not a readable PDF: keep size and hash only
+        document = None
+    if document is not None:
+        try:
+            pages = len(document)
+            if pages and not preview.exists():
+                _render_preview(document[0], preview)
+        finally:
+            document.close()
+
+    return {
+        'pdf_pages': pages,
+        'pdf_size': path.stat().st_size,
+        'pdf_hash': digest,
+        'pdf_preview': media_url(preview) if preview.exists() else '',
+    }
+
+
+def update_book_pdf_metadata(book):
+    """
+    Refresh the pdf_* fields from book.pdf_file; returns True when they changed.
+
+    Writes with a queryset update so post_save handlers do not run again.
+    """
+    from .models import Book
+
+    path = local_pdf_path(book.pdf_file)
+    metadata = extract_pdf_metadata(path) if path is not None else PDF_METADATA_DEFAULTS
+    if all(getattr(book, field) == value for field, value in metadata.items()):
+        return False
+
+    # Bump updated_at too, so detail ETags change with the new fields
+    updated_at = timezone.now()
+    Book.objects.filter(pk=book.pk).update(updated_at=updated_at, **metadata)
+    for field, value in metadata.items():
+        setattr(book, field, value)
+    book.updated_at = updated_at
+    return True
+
+
+def find_duplicate_pdfs():
+    """
+    Files under MEDIA_ROOT/books/pdfs with identical content, as lists of paths.
+
+    The first path of each group is the one to keep: the shortest name,
+    which is the original rather than a copy Django renamed with a suffix.
+    """
+    root = Path(settings.MEDIA_ROOT) / PDF_SUBDIR
+    by_hash = {}
+    for path in sorted(root.glob('*.pdf')):
+        if path.is_file():
+            by_hash.setdefault(file_hash(path), []).append(path.resolve())
+    return [
+        sorted(paths, key=lambda path: (len(path.name), path.name))
+        for paths in by_hash.values()
+        if len(paths) > 1
+    ]
@@ -0,0 +1,176 @@
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+
+# Search config shared by the GIN expression index and the queries that must match it
+SEARCH_CONFIG = 'english'
+POSTGRES_INDEX_NAME = 'book_search_gin_idx'
+SQLITE_FTS_TABLE = 'books_book_fts'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _tokens(term):
+    return TOKEN_RE.findall(term.lower())
+
+
+def search_vector():
+    """Weighted tsvector over title, author, genre and description (Postgres)"""
+    from django.contrib.postgres.search import SearchVector
+
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('author', weight='B', config=SEARCH_CONFIG)
+        + SearchVector('genre', weight='C', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='D', config=SEARCH_CONFIG)
+    )
+
+
+def search_books(books, term):
+    """
+    Filter books to those matching term, best match first.
+
+    Returns (books, truncated). Matches are annotated with `rank`, lower
+    being better, and ordered on (rank, id) so they can be paged by rank.
+    truncated is True when matches past BOOKS_SEARCH_MAX_RESULTS were
+    dropped (SQLite only). Every token is matched as a prefix so results
+    keep up with the search-as-you-type box in books.js.
+    """
+    tokens = _tokens(term)
+    if not tokens:
+        return _no_matches(books), False
+    if connection.vendor == 'postgresql':
+        return _search_postgres(books, tokens), False
+    if connection.vendor == 'sqlite':
+        return _search_sqlite(books, tokens)
+    return _search_icontains(books, term), False
+
+
+def _no_matches(books):
+    # Still annotated, so callers can order and page on rank
+    return books.annotate(rank=Value(0, output_field=IntegerField())).none()
+
+
+def _search_postgres(books, tokens):
+    from django.contrib.postgres.search import SearchQuery, SearchRank
+
+    query = SearchQuery(
+        ' & '.join(f'{token}:*' for token in tokens),
+        search_type='raw',
+        config=SEARCH_CONFIG,
+    )
+    vector = search_vector()
+    # Negated so that, as on SQLite, a lower rank is a better match
+    return books.annotate(
+        search=vector, rank=-SearchRank(vector, query)
+    ).filter(search=query).order_by('rank', 'id')
+
+
+def _search_sqlite(books, tokens):
+    match = ' AND '.join(f'"{token}"*' for token in tokens)
+    with connection.cursor() as cursor:
+        # bm25 weights follow the column order: title, author, genre, description
+        cursor.execute(
+            f'SELECT rowid FROM {SQLITE_FTS_TABLE} '
+            f'WHERE {SQLITE_FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({SQLITE_FTS_TABLE}, 10.0, 5.0, 2.0, 1.0) '
+            f'LIMIT %s',
+            [match, settings.BOOKS_SEARCH_MAX_RESULTS + 1],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+    truncated = len(ids) > settings.BOOKS_SEARCH_MAX_RESULTS
+    ids = ids[:settings.BOOKS_SEARCH_MAX_RESULTS]
+    if not ids:
+        return _no_matches(books), False
+    rank = Case(
+        *[When(id=book_id, then=position) for position, book_id in enumerate(ids)],
+        output_field=IntegerField(),
+    )
+    return books.filter(id__in=ids).annotate(rank=rank).order_by('rank', 'id'), truncated
+
+
+def _search_icontains(books, term):
+    # No relevance score here: every match ranks the same
+    return books.filter(
+        Q(title__icontains=term)
+        | Q(author__icontains=term)
+        | Q(genre__icontains=term)
+        | Q(description__icontains=term)
+    ).annotate(rank=Value(0, output_field=IntegerField())).order_by('rank', 'id')
+
+
+def index_book(book):
+    """Add or refresh one book in the SQLite FTS table (Postgres indexes itself)"""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = %s', [book.id])
+        cursor.execute(
+            f'INSERT INTO {SQLITE_FTS_TABLE} (rowid, title, author, genre, description) '
+            f'VALUES (%s, %s, %s, %s, %s)',
+            [book.id, book.title, book.author, book.genre, book.description],
+        )
+
+
+def index_books(books):
+    """Add or refresh many books in the SQLite FTS table at once"""
+    if connection.vendor != 'sqlite' or not books:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = %s',
+            [(book.id,) for book in books],
+        )
+        _insert_batch(cursor, [
+            (book.id, book.title, book.author, book.genre, book.description)
+            for book in books
+        ])
+
+
+def unindex_book(book_id):
+    """Remove one book from the SQLite FTS table"""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = %s', [book_id])
+
+
+def rebuild_index(batch_size=1000):
+    """Rebuild the search index from scratch and return the number of books indexed"""
+    from .models import Book
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'REINDEX INDEX {POSTGRES_INDEX_NAME}')
+        return Book.objects.count()
+
+    if connection.vendor != 'sqlite':
+        return 0
+
+    indexed = 0
+    rows = Book.objects.order_by().values_list(
+        'id', 'title', 'author', 'genre', 'description'
+    ).iterator(chunk_size=batch_size)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SQLITE_FTS_TABLE}')
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                _insert_batch(cursor, batch)
+                indexed += len(batch)
+                batch = []
+        if batch:
+            _insert_batch(cursor, batch)
+            indexed += len(batch)
+    return indexed
+
+
+def _insert_batch(cursor, batch):
+    cursor.executemany(
+        f'INSERT INTO {SQLITE_FTS_TABLE} (rowid, title, author, genre, description) '
+        f'VALUES (%s, %s, %s, %s, %s)',
+        batch,
+    )
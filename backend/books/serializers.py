@@ -1,13 +1,34 @@
+import functools
+
 from rest_framework import serializers
 from .models import Book
+from .thumbnails import THUMBNAIL_FORMATS
+
+# Fields the catalog grid (books.js) actually renders
+COMPACT_BOOK_FIELDS = ('id', 'title', 'author', 'genre', 'cover_image', 'cover_variants')
+
+
+def cover_variants_representation(variants):
+    """Resized covers as {'webp': [{'width', 'url'}], 'jpeg': [...]} for srcset"""
+    variants = variants or {}
+    return {
+        key: [{'width': width, 'url': url} for width, url in variants.get(key, [])]
+        for key, _, _ in THUMBNAIL_FORMATS
+        if variants.get(key)
+    }
 
 
 class BookSerializer(serializers.ModelSerializer):
     """Serializer for Book model"""
+    cover_variants = serializers.SerializerMethodField()
+
     class Meta:
         model = Book
         fields = '__all__'
 
+    def get_cover_variants(self, obj):
+        return cover_variants_representation(obj.cover_variants)
+
 
 class BookCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating/updating books with Cloudinary URLs"""
@@ -17,3 +38,68 @@ class BookCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Book
         fields = ('title', 'author', 'genre', 'description', 'cover_image', 'pdf_file')
+
+
+@functools.lru_cache(maxsize=None)
+def book_fields():
+    """Output fields of BookSerializer, in its order"""
+    return tuple(BookSerializer().fields)
+
+
+def select_book_fields(fields_param=None, exclude_param=None, compact=False):
+    """
+    Resolve ?fields=, ?exclude= and ?view=compact into an ordered field tuple.
+
+    Raises ValueError naming any unknown field.
+    """
+    available = book_fields()
+    selected = COMPACT_BOOK_FIELDS if compact else available
+    requested = [name.strip() for name in (fields_param or '').split(',') if name.strip()]
+    excluded = [name.strip() for name in (exclude_param or '').split(',') if name.strip()]
+
+    unknown = sorted(set(requested + excluded) - set(available))
+    if unknown:
+        raise ValueError(f'Unknown field(s): {", ".join(unknown)}')
+
+    if requested:
+        selected = tuple(name for name in available if name in requested or name == 'id')
+    return tuple(name for name in selected if name not in excluded)
+
+
+# Foreign keys are serialized as their primary key
+_FK_ATTRIBUTES = {'author_ref': 'author_ref_id', 'genre_ref': 'genre_ref_id'}
+
+
+def _datetime_or_none(value, _to_representation=serializers.DateTimeField().to_representation):
+    return _to_representation(value) if value is not None else None
+
+
+_CONVERTERS = {
+    'created_at': _datetime_or_none,
+    'updated_at': _datetime_or_none,
+    'cover_variants': cover_variants_representation,
+}
+
+
+def serialize_book_rows(rows, fields):
+    """
+    Fast many=True path producing the same output as BookSerializer.
+
+    rows may be dicts from .values(*fields) or Book instances loaded with
+    .only(*fields); each value is converted directly instead of going
+    through a DRF field object per cell.
+    """
+    plan = [(name, _FK_ATTRIBUTES.get(name, name), _CONVERTERS.get(name)) for name in fields]
+    data = []
+    for row in rows:
+        item = {}
+        if isinstance(row, dict):
+            for name, _, convert in plan:
+                value = row[name]
+                item[name] = convert(value) if convert else value
+        else:
+            for name, attribute, convert in plan:
+                value = getattr(row, attribute)
+                item[name] = convert(value) if convert else value
+        data.append(item)
+    return data
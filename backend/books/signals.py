@@ -0,0 +1,114 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from jobs.queue import enqueue
+
+from .cache import bump_catalog_version
+from .facets import assign_catalog_refs, recount_catalog_refs
+from .feed import record_tombstone
+from .models import Book, DeletedBook, SimilarBook
+from .thumbnails import cover_changed
+
+
+@receiver(pre_save, sender=Book)
+def sync_catalog_refs(sender, instance, **kwargs):
+    """Resolve author/genre strings to Author/Genre rows before writing"""
+    previous = None
+    if instance.pk is not None:
+        previous = Book.objects.filter(pk=instance.pk).values_list(
+            'author_ref_id', 'genre_ref_id', 'pdf_file'
+        ).first()
+    previous = previous or (None, None, None)
+    instance._previous_refs = previous[:2]
+    instance._previous_pdf_file = previous[2]
+    assign_catalog_refs([instance])
+
+
+@receiver(post_save, sender=Book)
+def update_facet_counts(sender, instance, **kwargs):
+    """Recount the authors and genres this book moved between"""
+    old_author, old_genre = getattr(instance, '_previous_refs', (None, None))
+    recount_catalog_refs(
+        author_ids={old_author, instance.author_ref_id},
+        genre_ids={old_genre, instance.genre_ref_id},
+    )
+
+
+@receiver(post_delete, sender=Book)
+def release_facet_counts(sender, instance, **kwargs):
+    """Deleted books no longer count towards their author and genre"""
+    recount_catalog_refs(
+        author_ids={instance.author_ref_id},
+        genre_ids={instance.genre_ref_id},
+    )
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def queue_search_index(sender, instance, **kwargs):
+    """Keep the full-text index in step with saved and deleted books"""
+    enqueue('books.reindex', {'book_id': instance.pk}, key=f'books.reindex:{instance.pk}')
+
+
+@receiver(post_save, sender=Book)
+def queue_cover_thumbnails(sender, instance, **kwargs):
+    """Render resized covers when a book's cover changes"""
+    if cover_changed(instance):
+        enqueue(
+            'books.generate_thumbnails', {'book_id': instance.pk},
+            key=f'books.generate_thumbnails:{instance.pk}',
+        )
+
+
+@receiver(post_save, sender=Book)
+def queue_pdf_metadata(sender, instance, **kwargs):
+    """Read page count, size and preview when a book's PDF changes"""
+    if instance.pdf_file != getattr(instance, '_previous_pdf_file', None):
+        enqueue(
+            'books.extract_pdf_metadata', {'book_id': instance.pk},
+            key=f'books.extract_pdf_metadata:{instance.pk}',
+        )
+
+
+@receiver(pre_delete, sender=Book)
+def remember_similar_listings(sender, instance, **kwargs):
+    """Deleting the book cascades to the lists it is on; note which they were"""
+    instance._similar_listed_by = list(
+        SimilarBook.objects.filter(similar=instance).values_list('book_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Book)
+def queue_similar_books(sender, instance, **kwargs):
+    """Refresh the "similar books" lists a saved book can change"""
+    enqueue('books.refresh_similar', {'book_id': instance.pk}, key=f'books.refresh_similar:{instance.pk}')
+
+
+@receiver(post_delete, sender=Book)
+def queue_similar_books_removal(sender, instance, **kwargs):
+    """Refill the lists a deleted book was on"""
+    # No key: the payload must not be merged into a queued refresh
+    enqueue('books.refresh_similar', {
+        'book_id': instance.pk,
+        'listed_by': getattr(instance, '_similar_listed_by', []),
+    })
+
+
+@receiver(post_delete, sender=Book)
+def leave_tombstone(sender, instance, **kwargs):
+    """Record the delete for the change feed"""
+    record_tombstone(instance.pk)
+
+
+@receiver(post_save, sender=Book)
+def clear_tombstone(sender, instance, created, **kwargs):
+    """A book created with a deleted book's id is no longer deleted"""
+    if created:
+        DeletedBook.objects.filter(book_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def invalidate_catalog_cache(sender, **kwargs):
+    """Any change to a book makes every cached catalog response stale"""
+    bump_catalog_version()
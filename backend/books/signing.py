@@ -0,0 +1,45 @@
+import time
+from pathlib import Path
+from urllib.parse import quote, urlencode
+
+from django.conf import settings
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+SIGNING_SALT = 'books.signed-media'
+
+
+def _signature(relative_path, expires):
+    return salted_hmac(
+        SIGNING_SALT, f'{relative_path}:{expires}', secret=settings.PDF_SIGNING_KEY,
+        algorithm='sha256',
+    ).hexdigest()
+
+
+def media_relative_path(path):
+    """Path of a file relative to MEDIA_ROOT, using forward slashes"""
+    return Path(path).relative_to(Path(settings.MEDIA_ROOT).resolve()).as_posix()
+
+
+def build_signed_url(request, path, ttl=None):
+    """Absolute, time-limited URL for a file under MEDIA_ROOT; returns (url, expires)"""
+    relative_path = media_relative_path(path)
+    expires = int(time.time()) + (ttl or settings.PDF_SIGNED_URL_TTL)
+    query = urlencode({
+        'expires': expires,
+        'signature': _signature(relative_path, expires),
+    })
+    url = request.build_absolute_uri(
+        f'{settings.SIGNED_MEDIA_URL}{quote(relative_path)}?{query}'
+    )
+    return url, expires
+
+
+def verify_signature(relative_path, expires, signature):
+    """Check a signed media request without touching the database"""
+    try:
+        expires = int(expires)
+    except (TypeError, ValueError):
+        return False
+    if expires < time.time():
+        return False
+    return constant_time_compare(_signature(relative_path, expires), signature or '')
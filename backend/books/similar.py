@@ -0,0 +1,300 @@
+"""
+"Similar books": TF-IDF vectors over description, genre and author, with
+each book's nearest neighbors (cosine similarity) stored as SimilarBook rows
+so the endpoint is a plain index lookup.
+
+rebuild_similar_books() recomputes every list in batch. After a single book
+changes, refresh_similar_books() recomputes only the lists that book is on or
+now belongs on, using vectors kept in memory by the process running it.
+"""
+import math
+import threading
+from collections import Counter
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+from scipy import sparse
+
+from .models import Book, SimilarBook
+from .search import TOKEN_RE
+
+STOP_WORDS = frozenset('''
+    about after again all also and any are because been before being both but can could
+    did does doing down during each few for from further had has have having her here hers
+    him his how into its just more most not now off once only other our ours out over own
+    same she should some such than that the their theirs them then there these they this
+    those through too under until very was were what when where which while who whom why
+    will with would you your yours
+'''.split())
+# A shared genre or author counts as much as this many shared description words
+NAME_WEIGHT = 2.0
+# Similarity scores computed at once during a rebuild (rows x books)
+REBUILD_CHUNK_CELLS = 2_000_000
+# Books saved this close to the last sync are read again, in case their
+# transaction committed after it
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+def book_terms(description, genre, author):
+    """Description words plus the whole genre and author names, as terms"""
+    terms = [
+        token for token in TOKEN_RE.findall((description or '').lower())
+        if len(token) > 2 and token not in STOP_WORDS and not token.isdigit()
+    ]
+    if genre and genre.strip():
+        terms.append(f'genre:{genre.strip().lower()}')
+    if author and author.strip():
+        terms.append(f'author:{author.strip().lower()}')
+    return Counter(terms)
+
+
+class SimilarityIndex:
+    """
+    L2-normalized TF-IDF rows for every book, plus each book's current
+    neighbor floor (the lowest score on its list, or the minimum score
+    while the list is not full).
+    """
+
+    def __init__(self, rows):
+        self.synced_at = timezone.now()
+        ids, documents = [], []
+        # updated_at of the text each row was built from
+        self.versions = {}
+        for book_id, updated_at, *text in rows:
+            ids.append(book_id)
+            documents.append(book_terms(*text))
+            self.versions[book_id] = updated_at
+
+        document_frequency = Counter(term for terms in documents for term in terms)
+        # A term used by a single book cannot make two books similar
+        vocabulary = sorted(term for term, count in document_frequency.items() if count > 1)
+        self.vocabulary = {term: column for column, term in enumerate(vocabulary)}
+        total = len(documents)
+        self.idf = np.array(
+            [math.log((1 + total) / (1 + document_frequency[term])) + 1 for term in vocabulary],
+            dtype=np.float32,
+        )
+
+        self.ids = ids
+        self.positions = {book_id: position for position, book_id in enumerate(ids)}
+        self.matrix = self._csr([self._weights(terms) for terms in documents])
+        self.transposed = None
+        self.load_floors()
+
+    def _weights(self, terms):
+        """(columns, values) of one normalized row"""
+        columns, values = [], []
+        for term, count in terms.items():
+            column = self.vocabulary.get(term)
+            if column is None:
+                continue
+            weight = NAME_WEIGHT if term.startswith(('genre:', 'author:')) else 1.0
+            columns.append(column)
+            values.append((1 + math.log(count)) * self.idf[column] * weight)
+        values = np.array(values, dtype=np.float32)
+        norm = np.linalg.norm(values)
+        return columns, values / norm if norm else values
+
+    def _csr(self, rows):
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(columns) for columns, _ in rows])
+        indices = np.fromiter(
+            (column for columns, _ in rows for column in columns), dtype=np.int32, count=indptr[-1]
+        )
+        data = np.concatenate([values for _, values in rows]) if rows else np.zeros(0, np.float32)
+        return sparse.csr_matrix(
+            (data.astype(np.float32), indices, indptr), shape=(len(rows), len(self.vocabulary))
+        )
+
+    def __len__(self):
+        return len(self.positions)
+
+    def scores(self, position):
+        """Cosine similarity of one book to every row"""
+        if self.transposed is None:
+            self.transposed = self.matrix.T.tocsr()
+        return (self.matrix[position] @ self.transposed).toarray().ravel()
+
+    def set_book(self, book_id, updated_at, terms):
+        """Store a book's new vector; returns False if it did not change"""
+        self.versions[book_id] = updated_at
+        row = self._csr([self._weights(terms)])
+        position = self.positions.get(book_id)
+        if position is None:
+            self.positions[book_id] = len(self.ids)
+            self.ids.append(book_id)
+            self.matrix = sparse.vstack([self.matrix, row], format='csr')
+            self.floors = np.append(self.floors, np.float32(settings.SIMILAR_BOOKS_MIN_SCORE))
+        elif (self.matrix[position] != row).nnz == 0:
+            return False
+        else:
+            self._replace_row(position, row)
+        self.transposed = None
+        return True
+
+    def remove_book(self, book_id):
+        position = self.positions.pop(book_id, None)
+        self.versions.pop(book_id, None)
+        if position is not None:
+            # Keep the row (positions stay valid) but with no terms
+            self.ids[position] = None
+            self._replace_row(position, self._csr([([], np.zeros(0, np.float32))]))
+            self.transposed = None
+
+    def _replace_row(self, position, row):
+        self.matrix = sparse.vstack(
+            [self.matrix[:position], row, self.matrix[position + 1:]], format='csr'
+        )
+
+    def neighbors(self, position, scores):
+        """SimilarBook rows for the best-scoring other books, and the new floor"""
+        scores = scores.copy()
+        scores[position] = 0
+        count = settings.SIMILAR_BOOKS_COUNT
+        if len(scores) > count:
+            best = np.argpartition(-scores, count)[:count]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind='stable')]
+        book_id = self.ids[position]
+        links = [
+            SimilarBook(book_id=book_id, similar_id=self.ids[other], score=float(scores[other]))
+            for other in best
+            if other != position and self.ids[other] is not None
+            and scores[other] >= settings.SIMILAR_BOOKS_MIN_SCORE
+        ]
+        floor = links[-1].score if len(links) == count else settings.SIMILAR_BOOKS_MIN_SCORE
+        return links, floor
+
+    def load_floors(self):
+        """Read every book's floor back from the stored lists"""
+        self.floors = np.full(len(self.ids), settings.SIMILAR_BOOKS_MIN_SCORE, dtype=np.float32)
+        full = SimilarBook.objects.values('book').annotate(
+            total=Count('id'), lowest=Min('score')
+        ).filter(total__gte=settings.SIMILAR_BOOKS_COUNT).values_list('book', 'lowest')
+        for book_id, lowest in full:
+            position = self.positions.get(book_id)
+            if position is not None:
+                self.floors[position] = lowest
+
+
+def _book_rows(books):
+    rows = books.order_by('id').values_list('id', 'updated_at', 'description', 'genre', 'author')
+    return rows.iterator(chunk_size=2000)
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def _current_index(skip_id):
+    """
+    This process's SimilarityIndex, caught up with books saved elsewhere,
+    and whether it was just built.
+
+    skip_id's row is not synced, so the caller can tell whether it changed.
+    """
+    global _index
+    if _index is None:
+        _index = SimilarityIndex(_book_rows(Book.objects.all()))
+        return _index, True
+
+    started = timezone.now()
+    recent = Book.objects.filter(
+        updated_at__gte=_index.synced_at - SYNC_OVERLAP
+    ).exclude(id=skip_id).values_list('id', 'updated_at')
+    stale = [book_id for book_id, updated_at in recent if _index.versions.get(book_id) != updated_at]
+    expected = (
+        len(_index)
+        + Book.objects.filter(id=skip_id).exists()
+        - (skip_id in _index.positions)
+    )
+    if len(stale) > len(_index) // 10 or Book.objects.count() != expected + sum(
+        book_id not in _index.positions for book_id in stale
+    ):
+        # Many books changed, or some were deleted by another process: start over
+        _index = SimilarityIndex(_book_rows(Book.objects.all()))
+        return _index, True
+    updated = [
+        _index.set_book(book_id, updated_at, book_terms(*text))
+        for book_id, updated_at, *text in _book_rows(Book.objects.filter(id__in=stale))
+    ]
+    _index.synced_at = started
+    if any(updated):
+        _index.load_floors()
+    return _index, False
+
+
+def rebuild_similar_books():
+    """Recompute every book's neighbor list; returns the number of books"""
+    global _index
+    with _lock:
+        _index = index = SimilarityIndex(_book_rows(Book.objects.all()))
+        total = len(index.ids)
+        transposed = index.matrix.T.tocsr()
+        chunk = max(1, REBUILD_CHUNK_CELLS // max(total, 1))
+        links = []
+        floors = np.empty(total, dtype=np.float32)
+        for start in range(0, total, chunk):
+            block = (index.matrix[start:start + chunk] @ transposed).toarray()
+            for offset, scores in enumerate(block):
+                book_links, floors[start + offset] = index.neighbors(start + offset, scores)
+                links.extend(book_links)
+        with transaction.atomic():
+            SimilarBook.objects.all().delete()
+            SimilarBook.objects.bulk_create(links, batch_size=1000)
+        index.floors = floors
+        return total
+
+
+def refresh_similar_books(book_id, listed_by=()):
+    """
+    Update neighbor lists after one book was created, edited or deleted.
+
+    Besides the book's own list, only the lists it is on (or was on, for a
+    deleted book: listed_by) and the lists it now scores onto are
+    recomputed. Returns True when any list was rewritten.
+    """
+    with _lock:
+        index, fresh = _current_index(skip_id=book_id)
+        affected = set(listed_by)
+        affected.update(SimilarBook.objects.filter(similar_id=book_id).values_list('book_id', flat=True))
+
+        row = Book.objects.filter(id=book_id).values_list(
+            'updated_at', 'description', 'genre', 'author'
+        ).first()
+        position = scores = None
+        if row is None:
+            index.remove_book(book_id)
+        else:
+            updated_at, *text = row
+            if not index.set_book(book_id, updated_at, book_terms(*text)) and not fresh:
+                return False
+            position = index.positions[book_id]
+            scores = index.scores(position)
+            entering = np.flatnonzero((scores > 0) & (scores >= index.floors))
+            affected.update(index.ids[other] for other in entering.tolist())
+        affected.discard(book_id)
+
+        lists = {}
+        for other_id in affected:
+            other = index.positions.get(other_id)
+            if other is not None:
+                lists[other] = index.neighbors(other, index.scores(other))
+        if position is not None:
+            lists[position] = index.neighbors(position, scores)
+        if not lists:
+            return False
+
+        with transaction.atomic():
+            SimilarBook.objects.filter(book_id__in=[index.ids[other] for other in lists]).delete()
+            SimilarBook.objects.bulk_create(
+                [link for book_links, _ in lists.values() for link in book_links], batch_size=1000
+            )
+        for other, (_, floor) in lists.items():
+            index.floors[other] = floor
+        return True
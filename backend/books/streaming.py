@@ -0,0 +1,128 @@
+import os
+import re
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.http.request import validate_host
+from django.utils.http import content_disposition_header
+
+PDF_SUBDIR = 'books/pdfs'
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(ValueError):
+    """Raised when a Range header points past the end of the file"""
+
+
+def local_media_path(url, subdir):
+    """
+    Map a stored media URL to a file under MEDIA_ROOT/<subdir>.
+
+    Returns None for remote (e.g. Cloudinary) URLs, paths outside subdir
+    and files that are missing on disk.
+    """
+    if not url:
+        return None
+    parsed = urlparse(url)
+    if parsed.netloc and not validate_host(parsed.hostname or '', settings.ALLOWED_HOSTS):
+        return None
+
+    path = unquote(parsed.path).lstrip('/')
+    media_prefix = settings.MEDIA_URL.strip('/') + '/'
+    if path.startswith(media_prefix):
+        path = path[len(media_prefix):]
+    if not path.startswith(subdir + '/'):
+        return None
+
+    root = (Path(settings.MEDIA_ROOT) / subdir).resolve()
+    full_path = (Path(settings.MEDIA_ROOT) / path).resolve()
+    if root not in full_path.parents or not full_path.is_file():
+        return None
+    return full_path
+
+
+def local_pdf_path(pdf_url):
+    """Local file behind a stored pdf_file value, or None if it is remote"""
+    return local_media_path(pdf_url, PDF_SUBDIR)
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range "bytes=start-end" header into (start, end), inclusive.
+
+    Returns None when the header is absent or not something we serve as a
+    range (multiple ranges, other units), so the whole file is sent instead.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            raise RangeNotSatisfiable(header)
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable(header)
+    return start, end
+
+
+def _read_range(path, start, length, chunk_size):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def stream_pdf(request, path, filename):
+    """
+    Stream a local PDF, honouring single-range Range requests.
+
+    Full downloads use FileResponse so the server can hand the file to
+    wsgi.file_wrapper (sendfile) instead of copying it through Python.
+    """
+    size = os.path.getsize(path)
+    try:
+        byte_range = parse_range(request.headers.get('Range'), size)
+    except RangeNotSatisfiable:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+    if byte_range is None:
+        response = FileResponse(
+            open(path, 'rb'),
+            content_type='application/pdf',
+            as_attachment=True,
+            filename=filename,
+        )
+        response['Content-Length'] = str(size)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _read_range(path, start, length, settings.PDF_STREAM_CHUNK_SIZE),
+            status=206,
+            content_type='application/pdf',
+        )
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+
+    response['Accept-Ranges'] = 'bytes'
+    return response
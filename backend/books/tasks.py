@@ -0,0 +1,53 @@
+from jobs.queue import task
+
+from .cache import bump_catalog_version
+from .models import Book
+from .pdfs import PDF_METADATA_DEFAULTS, update_book_pdf_metadata
+from .search import index_book, unindex_book
+from .thumbnails import update_book_thumbnails
+
+
+@task('books.reindex')
+def reindex_book(book_id):
+    """Bring one book's full-text index entry up to date (or drop it)"""
+    book = Book.objects.filter(pk=book_id).first()
+    if book is None:
+        unindex_book(book_id)
+    else:
+        index_book(book)
+
+
+@task('books.generate_thumbnails')
+def generate_thumbnails(book_id):
+    """Render resized covers for a book whose cover changed"""
+    book = Book.objects.only('id', 'cover_image', 'cover_variants').filter(pk=book_id).first()
+    if book is not None and update_book_thumbnails(book):
+        bump_catalog_version()
+
+
+@task('books.extract_pdf_metadata')
+def refresh_pdf_metadata(book_id):
+    """Fill in page count, size, hash and preview from a book's local PDF"""
+    book = Book.objects.only('id', 'pdf_file', *PDF_METADATA_DEFAULTS).filter(pk=book_id).first()
+    if book is not None and update_book_pdf_metadata(book):
+        bump_catalog_version()
+
+
+# NumPy/SciPy are only imported by the process that runs these jobs
+
+@task('books.refresh_similar')
+def refresh_similar(book_id, listed_by=()):
+    """Update the "similar books" lists one created, edited or deleted book affects"""
+    from .similar import refresh_similar_books
+
+    if refresh_similar_books(book_id, listed_by):
+        bump_catalog_version()
+
+
+@task('books.rebuild_similar')
+def rebuild_similar():
+    """Recompute every "similar books" list (after bulk imports)"""
+    from .similar import rebuild_similar_books
+
+    rebuild_similar_books()
+    bump_catalog_version()
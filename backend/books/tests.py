@@ -1,3 +1,1158 @@
-from django.test import TestCase
+import base64
+import csv
+import gzip
+import hashlib
+import importlib
+import io
+import json
+import time
+import shutil
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlparse
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from django.utils.http import http_date
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from accounts.models import User
+from jobs.models import Job
+
+from . import async_views, autocomplete, similar
+from .autocomplete import AutocompleteIndex
+from .bulk import export_books, import_books, iter_rows
+from .cache import bump_catalog_version, get_cache_stats, get_catalog_version
+from .feed import ExpiredCursor, encode_feed_cursor, get_changes, purge_tombstones
+from .models import Author, Book, DeletedBook, Genre, SimilarBook
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, paginate_books
+from .pdfs import extract_pdf_metadata, update_book_pdf_metadata
+from .search import rebuild_index, search_books
+from .serializers import (
+    COMPACT_BOOK_FIELDS, BookSerializer, book_fields, select_book_fields, serialize_book_rows,
+)
+from .signing import build_signed_url, verify_signature
+from .streaming import RangeNotSatisfiable, parse_range
+from .tasks import generate_thumbnails, refresh_pdf_metadata
+from .thumbnails import build_cover_variants, update_book_thumbnails
+
+
+def make_book(title, **fields):
+    fields.setdefault('author', 'Chinua Achebe')
+    fields.setdefault('genre', 'Fiction')
+    fields.setdefault('description', f'About {title}')
+    return Book.objects.create(title=title, **fields)
+
+
+def make_user(email='reader@example.com', **fields):
+    return User.objects.create_user(
+        email=email, username=email.split('@')[0], password='s3cret-pass',
+        first_name='Ada', last_name='Obi', **fields,
+    )
+
+
+class MediaRootMixin:
+    """Point MEDIA_ROOT at a temporary directory for the test"""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media = override_settings(MEDIA_ROOT=str(self.media_root))
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def media_file(self, relative_path, content):
+        path = self.media_root / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        return path
+
+
+def walk(books, page_size, ranked=False):
+    """Every page of a forward cursor walk, as lists of ids"""
+    pages, cursor = [], None
+    while True:
+        rows, cursor, _ = paginate_books(books, cursor=cursor, page_size=page_size, ranked=ranked)
+        pages.append([book.id for book in rows])
+        if cursor is None:
+            return pages
+
+
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Repeated titles make the id tie-breaker matter
+        for title in ['Arrow of God', 'Efuru', 'Efuru', 'Efuru', 'Half of a Yellow Sun', 'Zaabalawi', 'Efuru']:
+            make_book(title)
+        cls.ordered = list(Book.objects.order_by('title', 'id').values_list('id', flat=True))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_forward_walk_visits_every_book_once(self):
+        for page_size in (1, 2, 3, 7, 50):
+            pages = walk(Book.objects.all(), page_size)
+            ids = [book_id for page in pages for book_id in page]
+            self.assertEqual(ids, self.ordered, f'page_size={page_size}')
+            self.assertTrue(all(len(page) <= page_size for page in pages))
+
+    def test_previous_cursor_walks_back(self):
+        rows, next_cursor, previous_cursor = paginate_books(Book.objects.all(), page_size=3)
+        self.assertIsNone(previous_cursor)
+        rows, _, previous_cursor = paginate_books(Book.objects.all(), cursor=next_cursor, page_size=3)
+        self.assertEqual([book.id for book in rows], self.ordered[3:6])
+        rows, _, previous_cursor = paginate_books(Book.objects.all(), cursor=previous_cursor, page_size=3)
+        self.assertEqual([book.id for book in rows], self.ordered[:3])
+        self.assertIsNone(previous_cursor)
+
+    def test_cursor_round_trip(self):
+        book = Book.objects.get(id=self.ordered[2])
+        self.assertEqual(decode_cursor(encode_cursor(book)), (book.title, book.id, False))
+        self.assertEqual(decode_cursor(encode_cursor(book, reverse=True)), (book.title, book.id, True))
+
+    def test_tampered_cursors_are_rejected(self):
+        not_json = base64.urlsafe_b64encode(b'{"t": "Efuru"').decode()
+        missing_id = base64.urlsafe_b64encode(b'{"t": "Efuru"}').decode()
+        bad_id = base64.urlsafe_b64encode(b'{"t": "Efuru", "i": "x"}').decode()
+        for cursor in ('garbage!', not_json, missing_id, bad_id):
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(cursor)
+
+    def test_tampered_cursor_returns_400(self):
+        response = self.client.get('/api/books/', {'cursor': 'garbage!', 'page_size': 2}, secure=True)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Invalid cursor'})
+
+    def test_api_walk_matches_the_catalog(self):
+        ids, params = [], {'page_size': 2}
+        while True:
+            data = self.client.get('/api/books/', params, secure=True).json()
+            ids += [book['id'] for book in data['books']]
+            if not data['next']:
+                break
+            params['cursor'] = data['next']
+        self.assertEqual(ids, self.ordered)
+
+
+class RankedSearchPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_book('River Between', description='A river and a village')
+        make_book('The River', description='river river river')
+        make_book('Arrow of God', description='No match here')
+        make_book('Night River', description='Crossing at night')
+        make_book('Anthills', description='The river dried up')
+        rebuild_index()
+
+    def test_pages_keep_relevance_order(self):
+        matches, truncated = search_books(Book.objects.all(), 'river')
+        ranked = [book.id for book in matches]
+        self.assertEqual(len(ranked), 4)
+        self.assertFalse(truncated)
+        pages = walk(matches, page_size=1, ranked=True)
+        self.assertEqual([book_id for page in pages for book_id in page], ranked)
+
+    def test_title_cursor_is_rejected_for_a_search(self):
+        book = Book.objects.first()
+        matches, _ = search_books(Book.objects.all(), 'river')
+        with self.assertRaises(InvalidCursor):
+            paginate_books(matches, cursor=encode_cursor(book), ranked=True)
+
+    @override_settings(BOOKS_SEARCH_MAX_RESULTS=2)
+    def test_capped_results_are_flagged(self):
+        matches, truncated = search_books(Book.objects.all(), 'river')
+        self.assertEqual(matches.count(), 2)
+        self.assertTrue(truncated)
+
+    def test_api_pages_search_results(self):
+        cache.clear()
+        ids, params = [], {'search': 'river', 'page_size': 3}
+        while True:
+            data = self.client.get('/api/books/', params, secure=True).json()
+            self.assertFalse(data['truncated'])
+            ids += [book['id'] for book in data['books']]
+            if not data['next']:
+                break
+            params['cursor'] = data['next']
+        matches, _ = search_books(Book.objects.all(), 'river')
+        self.assertEqual(ids, [book.id for book in matches])
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.book = make_book('Efuru')
+        self.url = f'/api/books/{self.book.id}/'
+
+    def get(self, url=None, **params):
+        return self.client.get(url or self.url, params, secure=True)
+
+    def test_repeat_reads_are_served_from_the_cache(self):
+        self.get()
+        # Only the Last-Modified lookup; the body comes from the cache
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get().json()['title'], 'Efuru')
+        self.assertEqual(get_cache_stats()['hits'], 1)
+        self.assertEqual(get_cache_stats()['misses'], 1)
+
+    def test_query_string_order_shares_an_entry(self):
+        self.get('/api/books/', page_size=2, view='compact')
+        hits = get_cache_stats()['hits']
+        self.client.get('/api/books/?view=compact&page_size=2', secure=True)
+        self.assertEqual(get_cache_stats()['hits'], hits + 1)
+
+    def test_writes_bump_the_version(self):
+        self.get()
+        version = get_catalog_version()
+        # A bulk update sends no signal, so the cached body is still served...
+        Book.objects.filter(id=self.book.id).update(title='Efuru (2nd edition)')
+        self.assertEqual(self.get().json()['title'], 'Efuru')
+        # ...until the catalog version moves on
+        bump_catalog_version()
+        self.assertEqual(get_catalog_version(), version + 1)
+        self.assertEqual(self.get().json()['title'], 'Efuru (2nd edition)')
+
+        self.book.refresh_from_db()
+        self.book.title = 'Efuru (3rd edition)'
+        self.book.save()
+        self.assertEqual(self.get().json()['title'], 'Efuru (3rd edition)')
+
+    def test_errors_are_not_cached(self):
+        self.get('/api/books/999999/')
+        self.assertEqual(self.get('/api/books/999999/').status_code, 404)
+        self.assertEqual(get_cache_stats()['hits'], 0)
+
+    @override_settings(CATALOG_CACHE_ENABLED=False)
+    def test_cache_can_be_turned_off(self):
+        self.get()
+        self.get()
+        self.assertEqual(get_cache_stats()['hits'], 0)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.book = make_book('Efuru')
+        self.other = make_book('Arrow of God')
+        self.url = f'/api/books/{self.book.id}/'
+
+    def get(self, url, etag=None, **params):
+        headers = {'If-None-Match': etag} if etag else {}
+        return self.client.get(url, params, secure=True, headers=headers)
+
+    def test_detail_revalidates_against_the_book(self):
+        response = self.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Last-Modified'], http_date(self.book.updated_at.timestamp()))
+        etag = response['ETag']
+        self.assertEqual(self.get(self.url, etag).status_code, 304)
+
+        # Other books changing leave this one's validators alone
+        self.other.title = 'Arrow of God (2nd edition)'
+        self.other.save()
+        self.assertEqual(self.get(self.url, etag).status_code, 304)
+
+        self.book.title = 'Efuru (2nd edition)'
+        self.book.save()
+        response = self.get(self.url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['title'], 'Efuru (2nd edition)')
+
+    def test_missing_book_is_404(self):
+        for etag in (None, '*', '"999999-0.000000"'):
+            response = self.get('/api/books/999999/', etag)
+            self.assertEqual(response.status_code, 404)
+            self.assertFalse(response.has_header('ETag'))
+
+    def test_list_revalidates_against_its_books(self):
+        response = self.get('/api/books/', page_size=10)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(self.get('/api/books/', etag, page_size=10).status_code, 304)
+
+        self.other.title = 'Arrow of God (2nd edition)'
+        self.other.save()
+        response = self.get('/api/books/', etag, page_size=10)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        # A delete leaves max(updated_at) alone but changes the count
+        Book.objects.filter(id=self.book.id).delete()
+        self.assertEqual(self.get('/api/books/', etag, page_size=10).status_code, 200)
+
+    def test_filtered_list_ignores_other_books(self):
+        make_book('Death and the King\'s Horseman', author='Wole Soyinka')
+        etag = self.get('/api/books/', author='Wole Soyinka')['ETag']
+        self.other.title = 'Arrow of God (2nd edition)'
+        self.other.save()
+        self.assertEqual(self.get('/api/books/', etag, author='Wole Soyinka').status_code, 304)
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.book = make_book('Efuru')
+        make_book('Arrow of God')
+        self.factory = AsyncRequestFactory()
+
+    def sync_get(self, url, **params):
+        return self.client.get(url, params, secure=True)
+
+    async def test_responses_match_the_sync_views(self):
+        for view, url, args in (
+            (async_views.get_books, '/api/books/', ()),
+            (async_views.get_book, f'/api/books/{self.book.id}/', (self.book.id,)),
+        ):
+            params = {'page_size': 1} if not args else {}
+            response = await view(self.factory.get(url, params), *args)
+            expected = await sync_to_async(self.sync_get)(url, **params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.content), expected.json())
+            self.assertEqual(response['ETag'], expected['ETag'])
+            self.assertEqual(response['Last-Modified'], expected['Last-Modified'])
+
+            request = self.factory.get(url, params, headers={'If-None-Match': response['ETag']})
+            revalidated = await view(request, *args)
+            self.assertEqual(revalidated.status_code, 304)
+
+    async def test_missing_book(self):
+        response = await async_views.get_book(self.factory.get('/api/books/999999/'), 999999)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(json.loads(response.content), {'error': 'Book not found'})
+        self.assertFalse(response.has_header('ETag'))
+
+    async def test_cache_is_shared_with_the_sync_views(self):
+        url = f'/api/books/{self.book.id}/'
+        await sync_to_async(self.sync_get)(url)
+        hits = get_cache_stats()['hits']
+        await async_views.get_book(self.factory.get(url), self.book.id)
+        self.assertEqual(get_cache_stats()['hits'], hits + 1)
+
+    async def test_bad_parameters(self):
+        response = await async_views.get_books(self.factory.get('/api/books/', {'cursor': 'garbage!'}))
+        self.assertEqual(response.status_code, 400)
+        response = await async_views.get_books(self.factory.get('/api/books/', {'fields': 'nope'}))
+        self.assertEqual(response.status_code, 400)
+
+    async def test_download_needs_a_user(self):
+        pdf_url = 'https://res.cloudinary.com/demo/efuru.pdf'
+        await Book.objects.filter(id=self.book.id).aupdate(pdf_file=pdf_url)
+        user = await sync_to_async(make_user)()
+        token = await Token.objects.acreate(user=user)
+
+        async def anonymous():
+            return AnonymousUser()
+
+        async def download(**headers):
+            request = self.factory.get(f'/api/books/{self.book.id}/download/', headers=headers)
+            request.auser = anonymous  # set by AuthenticationMiddleware in a real request
+            return await async_views.download_book(request, self.book.id)
+
+        response = await download()
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+        self.assertEqual((await download(Authorization='Token nope')).status_code, 401)
+        response = await download(Authorization=f'Token {token.key}')
+        self.assertEqual(json.loads(response.content), {'download_url': pdf_url})
+
+class ParseRangeTests(SimpleTestCase):
+    def test_suffix_range(self):
+        self.assertEqual(parse_range('bytes=-100', 1000), (900, 999))
+        # Longer than the file: the whole file
+        self.assertEqual(parse_range('bytes=-5000', 1000), (0, 999))
+
+    def test_open_ended_range(self):
+        self.assertEqual(parse_range('bytes=500-', 1000), (500, 999))
+        self.assertEqual(parse_range('bytes=0-', 1000), (0, 999))
+
+    def test_closed_range_is_clamped_to_the_file(self):
+        self.assertEqual(parse_range('bytes=10-19', 1000), (10, 19))
+        self.assertEqual(parse_range('bytes=990-5000', 1000), (990, 999))
+
+    def test_unsatisfiable_ranges(self):
+        for header in ('bytes=1000-', 'bytes=2000-3000', 'bytes=20-10', 'bytes=-0'):
+            with self.assertRaises(RangeNotSatisfiable, msg=header):
+                parse_range(header, 1000)
+
+    def test_ranges_served_as_the_whole_file(self):
+        for header in (None, '', 'bytes=-', 'bytes=0-1,5-6', 'items=0-10', 'bytes=a-b'):
+            self.assertIsNone(parse_range(header, 1000), header)
+
+
+class PdfStreamingTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_file('books/pdfs/efuru.pdf', b'%PDF-0123456789')
+        self.book = make_book('Efuru', pdf_file='/media/books/pdfs/efuru.pdf')
+        self.token = Token.objects.create(user=make_user())
+        self.url = f'/api/books/{self.book.id}/download/'
+
+    def download(self, range_header=None, **params):
+        headers = {'Authorization': f'Token {self.token.key}'}
+        if range_header:
+            headers['Range'] = range_header
+        return self.client.get(self.url, {'stream': 1, **params}, secure=True, headers=headers)
+
+    def test_whole_file(self):
+        response = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-0123456789')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertTrue(response['Content-Disposition'].startswith('attachment'))
+
+    def test_partial_content(self):
+        response = self.download('bytes=5-8')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 5-8/15')
+        self.assertEqual(b''.join(response.streaming_content), b'0123')
+
+    def test_unsatisfiable_range(self):
+        response = self.download('bytes=100-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */15')
+
+    def test_remote_files_are_linked(self):
+        Book.objects.filter(id=self.book.id).update(pdf_file='https://res.cloudinary.com/demo/efuru.pdf')
+        self.assertEqual(self.download().json(), {'download_url': 'https://res.cloudinary.com/demo/efuru.pdf'})
+
+    def test_login_required(self):
+        self.assertEqual(self.client.get(self.url, secure=True).status_code, 401)
+
+
+class SignedUrlTests(SimpleTestCase):
+    def sign(self, ttl=None):
+        request = RequestFactory().get('/api/books/1/download/')
+        path = Path(settings.MEDIA_ROOT).resolve() / 'books' / 'pdfs' / 'Efuru.pdf'
+        url, expires = build_signed_url(request, path, ttl=ttl)
+        parsed = urlparse(url)
+        query = parse_qs(parsed.query)
+        relative_path = unquote(parsed.path)[len(settings.SIGNED_MEDIA_URL):]
+        return relative_path, query['expires'][0], query['signature'][0], expires
+
+    def test_valid_signature(self):
+        relative_path, expires, signature, _ = self.sign()
+        self.assertEqual(relative_path, 'books/pdfs/Efuru.pdf')
+        self.assertTrue(verify_signature(relative_path, expires, signature))
+
+    def test_expired_signature(self):
+        relative_path, expires, signature, expires_at = self.sign(ttl=-1)
+        self.assertLess(expires_at, time.time())
+        self.assertFalse(verify_signature(relative_path, expires, signature))
+
+    def test_tampering_is_rejected(self):
+        relative_path, expires, signature, _ = self.sign()
+        self.assertFalse(verify_signature('books/pdfs/Other.pdf', expires, signature))
+        self.assertFalse(verify_signature(relative_path, str(int(expires) + 3600), signature))
+        flipped = signature[:-1] + ('1' if signature.endswith('0') else '0')
+        self.assertFalse(verify_signature(relative_path, expires, flipped))
+        self.assertFalse(verify_signature(relative_path, expires, None))
+        self.assertFalse(verify_signature(relative_path, 'soon', signature))
+
+
+class SignedDownloadTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_file('books/pdfs/efuru.pdf', b'%PDF-0123456789')
+        self.book = make_book('Efuru', pdf_file='/media/books/pdfs/efuru.pdf')
+        self.token = Token.objects.create(user=make_user())
+
+    def signed_url(self):
+        response = self.client.get(
+            f'/api/books/{self.book.id}/download/', secure=True,
+            headers={'Authorization': f'Token {self.token.key}'},
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()['download_url']
+
+    def test_signed_link_serves_the_file_without_a_query(self):
+        url = self.signed_url()
+        with self.assertNumQueries(0):
+            response = self.client.get(url, secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Disposition'].startswith('attachment'))
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-0123456789')
+
+        ranged = self.client.get(url, secure=True, headers={'Range': 'bytes=0-3'})
+        self.assertEqual(ranged.status_code, 206)
+
+    def test_tampered_and_expired_links_are_forbidden(self):
+        url = self.signed_url()
+        self.assertEqual(self.client.get(url.replace('efuru', 'other'), secure=True).status_code, 403)
+        self.assertEqual(self.client.get(url + '0', secure=True).status_code, 403)
+        with override_settings(PDF_SIGNED_URL_TTL=-1):
+            self.assertEqual(self.client.get(self.signed_url(), secure=True).status_code, 403)
+
+    def test_only_safe_methods(self):
+        self.assertEqual(self.client.post(self.signed_url(), secure=True).status_code, 405)
+
+    @override_settings(SIGNED_MEDIA_ACCEL_REDIRECT='/protected/')
+    def test_accel_redirect(self):
+        response = self.client.get(self.signed_url(), secure=True)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/books/pdfs/efuru.pdf')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="efuru.pdf"')
+
+
+@override_settings(COVER_THUMBNAIL_WIDTHS=[160, 320, 640])
+class ThumbnailTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cover = self.media_root / 'books' / 'covers' / 'efuru.png'
+        cover.parent.mkdir(parents=True)
+        Image.new('RGB', (400, 600), 'teal').save(cover)
+        self.cover_url = '/media/books/covers/efuru.png'
+
+    def test_local_cover_variants(self):
+        variants = build_cover_variants(self.cover_url)
+        self.assertEqual(variants['source'], self.cover_url)
+        # Never upscaled past the original width
+        self.assertEqual([width for width, _ in variants['webp']], [160, 320, 400])
+        self.assertEqual([width for width, _ in variants['jpeg']], [160, 320, 400])
+        for width, url in variants['webp'] + variants['jpeg']:
+            path = self.media_root / url[len(settings.MEDIA_URL):]
+            with Image.open(path) as image:
+                self.assertEqual(image.size, (width, width * 3 // 2))
+
+    def test_identical_covers_share_files(self):
+        copy = self.media_root / 'books' / 'covers' / 'copy.png'
+        copy.write_bytes((self.media_root / 'books' / 'covers' / 'efuru.png').read_bytes())
+        first = build_cover_variants(self.cover_url)
+        second = build_cover_variants('/media/books/covers/copy.png')
+        self.assertEqual(first['hash'], second['hash'])
+        self.assertEqual(first['jpeg'], second['jpeg'])
+
+    def test_remote_and_unreadable_covers(self):
+        cloudinary = 'https://res.cloudinary.com/demo/image/upload/v1/efuru.jpg'
+        variants = build_cover_variants(cloudinary)
+        self.assertEqual(
+            variants['webp'][0],
+            [160, 'https://res.cloudinary.com/demo/image/upload/c_limit,w_160,f_webp,q_auto/v1/efuru.jpg'],
+        )
+        remote = 'https://example.com/efuru.jpg'
+        self.assertEqual(build_cover_variants(remote), {'source': remote})
+        self.media_file('books/covers/broken.png', b'not an image')
+        broken = '/media/books/covers/broken.png'
+        self.assertEqual(build_cover_variants(broken), {'source': broken})
+        self.assertEqual(build_cover_variants(None), {})
+
+    def test_task_updates_the_book_once(self):
+        book = make_book('Efuru', cover_image=self.cover_url)
+        updated_at = Book.objects.get(id=book.id).updated_at
+        version = get_catalog_version()
+        generate_thumbnails(book.id)
+        book.refresh_from_db()
+        self.assertEqual(book.cover_variants['source'], self.cover_url)
+        self.assertGreater(book.updated_at, updated_at)
+        self.assertEqual(get_catalog_version(), version + 1)
+        self.assertFalse(update_book_thumbnails(book))
+
+        data = self.client.get(f'/api/books/{book.id}/', secure=True).json()
+        self.assertEqual([variant['width'] for variant in data['cover_variants']['webp']], [160, 320, 400])
+
+    @override_settings(JOBS_ASYNC=True)
+    def test_cover_changes_queue_a_job(self):
+        book = make_book('Efuru')
+        self.assertFalse(Job.objects.filter(name='books.generate_thumbnails').exists())
+        book.cover_image = self.cover_url
+        book.save()
+        self.assertEqual(Job.objects.filter(name='books.generate_thumbnails').count(), 1)
+
+
+class PdfMetadataTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.pdf = self.media_root / 'books' / 'pdfs' / 'efuru.pdf'
+        self.pdf.parent.mkdir(parents=True)
+        pages = [Image.new('RGB', (600, 800), color) for color in ('white', 'teal', 'navy')]
+        pages[0].save(self.pdf, 'PDF', save_all=True, append_images=pages[1:])
+
+    def test_extract(self):
+        metadata = extract_pdf_metadata(self.pdf)
+        digest = hashlib.sha256(self.pdf.read_bytes()).hexdigest()
+        self.assertEqual(metadata['pdf_pages'], 3)
+        self.assertEqual(metadata['pdf_size'], self.pdf.stat().st_size)
+        self.assertEqual(metadata['pdf_hash'], digest)
+        self.assertEqual(metadata['pdf_preview'], f'/media/books/previews/{digest[:2]}/{digest}.jpg')
+        with Image.open(self.media_root / metadata['pdf_preview'][len('/media/'):]) as preview:
+            self.assertEqual(preview.size[0], settings.PDF_PREVIEW_WIDTH)
+
+    def test_unreadable_file_keeps_size_and_hash(self):
+        self.pdf.write_bytes(b'not a pdf')
+        metadata = extract_pdf_metadata(self.pdf)
+        self.assertEqual((metadata['pdf_pages'], metadata['pdf_size'], metadata['pdf_preview']), (None, 9, ''))
+        self.assertEqual(len(metadata['pdf_hash']), 64)
+
+    def test_update_bumps_updated_at_only_on_change(self):
+        book = make_book('Efuru', pdf_file='/media/books/pdfs/efuru.pdf')
+        before = book.updated_at
+        self.assertTrue(update_book_pdf_metadata(book))
+        book.refresh_from_db()
+        self.assertEqual(book.pdf_pages, 3)
+        self.assertGreater(book.updated_at, before)
+        self.assertFalse(update_book_pdf_metadata(book))
+
+        Book.objects.filter(id=book.id).update(pdf_file='https://res.cloudinary.com/demo/efuru.pdf')
+        book.refresh_from_db()
+        self.assertTrue(update_book_pdf_metadata(book))
+        book.refresh_from_db()
+        self.assertEqual((book.pdf_pages, book.pdf_size, book.pdf_hash, book.pdf_preview), (None, None, '', ''))
+
+    def test_saving_a_new_pdf_queues_the_task(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            book = make_book('Efuru', pdf_file='/media/books/pdfs/efuru.pdf')
+        book.refresh_from_db()
+        self.assertEqual(book.pdf_pages, 3)
+
+        with override_settings(JOBS_ASYNC=True), self.captureOnCommitCallbacks(execute=True):
+            book.title = 'Efuru (2nd edition)'
+            book.save()
+            self.assertFalse(Job.objects.filter(name='books.extract_pdf_metadata').exists())
+            book.pdf_file = '/media/books/pdfs/other.pdf'
+            book.save()
+        job = Job.objects.get(name='books.extract_pdf_metadata')
+        self.assertEqual(job.payload, {'book_id': book.id})
+
+    def test_task_bumps_the_catalog_version(self):
+        book = make_book('Efuru', pdf_file='/media/books/pdfs/efuru.pdf')
+        version = get_catalog_version()
+        refresh_pdf_metadata(book.id)
+        self.assertEqual(get_catalog_version(), version + 1)
+        refresh_pdf_metadata(book.id)
+        self.assertEqual(get_catalog_version(), version + 1)
+        refresh_pdf_metadata(999999)
+
+    def test_command(self):
+        make_book('Efuru', pdf_file='/media/books/pdfs/efuru.pdf')
+        make_book('Things Fall Apart')
+        out = io.StringIO()
+        call_command('extract_pdf_metadata', stdout=out)
+        self.assertIn('Updated PDF metadata for 1 books', out.getvalue())
+        call_command('extract_pdf_metadata', stdout=out)
+        self.assertIn('Updated PDF metadata for 0 books', out.getvalue())
+
+    def test_dedupe(self):
+        copy = self.pdf.with_name('efuru_a1b2c3.pdf')
+        copy.write_bytes(self.pdf.read_bytes())
+        book = make_book('Efuru', pdf_file='/media/books/pdfs/efuru_a1b2c3.pdf')
+        out = io.StringIO()
+        call_command('dedupe_pdfs', stdout=out)
+        self.assertIn('efuru_a1b2c3.pdf is a copy of efuru.pdf', out.getvalue())
+        self.assertTrue(copy.exists())
+
+        call_command('dedupe_pdfs', '--delete', stdout=out)
+        self.assertFalse(copy.exists())
+        book.refresh_from_db()
+        self.assertEqual(book.pdf_file, '/media/books/pdfs/efuru.pdf')
+
+
+class AutocompleteIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = AutocompleteIndex(1, [
+            (1, 'Things Fall Apart', 'Chinua Achebe', 'chinua-achebe'),
+            (2, 'Arrow of God', 'Chinua Achebe', 'chinua-achebe'),
+            (3, 'Thé Fishermen', 'Chigozie Obioma', 'chigozie-obioma'),
+            (4, 'Americanah', 'Chimamanda Ngozi Adichie', 'chimamanda-ngozi-adichie'),
+        ])
+
+    def test_whole_name_prefix_before_later_words(self):
+        texts = [suggestion['text'] for suggestion in self.index.suggest('a', 10)]
+        self.assertEqual(texts[:2], ['Americanah', 'Arrow of God'])
+        # "Apart" and "Achebe"/"Adichie" only match on a later word
+        self.assertEqual(set(texts[2:]), {'Things Fall Apart', 'Chinua Achebe', 'Chimamanda Ngozi Adichie'})
+
+    def test_case_and_accent_insensitive(self):
+        self.assertEqual(self.index.suggest('THE F', 5), [
+            {'type': 'title', 'text': 'Thé Fishermen', 'book_id': 3},
+        ])
+
+    def test_authors_are_suggested_once(self):
+        authors = [s for s in self.index.suggest('chinua', 10) if s['type'] == 'author']
+        self.assertEqual(authors, [{'type': 'author', 'text': 'Chinua Achebe', 'slug': 'chinua-achebe'}])
+
+    def test_limit_and_empty_queries(self):
+        self.assertEqual(len(self.index.suggest('ch', 2)), 2)
+        self.assertEqual(self.index.suggest('   ', 10), [])
+        self.assertEqual(self.index.suggest('zzz', 10), [])
+
+
+class AutocompleteEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        autocomplete._index = None
+        self.addCleanup(setattr, autocomplete, '_index', None)
+        make_book('Things Fall Apart')
+        make_book('The Joys of Motherhood', author='Buchi Emecheta')
+
+    def suggest(self, **params):
+        return self.client.get('/api/books/autocomplete/', params, secure=True).json()
+
+    def test_suggestions(self):
+        data = self.suggest(q='th')
+        self.assertEqual(data['query'], 'th')
+        texts = [suggestion['text'] for suggestion in data['suggestions']]
+        self.assertEqual(texts, ['The Joys of Motherhood', 'Things Fall Apart'])
+        self.assertEqual(len(self.suggest(q='th', limit=1)['suggestions']), 1)
+        self.assertEqual(len(self.suggest(q='th', limit='many')['suggestions']), 2)
+        self.assertEqual(self.suggest(q='buchi')['suggestions'][0]['type'], 'author')
+
+    def test_stale_index_answers_while_rebuilding(self):
+        index = autocomplete.get_autocomplete_index()
+        make_book('Efuru', author='Flora Nwapa')
+        self.assertNotEqual(index.version, get_catalog_version())
+        # Hold the lock, as a rebuild in progress would: the old index keeps answering
+        with autocomplete._lock:
+            self.assertIs(autocomplete.get_autocomplete_index(), index)
+            self.assertEqual(self.suggest(q='efu')['suggestions'], [])
+
+
+@override_settings(SIMILAR_BOOKS_COUNT=2)
+class SimilarBooksTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Each process keeps its index between calls; start from this test's books
+        similar._index = None
+        self.addCleanup(setattr, similar, '_index', None)
+        self.books = {
+            title: make_book(title, author=author, genre=genre, description=description).id
+            for title, author, genre, description in (
+                ('Things Fall Apart', 'Chinua Achebe', 'Fiction',
+                 'Okonkwo, a proud wrestler of an Igbo village, faces colonial missionaries'),
+                ('Arrow of God', 'Chinua Achebe', 'Fiction',
+                 'Ezeulu, chief priest of an Igbo village, faces colonial rule'),
+                ('Efuru', 'Flora Nwapa', 'Fiction', 'A woman of an Igbo village trades and marries'),
+                ('Jollof Nights', 'Tunde Bello', 'Cooking', 'Recipes for rice, stew, pepper and plantain'),
+                ('Suya at Home', 'Kemi Ade', 'Cooking', 'Recipes for grilled pepper beef and plantain'),
+            )
+        }
+
+    def lists(self):
+        result = {}
+        for link in SimilarBook.objects.all():
+            result.setdefault(link.book_id, []).append(link.similar_id)
+        return result
+
+    def test_rebuild(self):
+        self.assertEqual(similar.rebuild_similar_books(), 5)
+        lists = self.lists()
+        ids = self.books
+        self.assertEqual(lists[ids['Things Fall Apart']], [ids['Arrow of God'], ids['Efuru']])
+        self.assertEqual(lists[ids['Jollof Nights']], [ids['Suya at Home']])
+        for book_id, neighbors in lists.items():
+            self.assertNotIn(book_id, neighbors)
+
+    def test_endpoint(self):
+        similar.rebuild_similar_books()
+        url = f'/api/books/{self.books["Arrow of God"]}/similar/'
+        books = self.client.get(url, secure=True).json()['books']
+        self.assertEqual([book['title'] for book in books], ['Things Fall Apart', 'Efuru'])
+        self.assertGreater(books[0]['score'], books[1]['score'])
+        self.assertEqual(set(books[0]), {*COMPACT_BOOK_FIELDS, 'score'})
+        self.assertEqual(len(self.client.get(url, {'limit': 1}, secure=True).json()['books']), 1)
+        self.assertEqual(self.client.get('/api/books/999999/similar/', secure=True).status_code, 404)
+
+    def test_edited_book_moves_between_lists(self):
+        similar.rebuild_similar_books()
+        moved = Book.objects.get(id=self.books['Suya at Home'])
+        moved.genre = 'Fiction'
+        moved.description = 'A proud Igbo village wrestler faces colonial missionaries'
+        moved.save()
+        self.assertTrue(similar.refresh_similar_books(moved.id))
+        refreshed = self.lists()
+        ids = self.books
+        self.assertIn(moved.id, refreshed[ids['Things Fall Apart']])
+        self.assertEqual(set(refreshed[moved.id]), {ids['Things Fall Apart'], ids['Efuru']})
+        self.assertNotIn(ids['Jollof Nights'], refreshed)
+        # Nothing changed since: nothing to rewrite
+        self.assertFalse(similar.refresh_similar_books(moved.id))
+
+    def test_deleted_book_leaves_the_lists(self):
+        similar.rebuild_similar_books()
+        gone = self.books['Arrow of God']
+        listed_by = list(SimilarBook.objects.filter(similar_id=gone).values_list('book_id', flat=True))
+        Book.objects.filter(id=gone).delete()
+        self.assertTrue(similar.refresh_similar_books(gone, listed_by))
+        refreshed = self.lists()
+        self.assertNotIn(gone, [book_id for neighbors in refreshed.values() for book_id in neighbors])
+        self.assertEqual(refreshed[self.books['Things Fall Apart']], [self.books['Efuru']])
+
+    def test_command(self):
+        out = io.StringIO()
+        version = get_catalog_version()
+        call_command('rebuild_similar_books', stdout=out)
+        self.assertIn('Rebuilt similar books for 5 books', out.getvalue())
+        self.assertEqual(get_catalog_version(), version + 1)
+
+
+class BulkImportExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = Token.objects.create(user=make_user('admin@example.com', is_staff=True))
+
+    def upload(self, content, name='books.csv', user_token=None, **params):
+        token = user_token or self.admin
+        query = '&'.join(f'{key}={value}' for key, value in params.items())
+        return self.client.post(
+            f'/api/books/import/?{query}', {'file': SimpleUploadedFile(name, content)}, secure=True,
+            headers={'Authorization': f'Token {token.key}'},
+        )
+
+    def test_csv_creates_and_updates(self):
+        book = make_book('Efuru')
+        content = (
+            'id,title,author,genre,description\n'
+            f'{book.id},Efuru (2nd edition),Flora Nwapa,Fiction,Village life\n'
+            ',Arrow of God,Chinua Achebe,Fiction,A priest\n'
+            ',,Chinua Achebe,Fiction,No title\n'
+            '999999,Ghost,Nobody,Fiction,Missing\n'
+        ).encode()
+        summary = self.upload(content).json()
+        self.assertEqual((summary['rows'], summary['created'], summary['updated']), (4, 1, 1))
+        self.assertEqual([error['row'] for error in summary['errors']], [3, 4])
+        self.assertIn('title', summary['errors'][0]['errors'])
+        book.refresh_from_db()
+        self.assertEqual((book.title, book.author), ('Efuru (2nd edition)', 'Flora Nwapa'))
+        self.assertTrue(Book.objects.filter(title='Arrow of God').exists())
+
+    def test_jsonl_and_dry_run(self):
+        content = (
+            b'{"title": "Efuru", "author": "Flora Nwapa", "genre": "Fiction", "description": "x"}\n'
+            b'\n[1]\n{oops\n'
+        )
+        summary = self.upload(content, name='books.jsonl', dry_run=1).json()
+        self.assertEqual(summary['created'], 1)
+        self.assertEqual([error['row'] for error in summary['errors']], [3, 4])
+        self.assertFalse(Book.objects.exists())
+
+    def test_undecodable_upload_is_reported(self):
+        content = 'title,author,genre,description\nCaf\u00e9,Chinua Achebe,Fiction,x\n'.encode('latin-1')
+        response = self.upload(content)
+        self.assertEqual(response.status_code, 200)
+        summary = response.json()
+        self.assertEqual(summary['created'], 0)
+        self.assertIn('UTF-8', summary['errors'][0]['errors']['non_field_errors'][0])
+
+    def test_malformed_csv_is_reported(self):
+        content = (
+            'title,author,genre,description\n'
+            'Efuru,Flora Nwapa,Fiction,Village life\n'
+            f'Huge,Chinua Achebe,Fiction,{"x" * (csv.field_size_limit() + 1)}\n'
+        ).encode()
+        summary = self.upload(content).json()
+        self.assertEqual(summary['created'], 1)
+        self.assertEqual(summary['errors'][0]['row'], 2)
+        self.assertIn('Malformed CSV', summary['errors'][0]['errors']['non_field_errors'][0])
+
+    def test_admin_only_and_known_types(self):
+        reader = Token.objects.create(user=make_user())
+        self.assertEqual(self.upload(b'title\n', user_token=reader).status_code, 403)
+        self.assertEqual(self.upload(b'title\n', type='xlsx').status_code, 400)
+
+    @override_settings(JOBS_ASYNC=True)
+    def test_imported_books_queue_their_jobs(self):
+        rows = iter_rows(io.StringIO(
+            'title,author,genre,description,cover_image,pdf_file\n'
+            'Efuru,Flora Nwapa,Fiction,x,https://example.com/c.jpg,https://example.com/b.pdf\n'
+            'Arrow of God,Chinua Achebe,Fiction,x,,\n'
+        ), 'csv')
+        import_books(rows)
+        self.assertEqual(
+            sorted(Job.objects.values_list('name', flat=True)),
+            ['books.extract_pdf_metadata', 'books.generate_thumbnails', 'books.rebuild_similar'],
+        )
+
+    def test_export_round_trips(self):
+        make_book('Efuru', author='Flora Nwapa')
+        make_book('Arrow of God')
+        exported = ''.join(export_books('csv'))
+        rows = list(csv.DictReader(io.StringIO(exported)))
+        self.assertEqual([row['title'] for row in rows], ['Efuru', 'Arrow of God'])
+        lines = [json.loads(line) for line in export_books('jsonl')]
+        self.assertEqual(lines[0]['author'], 'Flora Nwapa')
+
+        # Re-importing the export updates in place
+        Book.objects.filter(title='Efuru').update(title='Changed')
+        summary = import_books(iter_rows(io.StringIO(exported), 'csv'))
+        self.assertEqual((summary['created'], summary['updated']), (0, 2))
+        self.assertTrue(Book.objects.filter(title='Efuru').exists())
+
+    def test_export_endpoint_streams(self):
+        make_book('Efuru')
+        response = self.client.get(
+            '/api/books/export/', {'type': 'jsonl'}, secure=True,
+            headers={'Authorization': f'Token {self.admin.key}'},
+        )
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="books.jsonl"')
+        self.assertEqual(json.loads(b''.join(response.streaming_content))['title'], 'Efuru')
+
+    def test_import_command(self):
+        path = Path(tempfile.mkdtemp()) / 'books.csv'
+        self.addCleanup(shutil.rmtree, path.parent)
+        path.write_bytes(b'title,author,genre,description\n\xff\xfe,x,y,z\n')
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_books', str(path), stdout=out, stderr=err)
+        self.assertIn('0 created', out.getvalue())
+        self.assertIn('UTF-8', err.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('import_books', str(path.parent / 'missing.csv'), stdout=out)
+
+
+class FacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def counts(self, model):
+        return dict(model.objects.values_list('slug', 'book_count'))
+
+    def test_names_share_rows_regardless_of_case_and_spacing(self):
+        first = make_book('Things Fall Apart', author='Chinua Achebe')
+        second = make_book('Arrow of God', author='chinua  achebe ')
+        self.assertEqual(first.author_ref_id, second.author_ref_id)
+        self.assertEqual(Author.objects.get().name, 'Chinua Achebe')
+        self.assertEqual(self.counts(Author), {'chinua-achebe': 2})
+
+    def test_counts_follow_edits_and_deletes(self):
+        book = make_book('Efuru', author='Flora Nwapa', genre='Fiction')
+        make_book('Idu', author='Flora Nwapa', genre='Fiction')
+        book.genre = 'Classic'
+        book.save()
+        self.assertEqual(self.counts(Genre), {'fiction': 1, 'classic': 1})
+        book.delete()
+        self.assertEqual(self.counts(Genre), {'fiction': 1, 'classic': 0})
+        self.assertEqual(self.counts(Author), {'flora-nwapa': 1})
+
+    def test_facets_endpoint_lists_rows_with_books(self):
+        make_book('Efuru', author='Flora Nwapa', genre='Fiction')
+        make_book('Idu', author='Flora Nwapa', genre='Fiction').delete()
+        make_book('Death and the King\'s Horseman', author='Wole Soyinka', genre='Drama')
+        Genre.objects.create(name='Poetry', slug='poetry')
+        data = self.client.get('/api/books/facets/', secure=True).json()
+        self.assertEqual(data['genres'], [
+            {'name': 'Drama', 'slug': 'drama', 'count': 1},
+            {'name': 'Fiction', 'slug': 'fiction', 'count': 1},
+        ])
+        self.assertEqual([row['slug'] for row in data['authors']], ['flora-nwapa', 'wole-soyinka'])
+
+    def test_filters_accept_names_and_slugs(self):
+        make_book('Efuru', author='Flora Nwapa', genre='Fiction')
+        make_book('Death and the King\'s Horseman', author='Wole Soyinka', genre='Drama')
+        for params in ({'genre': 'Fiction'}, {'genre': 'fiction'}, {'author': 'flora-nwapa'}):
+            books = self.client.get('/api/books/', {'legacy': 1, **params}, secure=True).json()['books']
+            self.assertEqual([book['title'] for book in books], ['Efuru'], params)
+
+    def test_backfill_migration(self):
+        # Rows written without save() have no refs, as before migration 0008
+        Book.objects.bulk_create([
+            Book(title='Efuru', author='Flora Nwapa', genre='Fiction', description='x'),
+            Book(title='Idu', author='FLORA NWAPA', genre='Fiction', description='x'),
+            Book(title='Untitled', author=' ', genre='Drama', description='x'),
+        ])
+        migration = importlib.import_module('books.migrations.0008_populate_author_genre')
+        migration.populate_author_genre(apps, None)
+
+        self.assertEqual(self.counts(Author), {'flora-nwapa': 2})
+        self.assertEqual(self.counts(Genre), {'fiction': 2, 'drama': 1})
+        self.assertIsNone(Book.objects.get(title='Untitled').author_ref)
+        # Running it again changes nothing
+        migration.populate_author_genre(apps, None)
+        self.assertEqual(Author.objects.count(), 1)
+
+
+class FastSerializationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        make_book('Efuru', author='Flora Nwapa', cover_image='https://example.com/efuru.jpg', cover_variants={
+            'source': 'https://example.com/efuru.jpg',
+            'webp': [[160, '/media/thumbs/160.webp'], [320, '/media/thumbs/320.webp']],
+            'jpeg': [[160, '/media/thumbs/160.jpg']],
+        }, pdf_file='https://example.com/efuru.pdf')
+        Book.objects.filter(title='Efuru').update(pdf_pages=221, pdf_size=123456, pdf_hash='ab' * 32)
+        make_book('Arrow of God')
+        Book.objects.bulk_create([Book(title='Orphan', author='Nobody', genre='Misc', description='x')])
+
+    def test_rows_match_the_serializer(self):
+        expected = json.loads(json.dumps(BookSerializer(Book.objects.all(), many=True).data))
+        fields = book_fields()
+        from_values = serialize_book_rows(Book.objects.values(*fields), fields)
+        from_instances = serialize_book_rows(Book.objects.all(), fields)
+        self.assertEqual(json.loads(json.dumps(from_values)), expected)
+        self.assertEqual(json.loads(json.dumps(from_instances)), expected)
+
+    def test_field_selection(self):
+        self.assertEqual(select_book_fields('title,author'), ('id', 'title', 'author'))
+        self.assertNotIn('description', select_book_fields(exclude_param='description'))
+        self.assertEqual(select_book_fields(compact=True), COMPACT_BOOK_FIELDS)
+        with self.assertRaisesMessage(ValueError, 'Unknown field(s): nope, password'):
+            select_book_fields('title,nope', 'password')
+
+    def test_sparse_responses(self):
+        data = self.client.get('/api/books/', {'page_size': 1, 'fields': 'title'}, secure=True).json()
+        arrow = Book.objects.get(title='Arrow of God')
+        self.assertEqual(data['books'], [{'id': arrow.id, 'title': 'Arrow of God'}])
+        data = self.client.get('/api/books/', {'legacy': 1, 'view': 'compact'}, secure=True).json()
+        self.assertEqual(tuple(data['books'][0]), COMPACT_BOOK_FIELDS)
+        response = self.client.get('/api/books/', {'fields': 'secret'}, secure=True)
+        self.assertEqual(response.status_code, 400)
+
+
+class BatchAndHomeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.ids = [
+            make_book(title, genre=genre).id
+            for title, genre in (
+                ('Things Fall Apart', 'Fiction'), ('Efuru', 'Fiction'),
+                ('Arrow of God', 'Fiction'), ('The Trials of Brother Jero', 'Drama'),
+            )
+        ]
+
+    def get(self, url, **params):
+        return self.client.get(url, params, secure=True)
+
+    def test_batch_keeps_the_requested_order(self):
+        first, second, third, _ = self.ids
+        ids = f'{third}, {first},{third},999999'
+        with self.assertNumQueries(1):
+            data = self.get('/api/books/batch/', ids=ids, view='compact').json()
+        self.assertEqual([book['id'] for book in data['books']], [third, first])
+        self.assertEqual(set(data['books'][0]), set(COMPACT_BOOK_FIELDS))
+        self.assertEqual(data['missing'], [999999])
+
+        data = self.get('/api/books/batch/', ids=str(second), fields='id,title').json()
+        self.assertEqual(data['books'], [{'id': second, 'title': 'Efuru'}])
+        self.assertEqual(self.get('/api/books/batch/').json(), {'books': [], 'missing': []})
+
+    def test_batch_rejects_bad_requests(self):
+        self.assertEqual(self.get('/api/books/batch/', ids='1,two').status_code, 400)
+        self.assertEqual(self.get('/api/books/batch/', ids='1', fields='nope').status_code, 400)
+        with override_settings(BOOKS_BATCH_MAX_IDS=2):
+            self.assertEqual(self.get('/api/books/batch/', ids='1,2,3').status_code, 400)
+
+    @override_settings(HOME_FEATURED_COUNT=2, HOME_NEW_ARRIVALS_COUNT=3)
+    def test_home(self):
+        data = self.get('/api/books/home/').json()
+        self.assertEqual([book['title'] for book in data['featured']], ['Arrow of God', 'Efuru'])
+        self.assertEqual([book['id'] for book in data['new_arrivals']], self.ids[:0:-1])
+        self.assertEqual(
+            sorted((genre['name'], genre['count']) for genre in data['genres']),
+            [('Drama', 1), ('Fiction', 3)],
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get('/api/books/home/').json(), data)
+
+    def test_home_featured_ids(self):
+        with override_settings(HOME_FEATURED_BOOK_IDS=[self.ids[3], 999999, self.ids[0]]):
+            featured = self.get('/api/books/home/').json()['featured']
+        self.assertEqual([book['id'] for book in featured], [self.ids[3], self.ids[0]])
+
+
+@override_settings(BOOKS_FEED_LAG_SECONDS=0)
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.books = [make_book(title) for title in ('Efuru', 'Arrow of God', 'Zaabalawi')]
+
+    def sync(self, cursor=None, page_size=None):
+        changed, deleted, cursor, has_more = get_changes(cursor, ('id', 'title'), page_size)
+        return [book.id for book in changed], deleted, cursor, has_more
+
+    def test_first_sync_returns_the_catalog(self):
+        changed, deleted, cursor, has_more = self.sync()
+        self.assertEqual(changed, [book.id for book in self.books])
+        self.assertEqual(deleted, [])
+        self.assertFalse(has_more)
+        self.assertEqual(self.sync(cursor)[:2], ([], []))
+
+    def test_updates_and_deletes_since_a_cursor(self):
+        *_, cursor, _ = self.sync()
+        edited, removed = self.books[0], self.books[2]
+        edited.title = 'Efuru (new edition)'
+        edited.save()
+        removed_id = removed.id
+        removed.delete()
+
+        changed, deleted, cursor, _ = self.sync(cursor)
+        self.assertEqual(changed, [edited.id])
+        self.assertEqual(deleted, [removed_id])
+        self.assertTrue(DeletedBook.objects.filter(book_id=removed_id).exists())
+        self.assertEqual(self.sync(cursor)[:2], ([], []))
+
+    def test_pages_follow_the_cursor(self):
+        changed, _, cursor, has_more = self.sync(page_size=2)
+        self.assertEqual(len(changed), 2)
+        self.assertTrue(has_more)
+        rest, _, _, has_more = self.sync(cursor, page_size=2)
+        self.assertEqual(changed + rest, [book.id for book in self.books])
+        self.assertFalse(has_more)
+
+    def test_old_and_invalid_cursors(self):
+        old = timezone.now() - timedelta(days=settings.BOOKS_FEED_TOMBSTONE_DAYS + 1)
+        with self.assertRaises(ExpiredCursor):
+            self.sync(encode_feed_cursor((old, 0), (old, 0)))
+        with self.assertRaises(InvalidCursor):
+            self.sync('garbage!')
+
+    def test_expired_cursor_returns_410(self):
+        old = timezone.now() - timedelta(days=settings.BOOKS_FEED_TOMBSTONE_DAYS + 1)
+        response = self.client.get(
+            '/api/books/changes/', {'since': encode_feed_cursor((old, 0), (old, 0))}, secure=True,
+        )
+        self.assertEqual(response.status_code, 410)
+
+    def test_endpoint(self):
+        data = self.client.get('/api/books/changes/', {'fields': 'id,title'}, secure=True).json()
+        self.assertEqual(data['changed'], [{'id': book.id, 'title': book.title} for book in self.books])
+        self.assertEqual((data['deleted'], data['has_more']), ([], False))
+        data = self.client.get('/api/books/changes/', {'since': data['cursor']}, secure=True).json()
+        self.assertEqual(data['changed'], [])
+        self.assertEqual(self.client.get('/api/books/changes/', {'since': 'x'}, secure=True).status_code, 400)
+
+    def test_purge_keeps_recent_tombstones(self):
+        self.books[0].delete()
+        self.assertEqual(purge_tombstones(days=1), 0)
+        DeletedBook.objects.update(deleted_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(purge_tombstones(days=1), 1)
+
+
+class BuildFrontendTests(SimpleTestCase):
+    def setUp(self):
+        root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root)
+        self.source, self.output = root / 'site', root / 'build'
+        (self.source / 'CSS').mkdir(parents=True)
+        (self.source / 'images').mkdir()
+        (self.source / 'images' / 'logo.png').write_bytes(b'png')
+        # Padded past the size below which files are not precompressed
+        padding = ' ' * 300
+        (self.source / 'CSS' / 'style.css').write_text('body { background: url("../images/logo.png"); }' + padding)
+        (self.source / 'index.html').write_text(
+            '<link href="./CSS/style.css" rel="stylesheet">'
+            '<a href="https://example.com/x.css">x</a>' + padding
+        )
+
+    def test_fingerprints_and_precompresses(self):
+        call_command('build_frontend', source=str(self.source), output=str(self.output), stdout=io.StringIO())
+        manifest = json.loads((self.output / 'manifest.json').read_text())
+        css, logo = manifest['CSS/style.css'], manifest['images/logo.png']
+        self.assertRegex(css, r'^CSS/style\.[0-9a-f]{12}\.css$')
+        self.assertIn(f'url("../{logo}")', (self.output / css).read_text())
+
+        html = (self.output / 'index.html').read_text()
+        self.assertIn(f'href="./{css}"', html)
+        self.assertIn('href="https://example.com/x.css"', html)
+        self.assertEqual(gzip.decompress((self.output / 'index.html.gz').read_bytes()).decode(), html)
+        # Original names stay available for references built in JS
+        self.assertTrue((self.output / 'CSS' / 'style.css').exists())
+
+    def test_output_must_be_outside_the_source(self):
+        with self.assertRaises(CommandError):
+            call_command('build_frontend', source=str(self.source), output=str(self.source / 'build'))
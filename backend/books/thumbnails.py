@@ -0,0 +1,113 @@
+import hashlib
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from .streaming import local_media_path
+
+COVER_SUBDIR = 'books/covers'
+THUMBNAIL_SUBDIR = 'books/thumbs'
+# (format key, Pillow format name, file extension)
+THUMBNAIL_FORMATS = (
+    ('webp', 'WEBP', 'webp'),
+    ('jpeg', 'JPEG', 'jpg'),
+)
+CLOUDINARY_UPLOAD_MARKER = '/image/upload/'
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def media_url(path):
+    relative = Path(path).relative_to(Path(settings.MEDIA_ROOT).resolve()).as_posix()
+    return f'{settings.MEDIA_URL}{relative}'
+
+
+def generate_local_variants(source_path):
+    """
+    Resize a local cover into every configured width and format.
+
+    Output lives under MEDIA_ROOT/books/thumbs/<content hash>/, so identical
+    covers share files and existing variants are never rendered twice.
+    """
+    from PIL import Image, ImageOps
+
+    digest = file_hash(source_path)
+    out_dir = (Path(settings.MEDIA_ROOT) / THUMBNAIL_SUBDIR / digest[:2] / digest).resolve()
+    variants = {key: [] for key, _, _ in THUMBNAIL_FORMATS}
+
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        widths = sorted({min(width, image.width) for width in settings.COVER_THUMBNAIL_WIDTHS})
+        out_dir.mkdir(parents=True, exist_ok=True)
+        for width in widths:
+            resized = None
+            for key, pil_format, extension in THUMBNAIL_FORMATS:
+                target = out_dir / f'{width}.{extension}'
+                if not target.exists():
+                    if resized is None:
+                        height = round(image.height * width / image.width)
+                        resized = image.resize((width, height), Image.LANCZOS)
+                    resized.save(target, pil_format, quality=settings.COVER_THUMBNAIL_QUALITY)
+                variants[key].append([width, media_url(target)])
+
+    return {'hash': digest, **variants}
+
+
+def cloudinary_variants(url):
+    """Cloudinary resizes on the fly: just build transformation URLs"""
+    prefix, _, rest = url.partition(CLOUDINARY_UPLOAD_MARKER)
+    variants = {}
+    for key, _, extension in THUMBNAIL_FORMATS:
+        variants[key] = [
+            [width, f'{prefix}{CLOUDINARY_UPLOAD_MARKER}c_limit,w_{width},f_{extension},q_auto/{rest}']
+            for width in sorted(settings.COVER_THUMBNAIL_WIDTHS)
+        ]
+    return variants
+
+
+def build_cover_variants(cover_url):
+    """Variant data for a cover URL; only 'source' is set when we cannot resize it"""
+    if not cover_url:
+        return {}
+    if 'res.cloudinary.com' in cover_url and CLOUDINARY_UPLOAD_MARKER in cover_url:
+        return {'source': cover_url, **cloudinary_variants(cover_url)}
+    source_path = local_media_path(cover_url, COVER_SUBDIR)
+    if source_path is None:
+        return {'source': cover_url}
+    try:
+        return {'source': cover_url, **generate_local_variants(source_path)}
+    except OSError:
+        # Unreadable or not an image: serve the original cover only
+        return {'source': cover_url}
+
+
+def cover_changed(book):
+    """True when book.cover_variants were not built from the current cover"""
+    return (book.cover_variants or {}).get('source') != (book.cover_image or None)
+
+
+def update_book_thumbnails(book, force=False):
+    """
+    Refresh book.cover_variants if the cover changed; returns True when updated.
+
+    Writes with a queryset update so post_save handlers do not run again.
+    """
+    from .models import Book
+
+    if not force and not cover_changed(book):
+        return False
+
+    variants = build_cover_variants(book.cover_image)
+    # Bump updated_at too, so ETags and the change feed see the new variants
+    updated_at = timezone.now()
+    Book.objects.filter(pk=book.pk).update(cover_variants=variants, updated_at=updated_at)
+    book.cover_variants = variants
+    book.updated_at = updated_at
+    return True
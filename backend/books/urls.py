@@ -1,11 +1,28 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+if settings.BOOKS_ASYNC_VIEWS:
+    # Async versions of the read-heavy views, for ASGI deployments
+    from . import async_views
+    read_views = async_views
+else:
+    read_views = views
+
 urlpatterns = [
-    path('', views.get_books, name='books-list'),
+    path('', read_views.get_books, name='books-list'),
     path('create/', views.create_book, name='book-create'),
-    path('<int:book_id>/', views.get_book, name='book-detail'),
+    path('batch/', views.get_books_batch, name='books-batch'),
+    path('home/', views.get_home, name='books-home'),
+    path('changes/', views.get_book_changes, name='books-changes'),
+    path('autocomplete/', views.autocomplete_books, name='books-autocomplete'),
+    path('facets/', views.get_book_facets, name='book-facets'),
+    path('import/', views.import_books_view, name='books-import'),
+    path('export/', views.export_books_view, name='books-export'),
+    path('cache-stats/', views.get_catalog_cache_stats, name='book-cache-stats'),
+    path('<int:book_id>/', read_views.get_book, name='book-detail'),
+    path('<int:book_id>/similar/', views.get_similar_books, name='book-similar'),
     path('<int:book_id>/update/', views.update_book, name='book-update'),
     path('<int:book_id>/delete/', views.delete_book, name='book-delete'),
-    path('<int:book_id>/download/', views.download_book, name='book-download'),
+    path('<int:book_id>/download/', read_views.download_book, name='book-download'),
 ]
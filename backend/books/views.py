@@ -1,42 +1,158 @@
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
-from .models import Book
-from .serializers import BookSerializer, BookCreateSerializer
+from django.conf import settings
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
+from django.views.decorators.http import condition
+from .autocomplete import get_autocomplete_index
+from .bulk import FORMATS, detect_format, export_books, import_books, iter_rows, open_text
+from .cache import bump_catalog_version, cache_catalog_response, get_cache_stats
+from .facets import catalog_slug, facet_rows, get_facets
+from .feed import ExpiredCursor, get_changes
+from .models import Book, Genre, SimilarBook
+from .pagination import InvalidCursor, get_cached_count, get_page_size, paginate_books
+from .search import search_books
+from .serializers import (
+    COMPACT_BOOK_FIELDS, BookSerializer, BookCreateSerializer, select_book_fields,
+    serialize_book_rows,
+)
+from .signing import build_signed_url
+from .streaming import local_pdf_path, stream_pdf
 
 
-@api_view(['GET'])
-@permission_classes([AllowAny])
-def get_books(request):
-    """Get all books or search/filter"""
+def _filter_books(request):
+    """
+    Apply the ?search=, ?genre= and ?author= parameters to the catalog.
+
+    Returns (books, truncated); see search_books.
+    """
     books = Book.objects.all()
+    truncated = False
     
-    # Search by title, author, or genre
+    # Full-text search over title, author, genre and description, best match first
     search = request.GET.get('search', None)
     if search:
-        books = books.filter(
-            title__icontains=search
-        ) | books.filter(
-            author__icontains=search
-        ) | books.filter(
-            genre__icontains=search
-        )
+        books, truncated = search_books(books, search)
     
-    # Filter by genre
+    # Filter by genre / author through their indexed slugs (names are accepted too)
     genre = request.GET.get('genre', None)
     if genre:
-        books = books.filter(genre__iexact=genre)
+        books = books.filter(genre_ref__slug=catalog_slug(genre))
     
-    serializer = BookSerializer(books, many=True)
-    return Response({
-        'count': books.count(),
-        'books': serializer.data
-    })
+    author = request.GET.get('author', None)
+    if author:
+        books = books.filter(author_ref__slug=catalog_slug(author))
+    
+    return books, truncated
+
+
+def _list_validators(request):
+    """(etag, last_modified) for a filtered list: max(updated_at) plus row count"""
+    if not hasattr(request, '_book_list_validators'):
+        books, _ = _filter_books(request)
+        stats = books.order_by().aggregate(last_updated=Max('updated_at'), total=Count('id'))
+        last_modified = stats['last_updated']
+        etag = None
+        if last_modified is not None:
+            etag = f'{stats["total"]}-{last_modified.timestamp():.6f}'
+        request._book_list_validators = (etag, last_modified)
+    return request._book_list_validators
+
+
+def _detail_validators(request, book_id):
+    """(etag, last_modified) for one book, from its updated_at; none if it doesn't exist"""
+    if not hasattr(request, '_book_detail_validators'):
+        updated_at = Book.objects.filter(id=book_id).values_list(
+            'updated_at', flat=True
+        ).first()
+        etag = f'{book_id}-{updated_at.timestamp():.6f}' if updated_at else None
+        request._book_detail_validators = (etag, updated_at)
+    return request._book_detail_validators
+
+
+@condition(
+    etag_func=lambda request: _list_validators(request)[0],
+    last_modified_func=lambda request: _list_validators(request)[1],
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@cache_catalog_response('list')
+def get_books(request):
+    """Get all books or search/filter"""
+    books, truncated = _filter_books(request)
+    search = request.GET.get('search', None)
+    genre = request.GET.get('genre', None)
+    
+    # Sparse fieldsets: ?fields=, ?exclude= and ?view=compact
+    try:
+        fields = select_book_fields(
+            request.GET.get('fields'),
+            request.GET.get('exclude'),
+            compact=request.GET.get('view') == 'compact',
+        )
+    except ValueError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Legacy shape: every book plus a full count (used by books.js)
+    if _wants_legacy_list(request):
+        rows = list(books.values(*fields))
+        data = {
+            'count': len(rows),
+            'books': serialize_book_rows(rows, fields)
+        }
+        if search:
+            data['truncated'] = truncated
+        return Response(data)
+    
+    # Cursor mode: one keyset page ordered on (title, id), or on relevance for a search
+    page_size = get_page_size(request)
+    try:
+        rows, next_cursor, previous_cursor = paginate_books(
+            books.only(*{'title', *fields}), cursor=request.GET.get('cursor'), page_size=page_size,
+            ranked=bool(search),
+        )
+    except InvalidCursor as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    data = {
+        'books': serialize_book_rows(rows, fields),
+        'next': next_cursor,
+        'previous': previous_cursor,
+        'page_size': page_size,
+    }
+    if search:
+        # Matches past BOOKS_SEARCH_MAX_RESULTS were dropped (SQLite)
+        data['truncated'] = truncated
+    if request.GET.get('include_count') in ('1', 'true'):
+        data['count'] = get_cached_count(books, {
+            'search': search, 'genre': genre, 'author': request.GET.get('author'),
+        })
+    return Response(data)
+
+
+def _wants_legacy_list(request):
+    """Decide between the legacy full list and cursor pagination"""
+    if request.GET.get('legacy') in ('1', 'true'):
+        return True
+    if 'cursor' in request.GET or 'page_size' in request.GET:
+        return False
+    return settings.BOOKS_LEGACY_LIST
 
 
+@condition(
+    etag_func=lambda request, book_id: _detail_validators(request, book_id)[0],
+    last_modified_func=lambda request, book_id: _detail_validators(request, book_id)[1],
+)
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@cache_catalog_response('detail')
 def get_book(request, book_id):
     """Get single book details"""
     try:
@@ -49,6 +165,148 @@ def get_book(request, book_id):
         }, status=status.HTTP_404_NOT_FOUND)
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def autocomplete_books(request):
+    """Title and author suggestions for a search box prefix"""
+    try:
+        limit = int(request.GET.get('limit', settings.AUTOCOMPLETE_LIMIT))
+    except ValueError:
+        limit = settings.AUTOCOMPLETE_LIMIT
+    limit = max(1, min(limit, settings.AUTOCOMPLETE_MAX_LIMIT))
+    query = request.GET.get('q', '')[:100]
+    return Response({
+        'query': query,
+        'suggestions': get_autocomplete_index().suggest(query, limit),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@cache_catalog_response('similar')
+def get_similar_books(request, book_id):
+    """Books most like this one, from the precomputed neighbor lists"""
+    try:
+        limit = int(request.GET.get('limit', settings.SIMILAR_BOOKS_COUNT))
+    except ValueError:
+        limit = settings.SIMILAR_BOOKS_COUNT
+    limit = max(1, min(limit, settings.SIMILAR_BOOKS_COUNT))
+
+    links = list(
+        SimilarBook.objects.filter(book_id=book_id).select_related('similar').only(
+            'score', *(f'similar__{field}' for field in COMPACT_BOOK_FIELDS)
+        )[:limit]
+    )
+    if not links and not Book.objects.filter(id=book_id).exists():
+        return Response({
+            'error': 'Book not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    books = serialize_book_rows([link.similar for link in links], COMPACT_BOOK_FIELDS)
+    for book, link in zip(books, links):
+        book['score'] = round(link.score, 4)
+    return Response({'books': books})
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@cache_catalog_response('batch')
+def get_books_batch(request):
+    """Several books by id (?ids=3,1,2) in one query, in the order asked for"""
+    try:
+        ids = list(dict.fromkeys(
+            int(value) for value in request.GET.get('ids', '').split(',') if value.strip()
+        ))
+    except ValueError:
+        return Response({
+            'error': 'ids must be a comma-separated list of book ids'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if len(ids) > settings.BOOKS_BATCH_MAX_IDS:
+        return Response({
+            'error': f'At most {settings.BOOKS_BATCH_MAX_IDS} ids per request'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        fields = select_book_fields(
+            request.GET.get('fields'),
+            request.GET.get('exclude'),
+            compact=request.GET.get('view') == 'compact',
+        )
+    except ValueError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    found = Book.objects.only(*fields).in_bulk(ids) if ids else {}
+    return Response({
+        'books': serialize_book_rows([found[book_id] for book_id in ids if book_id in found], fields),
+        'missing': [book_id for book_id in ids if book_id not in found],
+    })
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@cache_catalog_response('home')
+def get_home(request):
+    """Featured books, genres and new arrivals for the home page, in one response"""
+    books = Book.objects.only(*COMPACT_BOOK_FIELDS)
+    featured_ids = settings.HOME_FEATURED_BOOK_IDS
+    if featured_ids:
+        found = books.in_bulk(featured_ids)
+        featured = [found[book_id] for book_id in featured_ids if book_id in found]
+    else:
+        featured = books.order_by('title', 'id')[:settings.HOME_FEATURED_COUNT]
+    # Ids grow with created_at, and the primary key index avoids sorting the catalog
+    new_arrivals = books.order_by('-id')[:settings.HOME_NEW_ARRIVALS_COUNT]
+    return Response({
+        'featured': serialize_book_rows(featured, COMPACT_BOOK_FIELDS),
+        'genres': facet_rows(Genre),
+        'new_arrivals': serialize_book_rows(new_arrivals, COMPACT_BOOK_FIELDS),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_book_changes(request):
+    """Books created or updated and ids deleted since ?since=, for offline copies"""
+    try:
+        fields = select_book_fields(
+            request.GET.get('fields'),
+            request.GET.get('exclude'),
+            compact=request.GET.get('view') == 'compact',
+        )
+    except ValueError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        page_size = int(request.GET.get('page_size', settings.BOOKS_FEED_PAGE_SIZE))
+    except ValueError:
+        page_size = settings.BOOKS_FEED_PAGE_SIZE
+    page_size = max(1, min(page_size, settings.BOOKS_FEED_MAX_PAGE_SIZE))
+
+    try:
+        books, deleted, cursor, has_more = get_changes(
+            request.GET.get('since'), fields=fields, page_size=page_size
+        )
+    except ExpiredCursor as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_410_GONE)
+    except InvalidCursor as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'changed': serialize_book_rows(books, fields),
+        'deleted': deleted,
+        'cursor': cursor,
+        'has_more': has_more,
+    })
+
+
 @api_view(['POST'])
 @permission_classes([IsAdminUser])
 def create_book(request):
@@ -56,6 +314,7 @@ def create_book(request):
     serializer = BookCreateSerializer(data=request.data)
     if serializer.is_valid():
         book = serializer.save()
+        bump_catalog_version()
         return Response({
             'message': 'Book created successfully',
             'book': BookSerializer(book).data
@@ -71,6 +330,7 @@ def delete_book(request, book_id):
         book = Book.objects.get(id=book_id)
         book_title = book.title
         book.delete()
+        bump_catalog_version()
         return Response({
             'message': f'Book "{book_title}" deleted successfully'
         }, status=status.HTTP_200_OK)
@@ -89,6 +349,7 @@ def update_book(request, book_id):
         serializer = BookCreateSerializer(book, data=request.data, partial=True)
         if serializer.is_valid():
             book = serializer.save()
+            bump_catalog_version()
             return Response({
                 'message': 'Book updated successfully',
                 'book': BookSerializer(book).data
@@ -111,6 +372,18 @@ def download_book(request, book_id):
                 'error': 'PDF file not available for this book'
             }, status=status.HTTP_404_NOT_FOUND)
         
+        # Local PDFs get a short-lived signed URL served by SignedMediaMiddleware,
+        # or are streamed from here (with Range support) when ?stream=1 is passed
+        pdf_path = local_pdf_path(book.pdf_file)
+        if pdf_path is not None:
+            if settings.PDF_SIGNED_URLS and request.GET.get('stream') not in ('1', 'true'):
+                download_url, expires = build_signed_url(request, pdf_path)
+                return Response({
+                    'download_url': download_url,
+                    'expires': expires
+                })
+            return stream_pdf(request, pdf_path, f'{book.title}.pdf')
+        
         # Return the Cloudinary URL for the frontend to handle the download
         return Response({
             'download_url': book.pdf_file
@@ -119,3 +392,59 @@ def download_book(request, book_id):
         return Response({
             'error': 'Book not found'
         }, status=status.HTTP_404_NOT_FOUND)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@cache_catalog_response('facets')
+def get_book_facets(request):
+    """Book counts per genre and per author"""
+    return Response(get_facets())
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def get_catalog_cache_stats(request):
+    """Catalog cache hit/miss counters (admin only)"""
+    return Response(get_cache_stats())
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+@parser_classes([MultiPartParser])
+def import_books_view(request):
+    """Bulk create/update books from an uploaded CSV or JSON Lines file (admin only)"""
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({
+            'error': 'Upload a CSV or JSON Lines file in the "file" field'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    fmt = request.GET.get('type') or detect_format(upload.name, upload.content_type)
+    if fmt not in FORMATS:
+        return Response({
+            'error': f'Unsupported type "{fmt}", use one of: {", ".join(FORMATS)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    summary = import_books(
+        iter_rows(open_text(upload.file), fmt),
+        batch_size=settings.BOOKS_IMPORT_BATCH_SIZE,
+        dry_run=request.GET.get('dry_run') in ('1', 'true'),
+    )
+    return Response(summary, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_books_view(request):
+    """Stream the whole catalog as CSV or JSON Lines (admin only)"""
+    fmt = request.GET.get('type', 'csv')
+    if fmt not in FORMATS:
+        return Response({
+            'error': f'Unsupported type "{fmt}", use one of: {", ".join(FORMATS)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(export_books(fmt), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="books.{fmt}"'
+    return response
@@ -6,8 +6,29 @@ set -o errexit  # Exit on error
 # Install dependencies
 pip install -r requirements.txt
 
-# Collect static files
+# Collect static files (fingerprinted and gzip/brotli precompressed by WhiteNoise)
 python manage.py collectstatic --no-input
 
+# Fingerprint and precompress the static frontend
+python manage.py build_frontend
+
 # Run migrations
 python manage.py migrate
+
+# Backfill resized cover images
+python manage.py generate_thumbnails
+
+# Backfill PDF page counts, sizes and first-page previews
+python manage.py extract_pdf_metadata
+
+# Precompute the "similar books" lists
+python manage.py rebuild_similar_books
+
+# Drop change-feed tombstones past their retention
+python manage.py purge_book_tombstones
+
+# Run the jobs queued by the steps above (the worker service picks up later ones)
+python manage.py run_worker --once
+
+# Precompile bytecode so a freshly woken instance does not compile on first import
+python -m compileall -q -j 0 .
@@ -0,0 +1,10 @@
+from django.contrib import admin
+from jobs.models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'idempotency_key', 'run_after', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('idempotency_key',)
+    readonly_fields = ('created_at', 'finished_at', 'locked_by', 'locked_at', 'last_error')
@@ -0,0 +1,61 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs.queue import (
+    claim_jobs, purge_finished_jobs, requeue_stale_jobs, run_job, worker_name,
+)
+
+# Housekeeping (stale locks, old finished jobs) at most this often, in seconds
+MAINTENANCE_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (thumbnails, search reindexing, ...) until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when no job is due')
+        parser.add_argument('--batch', type=int, default=10, help='Jobs claimed per poll')
+        parser.add_argument(
+            '--sleep', type=float, default=settings.JOBS_POLL_INTERVAL,
+            help='Seconds to wait when the queue is empty',
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        worker = worker_name()
+        self.stdout.write(f'Worker {worker} started')
+        done = failed = 0
+        next_maintenance = 0
+
+        while not self.stopping:
+            close_old_connections()
+            if time.monotonic() >= next_maintenance:
+                requeue_stale_jobs(settings.JOBS_LOCK_TIMEOUT)
+                purge_finished_jobs(settings.JOBS_KEEP_DONE_DAYS)
+                next_maintenance = time.monotonic() + MAINTENANCE_INTERVAL
+
+            jobs = claim_jobs(worker, options['batch'])
+            if not jobs:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+            # Claimed jobs are finished even when asked to stop, so none is left running
+            for job in jobs:
+                if run_job(job):
+                    done += 1
+                else:
+                    failed += 1
+                    self.stderr.write(f'{job} failed (attempt {job.attempts}/{job.max_attempts})')
+
+        self.stdout.write(self.style.SUCCESS(f'Worker {worker} stopped: {done} done, {failed} failed'))
+
+    def _stop(self, signum, frame):
+        self.stopping = True
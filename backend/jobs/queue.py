@@ -0,0 +1,164 @@
+import logging
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger('novelia.jobs')
+
+# name -> function, filled by @task in each app's tasks.py
+TASKS = {}
+
+
+def task(name):
+    """Register a function as the handler of jobs called `name`"""
+    def decorator(func):
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, key=None, delay=0, max_attempts=None):
+    """
+    Queue a job and return it.
+
+    The job row is written in the caller's transaction, so it exists exactly
+    when the change that caused it is committed. When `key` is already
+    queued, that job is returned instead of a duplicate. Without JOBS_ASYNC
+    the task runs in this process right after the commit and None is
+    returned (no worker needed).
+    """
+    if name not in TASKS:
+        raise ValueError(f'Unknown job "{name}"')
+    payload = payload or {}
+    if not settings.JOBS_ASYNC:
+        _run_after_commit(name, payload, key)
+        return None
+
+    for _ in range(2):
+        job = Job(
+            name=name,
+            payload=payload,
+            idempotency_key=key,
+            run_after=timezone.now() + timedelta(seconds=delay),
+            max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        )
+        try:
+            with transaction.atomic():
+                job.save()
+            return job
+        except IntegrityError:
+            if key is None:
+                raise
+            existing = Job.objects.filter(idempotency_key=key, status=Job.QUEUED).first()
+            if existing is not None:
+                return existing
+            # Claimed by a worker in between: queue a fresh one
+    raise IntegrityError(f'Could not queue job "{name}" with key "{key}"')
+
+
+def _run_after_commit(name, payload, key):
+    if key is not None and connection.in_atomic_block:
+        # Already waiting for this transaction to commit
+        for entry in connection.run_on_commit:
+            if getattr(entry[1], 'job_key', None) == key:
+                return
+
+    def run():
+        TASKS[name](**payload)
+
+    run.job_key = key
+    # robust: a failing task is logged instead of failing the request that queued it
+    transaction.on_commit(run, robust=True)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim_jobs(worker, limit=10):
+    """
+    Mark up to `limit` due jobs as running for this worker and return them.
+
+    Each claim is a conditional UPDATE, so concurrent workers never run the
+    same job, on SQLite as well as on Postgres.
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(status=Job.QUEUED, run_after__lte=now).values_list(
+        'id', flat=True
+    )[:limit]
+    claimed = [
+        job_id for job_id in candidates
+        if Job.objects.filter(id=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_by=worker, locked_at=now, attempts=F('attempts') + 1,
+        )
+    ]
+    return list(Job.objects.filter(id__in=claimed))
+
+
+def run_job(job):
+    """Run one claimed job; failures are retried with exponential backoff"""
+    func = TASKS.get(job.name)
+    try:
+        if func is None:
+            raise LookupError(f'No task registered for "{job.name}"')
+        func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Job %s #%s failed (attempt %s/%s)', job.name, job.pk, job.attempts, job.max_attempts)
+        if job.attempts >= job.max_attempts:
+            _finish(job, Job.FAILED, error)
+        else:
+            delay = settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+            _requeue(job, error, timezone.now() + timedelta(seconds=delay))
+        return False
+    _finish(job, Job.DONE, '')
+    return True
+
+
+def _finish(job, status, error):
+    Job.objects.filter(id=job.id).update(status=status, last_error=error, finished_at=timezone.now())
+
+
+def _requeue(job, error, run_after):
+    try:
+        with transaction.atomic():
+            Job.objects.filter(id=job.id).update(
+                status=Job.QUEUED, last_error=error, run_after=run_after, locked_by='', locked_at=None,
+            )
+    except IntegrityError:
+        # The same key was queued again meanwhile; that job redoes the work
+        _finish(job, Job.DONE, error + '\nRetry superseded by a newer queued job')
+
+
+def requeue_stale_jobs(timeout):
+    """
+    Put back jobs whose worker died while running them.
+
+    A job that already used all its attempts is marked failed instead, so a
+    job that kills its worker is not retried forever.
+    """
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff)
+    for job in stale:
+        error = job.last_error or 'Worker stopped while running the job'
+        if job.attempts >= job.max_attempts:
+            logger.warning('Job %s #%s lost its worker on the last attempt', job.name, job.pk)
+            _finish(job, Job.FAILED, error)
+        else:
+            _requeue(job, error, timezone.now())
+    return len(stale)
+
+
+def purge_finished_jobs(days):
+    """Delete jobs that succeeded more than `days` ago; failed ones are kept for inspection"""
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = Job.objects.filter(status=Job.DONE, finished_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,189 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from books.models import Book
+
+from .models import Job
+from .queue import claim_jobs, enqueue, purge_finished_jobs, requeue_stale_jobs, run_job, task
+
+calls = []
+
+
+@task('tests.record')
+def record(value=None):
+    calls.append(value)
+
+
+@task('tests.fail')
+def fail():
+    raise RuntimeError('boom')
+
+
+@override_settings(JOBS_ASYNC=True, JOBS_RETRY_DELAY=60)
+class QueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_unknown_job(self):
+        with self.assertRaises(ValueError):
+            enqueue('tests.missing')
+
+    def test_queued_key_is_not_duplicated(self):
+        first = enqueue('tests.record', {'value': 1}, key='book:1')
+        second = enqueue('tests.record', {'value': 2}, key='book:1')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_key_is_queued_again_once_claimed(self):
+        first = enqueue('tests.record', key='book:1')
+        self.assertEqual([job.pk for job in claim_jobs('worker-a')], [first.pk])
+        second = enqueue('tests.record', key='book:1')
+        self.assertNotEqual(first.pk, second.pk)
+        self.assertEqual(second.status, Job.QUEUED)
+
+    def test_claims_due_jobs_once(self):
+        due = enqueue('tests.record')
+        enqueue('tests.record', delay=3600)
+        claimed = claim_jobs('worker-a')
+        self.assertEqual([job.pk for job in claimed], [due.pk])
+        self.assertEqual(claimed[0].status, Job.RUNNING)
+        self.assertEqual(claimed[0].locked_by, 'worker-a')
+        self.assertEqual(claimed[0].attempts, 1)
+        self.assertEqual(claim_jobs('worker-b'), [])
+
+    def test_run_job(self):
+        enqueue('tests.record', {'value': 'x'})
+        job, = claim_jobs('worker-a')
+        self.assertTrue(run_job(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(calls, ['x'])
+
+    def test_failures_back_off_then_give_up(self):
+        enqueue('tests.fail', max_attempts=2)
+        job, = claim_jobs('worker-a')
+        with self.assertLogs('novelia.jobs', 'WARNING'):
+            self.assertFalse(run_job(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('boom', job.last_error)
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=50))
+
+        Job.objects.update(run_after=timezone.now())
+        job, = claim_jobs('worker-a')
+        with self.assertLogs('novelia.jobs', 'WARNING'):
+            self.assertFalse(run_job(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_stale_jobs_are_requeued(self):
+        enqueue('tests.record')
+        claim_jobs('worker-a')
+        self.assertEqual(requeue_stale_jobs(timeout=60), 0)
+        Job.objects.update(locked_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(requeue_stale_jobs(timeout=60), 1)
+        self.assertEqual(len(claim_jobs('worker-b')), 1)
+
+    def test_stale_job_on_its_last_attempt_fails(self):
+        enqueue('tests.record', max_attempts=1)
+        claim_jobs('worker-a')
+        Job.objects.update(locked_at=timezone.now() - timedelta(minutes=5))
+        with self.assertLogs('novelia.jobs', 'WARNING'):
+            self.assertEqual(requeue_stale_jobs(timeout=60), 1)
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.last_error, 'Worker stopped while running the job')
+        self.assertEqual(claim_jobs('worker-b'), [])
+
+    def test_purge_uses_finished_at(self):
+        old = timezone.now() - timedelta(days=10)
+        # Queued long ago but only just finished: kept
+        Job.objects.create(name='tests.record', status=Job.DONE, run_after=old, finished_at=timezone.now())
+        Job.objects.create(name='tests.record', status=Job.DONE, finished_at=old)
+        Job.objects.create(name='tests.fail', status=Job.FAILED, finished_at=old)
+        self.assertEqual(purge_finished_jobs(days=7), 1)
+        self.assertEqual(Job.objects.count(), 2)
+
+
+@override_settings(JOBS_ASYNC=False)
+class InlineQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_runs_once_per_key_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNone(enqueue('tests.record', {'value': 1}, key='book:1'))
+            enqueue('tests.record', {'value': 2}, key='book:1')
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, [1])
+        self.assertFalse(Job.objects.exists())
+
+
+def run_python(code, **env):
+    return subprocess.run(
+        [sys.executable, '-c', code], cwd=settings.BASE_DIR, capture_output=True, text=True,
+        env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'novelia_project.settings', **env},
+    )
+
+
+class SharedCacheTests(TestCase):
+    """The catalog version a worker bumps must reach the web processes"""
+
+    def setUp(self):
+        self.book = Book.objects.create(
+            title='Efuru', author='Flora Nwapa', genre='Fiction', description='About Efuru',
+        )
+        self.url = f'/api/books/{self.book.id}/'
+
+    def retitle(self, title):
+        # A queryset update sends no signal, so only a version bump shows it
+        Book.objects.filter(id=self.book.id).update(title=title)
+
+    def title(self):
+        return self.client.get(self.url, secure=True).json()['title']
+
+    def test_bump_in_another_process_invalidates(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+        }}):
+            self.assertEqual(self.title(), 'Efuru')
+            self.retitle('Efuru (2nd edition)')
+            self.assertEqual(self.title(), 'Efuru')
+            result = run_python(
+                'import django; django.setup(); '
+                'from books.cache import bump_catalog_version; bump_catalog_version()',
+                CACHE_URL=f'file://{location}',
+            )
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertEqual(self.title(), 'Efuru (2nd edition)')
+
+    def test_cleared_cache_invalidates(self):
+        cache.clear()
+        self.assertEqual(self.title(), 'Efuru')
+        self.retitle('Efuru (2nd edition)')
+        cache.clear()
+        self.assertEqual(self.title(), 'Efuru (2nd edition)')
+
+    def test_worker_needs_a_shared_cache(self):
+        check = 'from django.conf import settings; print(settings.JOBS_ASYNC)'
+        result = run_python(check, DEBUG='False', CACHE_URL='', JOBS_ASYNC='True')
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn('ImproperlyConfigured', result.stderr)
+        result = run_python(check, DEBUG='False', CACHE_URL='')
+        self.assertEqual(result.stdout.strip(), 'False')
+        result = run_python(check, DEBUG='False', CACHE_URL='file:///tmp/novelia-test-cache')
+        self.assertEqual(result.stdout.strip(), 'True')
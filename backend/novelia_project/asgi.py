@@ -3,6 +3,11 @@ ASGI config for novelia_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+ASGI mode: set BOOKS_ASYNC_VIEWS=True (async books list/detail/download views)
+and DB_CONN_MAX_AGE=0, then run for example
+``uvicorn novelia_project.asgi:application --workers 4``. It pays off when the
+database or cache is across the network; compare with ``manage.py load_test``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
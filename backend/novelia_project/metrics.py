@@ -0,0 +1,128 @@
+import threading
+from bisect import bisect_left
+
+# Bucket upper bounds; +Inf is implicit
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    """
+    Cumulative Prometheus-style histogram, one series per label value.
+
+    Each observation is a bisect plus a few integer increments under a lock.
+    """
+
+    def __init__(self, name, help_text, buckets, label='view'):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.label = label
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+            series[0][index] += 1
+            series[1] += 1
+            series[2] += value
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        with self._lock:
+            snapshot = {key: (list(counts), count, total) for key, (counts, count, total) in self._series.items()}
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for label_value in sorted(snapshot):
+            counts, count, total = snapshot[label_value]
+            label = f'{self.label}="{_escape(label_value)}"'
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{label},le="{_format(bound)}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{label}}} {_format(total)}')
+            lines.append(f'{self.name}_count{{{label}}} {count}')
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by a tuple of label values"""
+
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        with self._lock:
+            snapshot = dict(self._values)
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for label_values in sorted(snapshot):
+            labels = ','.join(
+                f'{name}="{_escape(value)}"' for name, value in zip(self.labels, label_values)
+            )
+            lines.append(f'{self.name}{{{labels}}} {snapshot[label_values]}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REQUESTS = Counter('novelia_requests_total', 'Requests by view and status code', ('view', 'status'))
+REQUEST_DURATION = Histogram(
+    'novelia_request_duration_seconds', 'Wall time spent handling the request', DURATION_BUCKETS
+)
+DB_QUERIES = Histogram('novelia_request_db_queries', 'Database queries per request', QUERY_BUCKETS)
+DB_DURATION = Histogram(
+    'novelia_request_db_duration_seconds', 'Time spent in database queries per request', DURATION_BUCKETS
+)
+RESPONSE_SIZE = Histogram(
+    'novelia_response_size_bytes', 'Response body size (after compression)', SIZE_BUCKETS
+)
+METRICS = (REQUESTS, REQUEST_DURATION, DB_QUERIES, DB_DURATION, RESPONSE_SIZE)
+
+
+def record_request(view, status, duration, queries, db_duration, size=None):
+    """Record one finished request in every metric"""
+    REQUESTS.inc(view, str(status))
+    REQUEST_DURATION.observe(view, duration)
+    DB_QUERIES.observe(view, queries)
+    DB_DURATION.observe(view, db_duration)
+    if size is not None:
+        RESPONSE_SIZE.observe(view, size)
+
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def reset_metrics():
+    for metric in METRICS:
+        metric.reset()
@@ -0,0 +1,330 @@
+import gzip
+import logging
+import time
+from contextvars import ContextVar
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from books.cache import aget_catalog_changed_at, get_catalog_changed_at
+from . import routers
+from .metrics import record_request
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+slow_request_logger = logging.getLogger('novelia.slow_requests')
+
+
+class AsyncCapableMiddleware:
+    """
+    Base for middleware that runs natively in both WSGI and ASGI mode.
+
+    Subclasses implement process(request, response); under ASGI no thread
+    switch is needed around them, so async views stay async end to end.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.process(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process(request, await self.get_response(request))
+
+    def process(self, request, response):
+        return response
+
+
+def _accepted_encodings(header):
+    """Encodings the client accepts, ignoring ones explicitly given q=0"""
+    accepted = set()
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        params = params.replace(' ', '')
+        if params in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+class LazyStaticFile:
+    """Stands in for WhiteNoise's StaticFile, building its headers on first use"""
+
+    def __init__(self, build):
+        self.build = build
+        self.static_file = None
+
+    def get_response(self, method, request_headers):
+        if self.static_file is None:
+            self.static_file = self.build()
+        return self.static_file.get_response(method, request_headers)
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise, letting non-static requests through without a thread switch under ASGI"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        # Set before super() scans the static files, which calls get_static_file
+        self.lazy_files = settings.LEAN_BOOT
+        super().__init__(get_response, settings)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def get_static_file(self, path, url, stat_cache=None):
+        # Only the startup scan (which passes stat_cache) is deferred: find_file
+        # relies on a missing or directory path raising here, not when served
+        if not self.lazy_files or stat_cache is None:
+            return super().get_static_file(path, url, stat_cache=stat_cache)
+        # Lean boot: headers (and compressed variants) per file on its first request
+        return LazyStaticFile(partial(super().get_static_file, path, url, stat_cache=stat_cache))
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+class CompressionMiddleware(AsyncCapableMiddleware):
+    """
+    Compress API responses with Brotli or gzip, whichever the client prefers.
+
+    Only non-streaming responses whose content type is listed in
+    COMPRESSION_CONTENT_TYPES and whose body is at least
+    COMPRESSION_MIN_SIZE bytes are compressed; files (PDFs, images) are
+    already compressed and streamed.
+    """
+
+    def process(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if content_type not in settings.COMPRESSION_CONTENT_TYPES:
+            return response
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accepted = _accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and 'br' in accepted:
+            encoding = 'br'
+            compressed = brotli.compress(response.content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+        elif 'gzip' in accepted:
+            encoding = 'gzip'
+            compressed = gzip.compress(response.content, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+        else:
+            return response
+
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # The body changed, so a strong ETag must become weak (RFC 9110 8.8.1)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+
+class QueryRecorder:
+    """Counts and times the queries of one request (keeps SQL only when asked)"""
+
+    def __init__(self, keep_sql=False, max_sql=50):
+        self.count = 0
+        self.duration = 0.0
+        self.keep_sql = keep_sql
+        self.max_sql = max_sql
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            if self.keep_sql and len(self.statements) < self.max_sql:
+                self.statements.append((context['connection'].alias, elapsed, sql))
+
+
+# The recorder of the request being handled. Context variables follow the
+# request into the threads that run ORM calls for async views, which a
+# per-connection wrapper installed by the middleware would not.
+_query_recorder = ContextVar('novelia_query_recorder', default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    recorder = _query_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection, **kwargs):
+    # First in the list: execute_wrapper() blocks pop the last entry on exit
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+connection_created.connect(install_query_recorder, dispatch_uid='novelia-query-recorder')
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """
+    Record per-view latency, query count/time and response size.
+
+    Metrics live in process memory (novelia_project/metrics.py) and are
+    scraped from the admin-only /api/metrics/ endpoint; each worker process
+    reports its own numbers. Requests slower than METRICS_SLOW_REQUEST_MS
+    are logged to "novelia.slow_requests" together with their SQL.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        # Connections opened before this module was imported
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        recorder, token, started = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _query_recorder.reset(token)
+        return self.finish(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+        recorder, token, started = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _query_recorder.reset(token)
+        return self.finish(request, response, recorder, started)
+
+    @staticmethod
+    def start():
+        recorder = QueryRecorder(
+            keep_sql=settings.METRICS_SLOW_REQUEST_MS > 0,
+            max_sql=settings.METRICS_SLOW_LOG_MAX_QUERIES,
+        )
+        return recorder, _query_recorder.set(recorder), time.perf_counter()
+
+    def finish(self, request, response, recorder, started):
+        duration = time.perf_counter() - started
+        view = self.view_name(request)
+        if response.streaming:
+            length = response.get('Content-Length')
+            size = int(length) if length and length.isdigit() else None
+        else:
+            size = len(response.content)
+        record_request(view, response.status_code, duration, recorder.count, recorder.duration, size)
+
+        slow_ms = settings.METRICS_SLOW_REQUEST_MS
+        if slow_ms > 0 and duration * 1000 >= slow_ms:
+            self.log_slow_request(request, response, view, duration, recorder)
+        return response
+
+    @staticmethod
+    def view_name(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            if request.path.startswith(settings.SIGNED_MEDIA_URL):
+                return 'signed-media'
+            return 'unresolved'
+        return match.url_name or match.view_name or 'unnamed'
+
+    @staticmethod
+    def log_slow_request(request, response, view, duration, recorder):
+        statements = '\n'.join(
+            f'  [{alias}] {elapsed * 1000:.1f}ms {sql}' for alias, elapsed, sql in recorder.statements
+        )
+        if recorder.count > len(recorder.statements):
+            statements += f'\n  ... {recorder.count - len(recorder.statements)} more'
+        slow_request_logger.warning(
+            'Slow request %s %s (%s) -> %s in %.1fms, %d queries in %.1fms\n%s',
+            request.method, request.get_full_path(), view, response.status_code,
+            duration * 1000, recorder.count, recorder.duration * 1000, statements,
+        )
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Tell PrimaryReplicaRouter whether this request may read from replicas.
+
+    Only safe methods may; catalog reads also stay on the primary for a few
+    seconds after the catalog changed. Does nothing without replicas.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.uses_replicas(request):
+            return self.get_response(request)
+        tokens = routers.start_request(True, self.recently_changed(get_catalog_changed_at()))
+        try:
+            return self.get_response(request)
+        finally:
+            routers.end_request(tokens)
+
+    async def __acall__(self, request):
+        if not self.uses_replicas(request):
+            return await self.get_response(request)
+        tokens = routers.start_request(True, self.recently_changed(await aget_catalog_changed_at()))
+        try:
+            return await self.get_response(request)
+        finally:
+            routers.end_request(tokens)
+
+    @staticmethod
+    def uses_replicas(request):
+        return bool(settings.DATABASE_REPLICAS) and request.method in ('GET', 'HEAD', 'OPTIONS')
+
+    @staticmethod
+    def recently_changed(changed_at):
+        if changed_at is None:
+            return False
+        return (timezone.now() - changed_at).total_seconds() < settings.DATABASE_REPLICA_LAG_SECONDS
@@ -0,0 +1,67 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Apps whose reads may go to a replica. Tokens and sessions are read right
+# after they are written (login), so they always stay on the primary.
+REPLICA_APP_LABELS = {'books', 'accounts'}
+
+# Set per request by ReplicaRoutingMiddleware; outside requests (shell,
+# management commands, migrations) everything uses the primary.
+_replicas_allowed = ContextVar('novelia_replicas_allowed', default=False)
+_catalog_on_primary = ContextVar('novelia_catalog_on_primary', default=False)
+_pinned = ContextVar('novelia_pinned_to_primary', default=False)
+
+
+def start_request(allow_replicas, catalog_on_primary=False):
+    """Set the routing state of a request; returns tokens for end_request()"""
+    return (
+        _replicas_allowed.set(allow_replicas),
+        _catalog_on_primary.set(catalog_on_primary),
+        _pinned.set(False),
+    )
+
+
+def end_request(tokens):
+    for var, token in zip((_replicas_allowed, _catalog_on_primary, _pinned), tokens):
+        var.reset(token)
+
+
+def pin_to_primary():
+    """Send every later read of this request to the primary"""
+    _pinned.set(True)
+
+
+class PrimaryReplicaRouter:
+    """
+    Send reads of users and the catalog to a random replica, writes to the primary.
+
+    Replicas are only used inside safe (GET/HEAD) requests, never after the
+    request wrote something (it must read its own writes), and catalog
+    reads stay on the primary for DATABASE_REPLICA_LAG_SECONDS after any
+    catalog change so caches are not refilled with stale rows.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or not _replicas_allowed.get() or _pinned.get():
+            return None
+        app_label = model._meta.app_label
+        if app_label not in REPLICA_APP_LABELS:
+            return None
+        if app_label == 'books' and _catalog_on_primary.get():
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        return db == 'default'
@@ -3,6 +3,7 @@
 from pathlib import Path
 import os
 from decouple import config, Csv
+from django.core.exceptions import ImproperlyConfigured
 import dj_database_url
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -16,10 +17,16 @@ DEBUG = config('DEBUG', default=False, cast=bool)
 
 ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='localhost,127.0.0.1', cast=Csv())
 
+# Lean boot (for instances that spin down): the admin registers its models and
+# builds its URLs on the first /admin/ request, and WhiteNoise builds each static
+# file's headers on its first request, instead of at startup.
+# Measure with `manage.py profile_startup --compare`.
+LEAN_BOOT = config('LEAN_BOOT', default=False, cast=bool)
+
 # Application definition
 INSTALLED_APPS = [
     'accounts',
-    'django.contrib.admin',
+    'django.contrib.admin.apps.SimpleAdminConfig' if LEAN_BOOT else 'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -33,13 +40,18 @@ INSTALLED_APPS = [
     
     # Local apps
     'books',
+    'jobs',
     
 ]
 
 MIDDLEWARE = [
+    'novelia_project.middleware.MetricsMiddleware',  # Outermost, so it times the whole request
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Add WhiteNoise for static files
+    'novelia_project.middleware.CompressionMiddleware',  # gzip/brotli for API JSON
+    'novelia_project.middleware.StaticFilesMiddleware',  # WhiteNoise for static files (ASGI-friendly)
     'corsheaders.middleware.CorsMiddleware',  # CORS must be before CommonMiddleware
+    'novelia_project.middleware.ReplicaRoutingMiddleware',  # Safe requests may read from replicas
+    'books.middleware.SignedMediaMiddleware',  # Signed PDF links, before sessions/auth
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -74,14 +86,30 @@ WSGI_APPLICATION = 'novelia_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Use 0 under ASGI: each request runs in its own thread there
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=600, cast=int)
+# Postgres connection pool (Django's psycopg 3 pool); replaces persistent connections
+DATABASE_POOL = config('DATABASE_POOL', default=False, cast=bool)
+DATABASE_POOL_MIN_SIZE = config('DATABASE_POOL_MIN_SIZE', default=2, cast=int)
+DATABASE_POOL_MAX_SIZE = config('DATABASE_POOL_MAX_SIZE', default=10, cast=int)
+
+
+def database_config(url):
+    """Connection settings for a database URL, pooled when DATABASE_POOL is on"""
+    database = dj_database_url.parse(url, conn_max_age=DB_CONN_MAX_AGE, conn_health_checks=True)
+    if DATABASE_POOL and database['ENGINE'] == 'django.db.backends.postgresql':
+        database['CONN_MAX_AGE'] = 0
+        database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': DATABASE_POOL_MIN_SIZE,
+            'max_size': DATABASE_POOL_MAX_SIZE,
+        }
+    return database
+
+
 # Use PostgreSQL in production, SQLite in development
 if config('DATABASE_URL', default=None):
     DATABASES = {
-        'default': dj_database_url.config(
-            default=config('DATABASE_URL'),
-            conn_max_age=600,
-            conn_health_checks=True,
-        )
+        'default': database_config(config('DATABASE_URL')),
     }
 else:
     DATABASES = {
@@ -91,6 +119,46 @@ else:
         }
     }
 
+# Read replicas (novelia_project/routers.py): comma-separated database URLs.
+# Locally, a copy of the SQLite file works: sqlite:////path/to/replica.sqlite3
+DATABASE_REPLICA_URLS = config('DATABASE_REPLICA_URLS', default='', cast=Csv())
+DATABASE_REPLICAS = []
+for index, url in enumerate(DATABASE_REPLICA_URLS, start=1):
+    alias = f'replica{index}'
+    DATABASES[alias] = database_config(url)
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['novelia_project.routers.PrimaryReplicaRouter']
+# After a catalog write, catalog reads stay on the primary this long (replication lag)
+DATABASE_REPLICA_LAG_SECONDS = config('DATABASE_REPLICA_LAG_SECONDS', default=5, cast=int)
+
+# Cache
+# CACHE_URL picks the backend: redis://host:6379/1 (Redis-compatible),
+# file:///var/tmp/novelia_cache (file based) or empty for local memory.
+# Local memory is per process, so use file or Redis when running several workers.
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+elif CACHE_URL.startswith('file://'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_URL[len('file://'):],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'novelia',
+        }
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -99,6 +167,32 @@ AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator'},
 ]
 
+# Password hashing (accounts/hashers.py). PASSWORD_HASHER picks the hasher for
+# new hashes; the others stay listed so existing hashes still verify and are
+# upgraded to the preferred one on the user's next login.
+PASSWORD_HASHER_CHOICES = {
+    'argon2': 'accounts.hashers.TunedArgon2PasswordHasher',
+    'pbkdf2': 'accounts.hashers.TunedPBKDF2PasswordHasher',
+    'bcrypt': 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+}
+PASSWORD_HASHER = config('PASSWORD_HASHER', default='argon2')
+PASSWORD_HASHERS = [PASSWORD_HASHER_CHOICES[PASSWORD_HASHER]] + [
+    hasher for name, hasher in PASSWORD_HASHER_CHOICES.items() if name != PASSWORD_HASHER
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+# Argon2id cost: memory in KiB. 19 MiB / 2 passes / 1 lane is the OWASP
+# baseline and costs a fraction of the default PBKDF2 CPU time per login.
+ARGON2_TIME_COST = config('ARGON2_TIME_COST', default=2, cast=int)
+ARGON2_MEMORY_COST = config('ARGON2_MEMORY_COST', default=19456, cast=int)
+ARGON2_PARALLELISM = config('ARGON2_PARALLELISM', default=1, cast=int)
+# 0 keeps Django's default iteration count
+PBKDF2_ITERATIONS = config('PBKDF2_ITERATIONS', default=0, cast=int)
+
+# Login throttling (accounts/throttling.py), checked before any password
+# hashing; an empty value disables that throttle
+LOGIN_THROTTLE_IP_RATE = config('LOGIN_THROTTLE_IP_RATE', default='20/min') or None
+LOGIN_THROTTLE_EMAIL_RATE = config('LOGIN_THROTTLE_EMAIL_RATE', default='5/min') or None
+
 # Internationalization
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
@@ -108,26 +202,154 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# STATICFILES_STORAGE was removed in Django 5.1; STORAGES is what Django reads now
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Fingerprinted files (name.<12 hex>.ext) never change, so WhiteNoise can send
+# far-future cache headers for them
+WHITENOISE_IMMUTABLE_FILE_TEST = r'\.[0-9a-f]{12}\.[^./]+$'
+
+# Static frontend built by `manage.py build_frontend` (fingerprinted + precompressed);
+# when present it is served from the site root by WhiteNoise
+FRONTEND_SOURCE_DIR = BASE_DIR.parent / 'BOOK STORE'
+FRONTEND_BUILD_DIR = Path(config('FRONTEND_BUILD_DIR', default=str(BASE_DIR / 'frontend_build')))
+if FRONTEND_BUILD_DIR.is_dir():
+    WHITENOISE_ROOT = FRONTEND_BUILD_DIR
+    WHITENOISE_INDEX_FILE = True
+
+# API response compression (novelia_project/middleware.py)
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+COMPRESSION_CONTENT_TYPES = ('application/json', 'text/csv', 'application/x-ndjson')
+COMPRESSION_GZIP_LEVEL = config('COMPRESSION_GZIP_LEVEL', default=6, cast=int)
+COMPRESSION_BROTLI_QUALITY = config('COMPRESSION_BROTLI_QUALITY', default=5, cast=int)
+
+# Request metrics (novelia_project/middleware.py, scraped from /api/metrics/)
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+# Requests slower than this are logged with their SQL to "novelia.slow_requests" (0 = off)
+METRICS_SLOW_REQUEST_MS = config('METRICS_SLOW_REQUEST_MS', default=1000, cast=int)
+METRICS_SLOW_LOG_MAX_QUERIES = config('METRICS_SLOW_LOG_MAX_QUERIES', default=50, cast=int)
 
 # Media files (uploads)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Chunk size used when streaming byte ranges of local PDFs
+PDF_STREAM_CHUNK_SIZE = config('PDF_STREAM_CHUNK_SIZE', default=64 * 1024, cast=int)
+
+# Bulk import (books/bulk.py): rows validated and written per transaction
+BOOKS_IMPORT_BATCH_SIZE = config('BOOKS_IMPORT_BATCH_SIZE', default=500, cast=int)
+
+# Cover thumbnails (books/thumbnails.py): widths in pixels, WebP and JPEG
+COVER_THUMBNAIL_WIDTHS = config('COVER_THUMBNAIL_WIDTHS', default='160,320,640', cast=Csv(int))
+COVER_THUMBNAIL_QUALITY = config('COVER_THUMBNAIL_QUALITY', default=80, cast=int)
+
+# First-page previews of local PDFs (books/pdfs.py), width in pixels
+PDF_PREVIEW_WIDTH = config('PDF_PREVIEW_WIDTH', default=480, cast=int)
+
+# Signed, expiring PDF links (books/signing.py, books/middleware.py)
+PDF_SIGNED_URLS = config('PDF_SIGNED_URLS', default=True, cast=bool)
+PDF_SIGNED_URL_TTL = config('PDF_SIGNED_URL_TTL', default=300, cast=int)
+PDF_SIGNING_KEY = config('PDF_SIGNING_KEY', default=SECRET_KEY)
+SIGNED_MEDIA_URL = '/media/signed/'
+# Internal nginx location to hand files to via X-Accel-Redirect (empty = stream from Django)
+SIGNED_MEDIA_ACCEL_REDIRECT = config('SIGNED_MEDIA_ACCEL_REDIRECT', default='')
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',  # Use Token auth for API
+        'accounts.authentication.CachedTokenAuthentication',  # Token auth with cached lookups
         'rest_framework.authentication.SessionAuthentication',  # Keep session auth for browsable API
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',  # Allow unauthenticated access to API
     ],
+    # Proxies in front of the app that append to X-Forwarded-For (1 on Render). The
+    # default 0 uses REMOTE_ADDR: trusting the header unchecked would let clients
+    # pick their own IP and walk around the per-IP throttles.
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
 }
 
+# How long a token -> user lookup is cached by CachedTokenAuthentication
+AUTH_TOKEN_CACHE_SECONDS = config('AUTH_TOKEN_CACHE_SECONDS', default=60, cast=int)
+
+# Admin user list pagination
+USERS_PAGE_SIZE = config('USERS_PAGE_SIZE', default=50, cast=int)
+USERS_MAX_PAGE_SIZE = config('USERS_MAX_PAGE_SIZE', default=500, cast=int)
+
+# Books list pagination
+# BOOKS_LEGACY_LIST keeps the old {'count', 'books'} shape unless a client
+# asks for ?cursor= or ?page_size=; set it to False to paginate by default.
+BOOKS_LEGACY_LIST = config('BOOKS_LEGACY_LIST', default=True, cast=bool)
+BOOKS_PAGE_SIZE = config('BOOKS_PAGE_SIZE', default=20, cast=int)
+BOOKS_MAX_PAGE_SIZE = config('BOOKS_MAX_PAGE_SIZE', default=100, cast=int)
+BOOKS_COUNT_CACHE_SECONDS = config('BOOKS_COUNT_CACHE_SECONDS', default=60, cast=int)
+
+# Catalog response cache (books/cache.py); keys include a catalog version
+# that every book write bumps, so the timeout only bounds memory use.
+CATALOG_CACHE_ENABLED = config('CATALOG_CACHE_ENABLED', default=True, cast=bool)
+CATALOG_CACHE_SECONDS = config('CATALOG_CACHE_SECONDS', default=600, cast=int)
+
+# Serve the books list, detail and download endpoints from the async views in
+# books/async_views.py; turn on when running under ASGI (see novelia_project/asgi.py)
+BOOKS_ASYNC_VIEWS = config('BOOKS_ASYNC_VIEWS', default=False, cast=bool)
+
+# Full-text search (Postgres GIN index or SQLite FTS5, see books/search.py)
+BOOKS_SEARCH_MAX_RESULTS = config('BOOKS_SEARCH_MAX_RESULTS', default=500, cast=int)
+
+# Search box suggestions (books/autocomplete.py)
+AUTOCOMPLETE_LIMIT = config('AUTOCOMPLETE_LIMIT', default=8, cast=int)
+AUTOCOMPLETE_MAX_LIMIT = config('AUTOCOMPLETE_MAX_LIMIT', default=20, cast=int)
+
+# Batch lookups (/api/books/batch/?ids=) and the composite home page response.
+# HOME_FEATURED_BOOK_IDS picks the featured books; empty = the first books by title.
+BOOKS_BATCH_MAX_IDS = config('BOOKS_BATCH_MAX_IDS', default=100, cast=int)
+HOME_FEATURED_BOOK_IDS = config('HOME_FEATURED_BOOK_IDS', default='', cast=Csv(int))
+HOME_FEATURED_COUNT = config('HOME_FEATURED_COUNT', default=4, cast=int)
+HOME_NEW_ARRIVALS_COUNT = config('HOME_NEW_ARRIVALS_COUNT', default=8, cast=int)
+
+# Catalog change feed (books/feed.py). Changes younger than the lag are held
+# back until any transaction that wrote them has committed; tombstones older
+# than the retention are purged, and cursors older than that must resync.
+BOOKS_FEED_PAGE_SIZE = config('BOOKS_FEED_PAGE_SIZE', default=200, cast=int)
+BOOKS_FEED_MAX_PAGE_SIZE = config('BOOKS_FEED_MAX_PAGE_SIZE', default=1000, cast=int)
+BOOKS_FEED_LAG_SECONDS = config('BOOKS_FEED_LAG_SECONDS', default=5, cast=int)
+BOOKS_FEED_TOMBSTONE_DAYS = config('BOOKS_FEED_TOMBSTONE_DAYS', default=30, cast=int)
+
+# "Similar books" (books/similar.py): neighbors stored per book, and the lowest
+# cosine similarity worth showing
+SIMILAR_BOOKS_COUNT = config('SIMILAR_BOOKS_COUNT', default=10, cast=int)
+SIMILAR_BOOKS_MIN_SCORE = config('SIMILAR_BOOKS_MIN_SCORE', default=0.05, cast=float)
+
+# Background jobs (jobs/queue.py, run by `manage.py run_worker`). Off, queued
+# work runs in the web process right after the request's transaction commits
+# (no worker needed). The worker bumps the catalog version after its writes,
+# which web processes only see through a shared cache, so jobs run in a worker
+# by default only outside DEBUG with a file or Redis CACHE_URL.
+SHARED_CACHE = CACHES['default']['BACKEND'] != 'django.core.cache.backends.locmem.LocMemCache'
+JOBS_ASYNC = config('JOBS_ASYNC', default=not DEBUG and SHARED_CACHE, cast=bool)
+if JOBS_ASYNC and not SHARED_CACHE:
+    raise ImproperlyConfigured(
+        'JOBS_ASYNC needs a CACHE_URL shared with the worker (file:// or redis://); '
+        'with the local memory cache, web processes would keep serving stale catalog pages'
+    )
+JOBS_MAX_ATTEMPTS = config('JOBS_MAX_ATTEMPTS', default=5, cast=int)
+# Seconds before the first retry, doubled for each further attempt
+JOBS_RETRY_DELAY = config('JOBS_RETRY_DELAY', default=10, cast=int)
+# A job running longer than this is assumed lost with its worker and queued again
+JOBS_LOCK_TIMEOUT = config('JOBS_LOCK_TIMEOUT', default=600, cast=int)
+JOBS_POLL_INTERVAL = config('JOBS_POLL_INTERVAL', default=2.0, cast=float)
+JOBS_KEEP_DONE_DAYS = config('JOBS_KEEP_DONE_DAYS', default=7, cast=int)
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = config(
     'CORS_ALLOWED_ORIGINS',
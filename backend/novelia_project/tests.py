@@ -0,0 +1,264 @@
+import gzip
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from unittest import skipIf
+
+from django.core.cache import cache
+from django.db import connection
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotFound
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from accounts.models import User
+from books.cache import bump_catalog_version
+from books.models import Book
+
+from . import metrics, routers
+from .middleware import (
+    CompressionMiddleware, LazyStaticFile, MetricsMiddleware, ReplicaRoutingMiddleware, StaticFilesMiddleware,
+)
+from .urls import LazyAdminURLs
+from .views import media
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional
+    brotli = None
+
+
+def not_found(request):
+    return HttpResponseNotFound('not found')
+
+
+class MediaViewTests(SimpleTestCase):
+    def setUp(self):
+        root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root)
+        (root / 'books' / 'pdfs').mkdir(parents=True)
+        (root / 'books' / 'pdfs' / 'efuru.pdf').write_bytes(b'%PDF-')
+        (root / 'books' / 'covers').mkdir()
+        (root / 'books' / 'covers' / 'efuru.jpg').write_bytes(b'jpeg')
+        media_root = override_settings(MEDIA_ROOT=str(root))
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+
+    def get(self, path):
+        return media(RequestFactory().get(f'/media/{path}'), path)
+
+    def test_serves_other_media(self):
+        self.assertEqual(self.get('books/covers/efuru.jpg').status_code, 200)
+
+    def test_pdfs_need_a_signed_link(self):
+        for path in ('books/pdfs/efuru.pdf', '/books/pdfs/efuru.pdf', 'books/covers/../pdfs/efuru.pdf'):
+            with self.assertRaises(Http404, msg=path):
+                self.get(path)
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    body = json.dumps({'books': [{'id': i, 'title': 'Things Fall Apart'} for i in range(200)]}).encode()
+
+    def respond(self, accept_encoding='', body=None, content_type='application/json', etag=None):
+        def get_response(request):
+            response = HttpResponse(self.body if body is None else body, content_type=content_type)
+            if etag:
+                response['ETag'] = etag
+            return response
+        request = RequestFactory().get('/api/books/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(get_response)(request)
+
+    @skipIf(brotli is None, 'Brotli is not installed')
+    def test_prefers_brotli(self):
+        response = self.respond('gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), self.body)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_gzip_when_brotli_is_refused(self):
+        response = self.respond('br;q=0, gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.body)
+
+    def test_left_alone(self):
+        for response in (
+            self.respond(''),
+            self.respond('identity'),
+            self.respond('gzip', body=b'{"small": true}'),
+            self.respond('gzip', content_type='application/pdf'),
+        ):
+            self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_streaming_responses_are_not_buffered(self):
+        def get_response(request):
+            return FileResponse(iter([self.body]), content_type='application/json')
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(CompressionMiddleware(get_response)(request).has_header('Content-Encoding'))
+
+    def test_strong_etags_become_weak(self):
+        self.assertEqual(self.respond('gzip', etag='"abc"')['ETag'], 'W/"abc"')
+        self.assertEqual(self.respond('gzip', etag='W/"abc"')['ETag'], 'W/"abc"')
+        self.assertEqual(self.respond('', etag='"abc"')['ETag'], '"abc"')
+
+
+class MetricTypesTests(SimpleTestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram('demo_seconds', 'Demo', (0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            histogram.observe('list', value)
+        self.assertEqual(histogram.render()[2:], [
+            'demo_seconds_bucket{view="list",le="0.1"} 1',
+            'demo_seconds_bucket{view="list",le="1.0"} 3',
+            'demo_seconds_bucket{view="list",le="+Inf"} 4',
+            'demo_seconds_sum{view="list"} 4.05',
+            'demo_seconds_count{view="list"} 4',
+        ])
+
+    def test_counter_labels_are_escaped(self):
+        counter = metrics.Counter('demo_total', 'Demo', ('view', 'status'))
+        counter.inc('say "hi"', '200')
+        counter.inc('say "hi"', '200')
+        self.assertEqual(counter.render()[2:], ['demo_total{view="say \\"hi\\"",status="200"} 2'])
+
+
+class MetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        metrics.reset_metrics()
+        self.addCleanup(metrics.reset_metrics)
+
+    def test_requests_are_recorded_per_view(self):
+        self.client.get('/api/books/', {'page_size': 5}, secure=True)
+        self.client.get('/api/books/999999/', secure=True)
+        self.assertEqual(metrics.REQUESTS._values, {('books-list', '200'): 1, ('book-detail', '404'): 1})
+        counts, count, total = metrics.DB_QUERIES._series['books-list']
+        self.assertEqual(count, 1)
+        self.assertGreaterEqual(total, 1)
+        self.assertIn('books-list', metrics.RESPONSE_SIZE._series)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_can_be_turned_off(self):
+        self.client.get('/api/books/', secure=True)
+        self.assertEqual(metrics.REQUESTS._values, {})
+
+    @override_settings(METRICS_SLOW_REQUEST_MS=1)
+    def test_slow_requests_are_logged_with_their_sql(self):
+        def get_response(request):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            time.sleep(0.005)
+            return HttpResponse('ok')
+        with self.assertLogs('novelia.slow_requests', 'WARNING') as logs:
+            MetricsMiddleware(get_response)(RequestFactory().get('/slow/'))
+        self.assertIn('1 queries', logs.output[0])
+        self.assertIn('SELECT 1', logs.output[0])
+
+    def test_endpoint_is_admin_only(self):
+        self.assertEqual(self.client.get('/api/metrics/', secure=True).status_code, 401)
+        admin = User.objects.create_user(
+            email='admin@example.com', username='admin', password='s3cret-pass',
+            first_name='Admin', last_name='User', is_staff=True,
+        )
+        token = Token.objects.create(user=admin)
+        response = self.client.get(
+            '/api/metrics/', secure=True, headers={'Authorization': f'Token {token.key}'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn('# TYPE novelia_requests_total counter', response.content.decode())
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], DATABASE_REPLICA_LAG_SECONDS=5)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = routers.PrimaryReplicaRouter()
+
+    def route(self, method='get', *models):
+        """Where each model's reads went during a request, in order"""
+        databases = []
+
+        def get_response(request):
+            for model in models:
+                if model is None:
+                    self.router.db_for_write(Book)
+                else:
+                    databases.append(self.router.db_for_read(model))
+            return HttpResponse()
+        request = getattr(RequestFactory(), method)('/api/books/')
+        ReplicaRoutingMiddleware(get_response)(request)
+        return databases
+
+    def test_safe_requests_read_from_replicas(self):
+        self.assertEqual(self.route('get', Book, User, Token), ['replica1', 'replica1', None])
+        self.assertEqual(self.route('post', Book, User), [None, None])
+
+    def test_reads_after_a_write_stay_on_the_primary(self):
+        self.assertEqual(self.route('get', Book, None, Book, User), ['replica1', None, None])
+
+    def test_catalog_stays_on_the_primary_after_a_change(self):
+        bump_catalog_version()
+        self.assertEqual(self.route('get', Book, User), [None, 'replica1'])
+        with override_settings(DATABASE_REPLICA_LAG_SECONDS=0):
+            self.assertEqual(self.route('get', Book), ['replica1'])
+
+    def test_primary_outside_requests(self):
+        self.assertIsNone(self.router.db_for_read(Book))
+        self.route('get', Book)
+        self.assertIsNone(self.router.db_for_read(Book))
+        self.assertTrue(self.router.allow_migrate('default', 'books'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'books'))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        self.assertEqual(self.route('get', Book, User), [None, None])
+
+
+class LeanBootTests(SimpleTestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root)
+        (self.root / 'app.js').write_text('console.log("novelia")')
+        (self.root / 'static').mkdir()
+        (self.root / 'css').mkdir()
+        (self.root / 'css' / 'site.css').write_text('body { margin: 0 }')
+
+    def middleware(self, autorefresh):
+        with override_settings(
+            LEAN_BOOT=True, STATIC_ROOT=str(self.root / 'static'), WHITENOISE_ROOT=str(self.root),
+            WHITENOISE_AUTOREFRESH=autorefresh, WHITENOISE_USE_FINDERS=False, WHITENOISE_INDEX_FILE=False,
+        ):
+            return StaticFilesMiddleware(not_found)
+
+    def get(self, middleware, path):
+        return middleware(RequestFactory().get(path))
+
+    def test_files_are_built_on_first_request(self):
+        middleware = self.middleware(autorefresh=False)
+        self.assertIsInstance(middleware.files['/app.js'], LazyStaticFile)
+        self.assertIsNone(middleware.files['/app.js'].static_file)
+        response = self.get(middleware, '/app.js')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'console.log("novelia")')
+        self.assertIsNotNone(middleware.files['/app.js'].static_file)
+
+    def test_missing_paths_fall_through(self):
+        middleware = self.middleware(autorefresh=False)
+        self.assertEqual(self.get(middleware, '/missing.js').status_code, 404)
+        self.assertEqual(self.get(middleware, '/css/').status_code, 404)
+
+    def test_autorefresh_missing_paths_fall_through(self):
+        middleware = self.middleware(autorefresh=True)
+        self.assertEqual(self.get(middleware, '/css/site.css').status_code, 200)
+        # A missing file or a directory without an index is the app's 404, not an error
+        self.assertEqual(self.get(middleware, '/missing.js').status_code, 404)
+        self.assertEqual(self.get(middleware, '/css').status_code, 404)
+        self.assertEqual(self.get(middleware, '/css/').status_code, 404)
+
+    def test_admin_urls_are_built_on_first_use(self):
+        urls = LazyAdminURLs()
+        self.assertNotIn('urlpatterns', urls.__dict__)
+        routes = [str(pattern.pattern) for pattern in urls.urlpatterns]
+        self.assertIn('books/book/', routes)
+
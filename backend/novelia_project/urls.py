@@ -1,15 +1,34 @@
 
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+from django.utils.functional import cached_property
+
+from . import views
+
+
+class LazyAdminURLs:
+    """admin.site.urls for LEAN_BOOT: models are registered and URLs built on first use"""
+
+    @cached_property
+    def urlpatterns(self):
+        admin.autodiscover()
+        return admin.site.get_urls()
+
+
+admin_urls = (LazyAdminURLs(), 'admin', admin.site.name) if settings.LEAN_BOOT else admin.site.urls
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
+    path('admin/', admin_urls),
     path('api/auth/', include('accounts.urls')),
     path('api/books/', include('books.urls')),
+    path('api/metrics/', views.metrics, name='metrics'),
 ]
 
-# Serve media files (both development and production)
+# Serve uploaded media in development (covers, thumbnails, previews). PDFs are
+# left out: they are only reachable through signed links (SIGNED_MEDIA_URL).
 # In production, consider using a CDN or cloud storage like AWS S3 or Cloudinary
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+if settings.DEBUG:
+    urlpatterns += [
+        re_path(rf'^{settings.MEDIA_URL.lstrip("/")}(?P<path>.*)$', views.media, name='media'),
+    ]
@@ -0,0 +1,24 @@
+import posixpath
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.views.static import serve
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+
+from books.streaming import PDF_SUBDIR
+from .metrics import render_metrics
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics(request):
+    """Request metrics in the Prometheus text format (admin only)"""
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def media(request, path):
+    """Uploaded media for development; PDFs only go out through signed URLs"""
+    if posixpath.normpath(path).lstrip('/').startswith(f'{PDF_SUBDIR}/'):
+        raise Http404('PDFs are served through signed download links')
+    return serve(request, path, document_root=settings.MEDIA_ROOT)